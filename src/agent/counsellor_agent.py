@@ -1,6 +1,6 @@
+import asyncio
 import json
 import logging
-import difflib
 from typing import Generator
 
 from data.loader import DataEngine
@@ -12,18 +12,31 @@ from logic.trend_analysis import TrendAnalysis
 from ai.reasoning_engine import ReasoningEngine
 from ai.response_formatter import ResponseFormatter
 from ai.embedding_search import CollegeEmbeddingSearch
+from ai.college_resolver import CollegeResolver
+from ai.branch_index import BranchSearch, build_branch_documents
 from ai.rag_engine import GuidelineRAG
+from ai.answer_cache import answer_cache
+from ai.prompt_builder import COMPACT_LEGEND, PromptBuilder, group_by_college
+from ai.template_responder import TemplateResponder
 
 from agent.intent_router import IntentRouter
 from agent.session_memory import SessionMemory
-from llm_gateway import LLMClient
+from llm_gateway import LLMClient, is_error_response
+from llm_profiles import profile_for_intent
 from web.skill_search import SkillSearch
 from web.career_mapping import CareerMapper
 from ai.prompts import MASTER_SYSTEM_PROMPT
+from config import config
+from utils.cancellation import CancellationToken, OperationCancelled
 from utils.validators import validate_mark
+from utils.metrics import metrics
 
 logger = logging.getLogger("tnea_ai.agent")
 
+# Recorded in memory (after whatever part of the answer was shown) for a turn cancelled mid-answer
+CANCELLED_NOTE = "[Response cancelled before it was finished]"
+DISCLAIMER = "\n\n<span style='font-size:0.8em; color:gray'>Note: Cutoff data from official TNEA records. Predictions are AI estimates. Verify with colleges.</span>"
+
 
 def _safe_float(value, default=None):
     """Safely convert a value to float. Returns default if conversion fails."""
@@ -35,16 +48,42 @@ def _safe_float(value, default=None):
         return default
 
 
+class _PrefetchedStream:
+    """
+    An LLM token stream whose request goes out on construction rather than on first
+    iteration, so it overlaps with whatever is yielded before it. Must be aclose()d.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._first = asyncio.ensure_future(stream.__anext__())
+
+    async def __aiter__(self):
+        try:
+            yield await self._first
+        except StopAsyncIteration:
+            return
+        async for item in self._stream:
+            yield item
+
+    async def aclose(self):
+        self._first.cancel()
+        await asyncio.gather(self._first, return_exceptions=True)
+        await self._stream.aclose()
+
+
 class CounsellorAgent:
     STRATEGIC_ALIASES = {
         "CEG": "COLLEGE OF ENGINEERING GUINDY",
         "GUINDY": "COLLEGE OF ENGINEERING GUINDY",
+        "ANNA UNIVERSITY MAIN CAMPUS": "COLLEGE OF ENGINEERING GUINDY",
+        "ANNA UNIV MAIN": "COLLEGE OF ENGINEERING GUINDY",
         "MIT": "MADRAS INSTITUTE OF TECHNOLOGY",
         "MIT CHROMEPET": "MADRAS INSTITUTE OF TECHNOLOGY",
         "SSN": "SSN COLLEGE OF ENGINEERING",
         "KCT": "KUMARAGURU COLLEGE OF TECHNOLOGY",
         "KUMARAGURU": "KUMARAGURU COLLEGE OF TECHNOLOGY",
-        "PSG": "PSG COLLEGE OF TECHNOLOGY", 
+        "PSG": "PSG COLLEGE OF TECHNOLOGY", # Careful, there's also PSG iTech
         "PSG TECH": "PSG COLLEGE OF TECHNOLOGY",
         "PSG ITECH": "PSG INSTITUTE OF TECHNOLOGY AND APPLIED RESEARCH",
         "SKCET": "SRI KRISHNA COLLEGE OF ENGINEERING AND TECHNOLOGY",
@@ -87,41 +126,90 @@ class CounsellorAgent:
         # AI
         self.reasoning = ReasoningEngine()
         self.formatter = ResponseFormatter()
+        self.templates = TemplateResponder()
         self.llm = LLMClient()
         self.embedding_search = CollegeEmbeddingSearch()
+        self.college_resolver = CollegeResolver()
         self.rag = GuidelineRAG()
+        self.answer_cache = answer_cache
         if self.data_engine.colleges:
-             self.embedding_search.index_colleges(self.data_engine.colleges, self.STRATEGIC_ALIASES)
+             self.college_resolver.index_colleges(self.data_engine.colleges, self.STRATEGIC_ALIASES, self.embedding_search)
+             # Aliases pinned to catalogue names, so they enrich the right college's embedding text
+             self.embedding_search.index_colleges(self.data_engine.colleges, self.college_resolver.resolved_aliases())
+        # College x branch documents; built (and the model loaded) on the first branch query
+        self.branch_search = BranchSearch()
+        self.branch_search.set_source(lambda: build_branch_documents(
+            self.data_engine.colleges, self.data_engine.get_predictions(), self.data_engine.get_latest_branch_cutoffs()))
         
         # Agent
         self.intent_router = IntentRouter()
         self.memory = memory if memory is not None else SessionMemory()
         
-    async def process_query_stream(self, user_query: str) -> Generator[str, None, None]:
-        """Main orchestration loop."""
+    async def process_query_stream(self, user_query: str, cancel: CancellationToken = None) -> Generator[str, None, None]:
+        """
+        Main orchestration loop. Cancelling `cancel` (e.g. when the student sends another
+        message) or closing the generator stops the turn at once, LLM streams included; the
+        turn is then recorded in memory as what was shown plus CANCELLED_NOTE.
+        """
+        cancel = cancel or CancellationToken()
         # 1. Update Memory
         self.memory.add_message("user", user_query)
-        
+        user_entry = self.memory.history[-1]
+        shown = []
+        completed = False
+        turn = self._run_turn(user_query, cancel)
+        try:
+            async for chunk in turn:
+                shown.append(chunk)
+                yield chunk
+            completed = True
+        except OperationCancelled:
+            pass
+        finally:
+            await turn.aclose()
+            if not completed:
+                self._record_cancelled_turn(user_entry, shown)
+
+    def _record_cancelled_turn(self, user_entry: dict, shown: list):
+        """Gives a turn that ended early its assistant message, unless it already has one."""
+        if not self.memory.history or self.memory.history[-1] is not user_entry:
+            return
+        answer = "".join(c for c in shown if c != DISCLAIMER).strip()
+        self.memory.add_message("assistant", f"{answer}\n\n{CANCELLED_NOTE}" if answer else CANCELLED_NOTE)
+        metrics.incr("agent.turns_cancelled")
+
+    async def _run_turn(self, user_query: str, cancel: CancellationToken) -> Generator[str, None, None]:
         # 2. Identify Intent
-        intent, entities = self.intent_router.route_query(
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        intent, entities = await cancel.run(self.intent_router.route_query_async(
             user_query, 
             history=self.memory.history, 
             user_profile=self.memory.user_profile
-        )
+        ))
+        routed = loop.time()
+        metrics.observe("agent.route_s", routed - start)
         
         logger.info(f"Intent: {intent}, Entities: {entities}")
         
         # 3. Execute Logic based on Intent
         final_prompt = ""
         system_prompt = MASTER_SYSTEM_PROMPT
+        cached_answer = None
+        answer_cache_key = None  # (question vector, chunk ids, corpus hash) when the answer may be cached
+        template_answer = None  # answer rendered locally from computed data (TEMPLATE_INTENTS)
+        use_template = intent in config.TEMPLATE_INTENTS
         
         if intent == "OFF_TOPIC":
-            yield "I'm sorry, but I can only help with TNEA engineering admissions, college counselling, rank predictions, and career guidance. If you have questions about engineering colleges in Tamil Nadu, cutoffs, or the counselling process, I'd be happy to assist!"
+            metrics.incr("template.hits.OFF_TOPIC")
+            yield self.templates.off_topic()
             return
         
         if intent == "GREETING":
             greeting_prompt = f"User said: '{user_query}'. Respond with a warm, brief, and professional greeting as TNEA AI. Do not be repetitive. Ask how you can help with engineering admissions."
             final_prompt = greeting_prompt
+            if use_template:
+                template_answer = self.templates.greeting(user_query, self.memory.user_profile, self.memory.history)
 
         elif intent == "PREDICT_PERCENTILE":
             mark = _safe_float(entities.get("mark"))
@@ -151,6 +239,9 @@ class CounsellorAgent:
                 final_prompt = self.reasoning.prepare_prediction_explanation_prompt(mark, p, r, total)
                 if isinstance(p_result, dict):
                      final_prompt += f"\n\nAdditional Data: The predicted percentile confidence interval is {p_low}% to {p_high}%."
+                # Branch, place or college questions are worth a model's reasoning; the bare prediction is not
+                if use_template and not any(entities.get(k) for k in ("branch", "location", "college_name")):
+                    template_answer = self.templates.prediction(mark, p, r, total, p_low, p_high)
             else:
                 yield "Could you please specify a valid cutoff mark (0-200) so I can predict your percentile?"
                 return
@@ -159,15 +250,12 @@ class CounsellorAgent:
             # Check if user is asking about a specific college (Info Query) vs General Recommendation
             college_name_input = entities.get("college_name")
             
-            # Resolve college name if provided
             college_name = None
-            if college_name_input:
-                college_name = self._resolve_college_name(college_name_input)
-            
             user_mark = _safe_float(entities.get("mark")) or _safe_float(self.memory.user_profile.get("mark"))
             
             # If specific college request but no mark, JUST return college info (don't block)
             if college_name_input and (user_mark is None or not validate_mark(user_mark)):
+                college_name = await cancel.run(self._resolve_college_name(college_name_input))
                 # If resolution failed, try using input directly or notify user
                 search_name = college_name or college_name_input
                 college_name_upper = search_name.upper()
@@ -179,7 +267,7 @@ class CounsellorAgent:
 
                 # Semantic fallback if no string match
                 if not nearby_colleges:
-                     results = self.embedding_search.search(search_name, top_k=5, threshold=0.4)
+                     results = await asyncio.to_thread(self.embedding_search.search, search_name, top_k=5, threshold=0.4)
                      nearby_colleges = [r[0] for r in results]
                 
                 if not nearby_colleges and college_name:
@@ -203,7 +291,7 @@ class CounsellorAgent:
                     
                     # Show cutoffs if available (using 2024 data as generic ref)
                     code = str(c.get('code'))
-                    cutoffs = self.data_engine.get_college_cutoffs(code)
+                    cutoffs = await asyncio.to_thread(self.data_engine.get_college_cutoffs, code)
                     if cutoffs:
                         yield "- 📉 **Past Cutoffs (OC)**: "
                         # Get latest year cutoffs for a few branches
@@ -219,7 +307,7 @@ class CounsellorAgent:
             # If Location-based query but no mark, JUST return colleges in that location (don't block)
             location_input = entities.get("location")
             if location_input and (user_mark is None or not validate_mark(user_mark)):
-                 nearby = self.geo_locator.find_nearby_colleges(location_input)
+                 nearby = await asyncio.to_thread(self.geo_locator.find_nearby_colleges, location_input)
                  if not nearby:
                      # Fallback to string match if geo fails
                      nearby = [c for c in self.data_engine.colleges if location_input.upper() in c.get('district','').upper()]
@@ -228,6 +316,26 @@ class CounsellorAgent:
                      yield f"I couldn't find any engineering colleges in or near '{location_input}'."
                      return
                  
+                 # Branch + location (+ hostel): rank college x branch documents directly
+                 branch_input = entities.get("branch")
+                 if branch_input:
+                     hits = await asyncio.to_thread(
+                         self.branch_search.search, f"{branch_input} {user_query}", top_k=5,
+                         college_codes=[c.get('code') for c in nearby],
+                         hostel=True if "hostel" in user_query.lower() else None,
+                     )
+                     if hits:
+                         yield f"**{branch_input.upper()} programmes near '{location_input}':**\n\n"
+                         for doc, _ in hits:
+                             yield f"**{doc['college_name']}**\n"
+                             yield f"- 🎓 {doc['branch_name'].title()} ({doc['branch_code']})\n"
+                             yield f"- 📍 {doc['district']}" + (" · 🏠 Hostel" if doc['hostel'] else "") + "\n"
+                             if doc['percentiles'].get('OC') is not None:
+                                 yield f"- 📉 Predicted OC closing percentile: {doc['percentiles']['OC']}\n"
+                             yield "\n"
+                         yield "\n*To see which of these you can likely get into, please tell me your cutoff mark.*"
+                         return
+
                  yield f"**Found {len(nearby)} colleges near '{location_input}':**\n\n"
                  # Show top 5
                  for c in nearby[:5]:
@@ -262,12 +370,14 @@ class CounsellorAgent:
                 self.memory.update_profile("community", entities["community"])
             
             
-            if location:
-                nearby_colleges = self.geo_locator.find_nearby_colleges(location)
+            if college_name_input:
+                # Name resolution may fall back to the LLM; compute the candidates meanwhile
+                college_name, nearby_colleges = await cancel.run(asyncio.gather(
+                    self._resolve_college_name(college_name_input),
+                    asyncio.to_thread(self._candidate_colleges, location),
+                ))
             else:
-                nearby_colleges = self.data_engine.colleges
-            if not nearby_colleges:
-                nearby_colleges = self.data_engine.colleges
+                nearby_colleges = await asyncio.to_thread(self._candidate_colleges, location)
             
             if college_name:
                 # Use the resolved name
@@ -283,7 +393,7 @@ class CounsellorAgent:
                         if college_name_upper in c.get('name', '').upper()
                     ]
             
-            enriched = self._enrich_with_cutoffs(nearby_colleges, community.upper())
+            enriched = await asyncio.to_thread(self._enrich_with_cutoffs, nearby_colleges, community.upper())
             
             if branch:
                 enriched = self._filter_by_branch(enriched, branch)
@@ -316,7 +426,8 @@ class CounsellorAgent:
             
             final_prompt = self._build_grounded_college_prompt(
                 user_query, user_mark_f, categorized, location, branch,
-                predicted_rank, predicted_pct, predicted_total
+                predicted_rank, predicted_pct, predicted_total,
+                budget_tokens=profile_for_intent(intent).input_budget
             )
 
         elif intent == "CHOICE_FILLING":
@@ -345,13 +456,13 @@ class CounsellorAgent:
             yield f"📋 **Generating your choice-filling priority table...**\n\n"
             
             if location:
-                nearby = self.geo_locator.find_nearby_colleges(location)
+                nearby = await asyncio.to_thread(self.geo_locator.find_nearby_colleges, location)
                 if not nearby:
                     nearby = self.data_engine.colleges
             else:
                 nearby = self.data_engine.colleges
             
-            enriched = self._enrich_with_cutoffs(nearby, community.upper())
+            enriched = await asyncio.to_thread(self._enrich_with_cutoffs, nearby, community.upper())
             
             if branch:
                 enriched = self._filter_by_branch(enriched, branch)
@@ -365,92 +476,119 @@ class CounsellorAgent:
             formatted = self.formatter.format_college_list(categorized, user_mark=user_mark_f)
             yield formatted + "\n\n"
             
-            branch_str = f" for {branch} branch" if branch else ""
-            location_str = f" in {location}" if location else ""
-            
-            safe_count = len(categorized.get("Safe", []))
-            mod_count = len(categorized.get("Moderate", []))
-            amb_count = len(categorized.get("Ambitious", []))
-            
-            final_prompt = f"""Generate a COMPLETE CHOICE-FILLING PRIORITY TABLE for this TNEA student.
-
-Student Profile:
-- Cutoff Mark: {user_mark_f}
-- Predicted Rank: ~{predicted_rank}
-- Percentile: {predicted_pct}
-- Preferred Branch: {branch or 'All branches'}
-- Location: {location or 'All Tamil Nadu'}
-- Community: {community}
-- Total eligible: {safe_count} Safe + {mod_count} Moderate + {amb_count} Ambitious colleges
-
-DATA AVAILABLE:
-{formatted}
-
-GENERATE THE FOLLOWING:
-
-1. **CHOICE-FILLING PRIORITY TABLE** with 20-25 choices in recommended filling order:
-   | Priority | College Name | Branch | Cutoff | Placement (from DB) | Category | Strategy |
-   Include a mix: 3-4 Ambitious (dream picks), 8-10 Moderate (realistic targets), 8-10 Safe (backup/guaranteed).
-   For the Placement column: ONLY use the exact placement % from the DATA AVAILABLE section above. If the data says "No Data" or "📊 No Data", write "Not verified" — NEVER make up placement percentages or salary figures.
-
-2. **FILLING STRATEGY**: 
-   - Why this specific order matters
-   - How sliding admission works (if you get allotted a lower choice, you can slide up in later rounds)
-   - When to use "Float" vs "Freeze" options
-
-3. **KEY TIPS**:
-   - What to do if you don't get allotted in Round 1
-   - Management quota vs counselling trade-offs
-   - Branch priority vs college tier trade-offs
-
-4. **PLACEMENT NOTE**: Only quote placement data from the table above. If placement data says "No Data", say "Not verified — check the official college website." DO NOT fabricate placement percentages, salary ranges, or recruiter names.
-
-Be comprehensive and detailed. This table will be used by the student for actual TNEA choice filling. Use ONLY the exact data provided — never invent cutoff numbers, college names, or placement statistics.
-"""
+            final_prompt = self._build_choice_filling_prompt(
+                user_mark_f, categorized, predicted_rank, predicted_pct, branch, location, community,
+                budget_tokens=profile_for_intent(intent).input_budget, shown_table=formatted
+            )
 
         elif intent == "CAREER_PLANNING":
-            response = self.career_mapper.map_career(user_query)
+            response = await cancel.run(self.career_mapper.map_career_async(user_query))
             final_prompt = f"User asked about career: {user_query}\n\nAI Analysis:\n{response}\n\nSummarize and guide the student."
 
         elif intent == "SKILL_GUIDANCE":
-            response = self.skill_search.search_skills(user_query)
+            response = await cancel.run(self.skill_search.search_skills_async(user_query))
             final_prompt = f"User asked about skills: {user_query}\n\nAI Analysis:\n{response}\n\nProvide a skill roadmap."
 
         elif intent == "TREND_ANALYSIS":
             # Use the real trend analysis engine
             branch = entities.get("branch")
             if branch:
-                trend_data = self.trend_analysis.analyze_branch_trend(branch)
+                trend_data = await asyncio.to_thread(self.trend_analysis.analyze_branch_trend, branch)
                 yield trend_data + "\n\n"
                 final_prompt = f"User asked for trends: {user_query}\n\nHere is the real trend data:\n{trend_data}\n\nProvide additional insights and interpretation of these trends. What do they mean for a student considering this branch? Use ONLY the data provided above."
+                if use_template and self.templates.has_trend_data(trend_data):
+                    template_answer = self.templates.trend(branch)
             else:
                 # General trend overview
-                rising = self.trend_analysis.get_rising_branches()
+                rising = await asyncio.to_thread(self.trend_analysis.get_rising_branches)
                 yield rising + "\n\n"
                 final_prompt = f"User asked for trends: {user_query}\n\nHere is the trend overview:\n{rising}\n\nProvide insights on which branches are growing and which are declining. Advise the student based on this data."
+                if use_template and self.templates.has_trend_data(rising):
+                    template_answer = self.templates.trend()
             
         else:  # GENERAL_QUERY or GUIDANCE
-            # Use RAG to get relevant context
-            context = self.rag.query(user_query, n_results=4)
-            if not context:
-                # Fallback to static dump if RAG returns nothing (unlikely unless empty DB)
+            # Hybrid BM25 + vector retrieval; weak matches are dropped rather than padded in.
+            # Database and embedding work runs on threads so other sessions' streams on the
+            # same event loop (utils/async_bridge.py) keep flowing.
+            context, chunk_ids = await asyncio.to_thread(self.rag.query_with_sources, user_query, n_results=3)
+            if not context and self.rag.collection is None:
+                # Fallback to static dump if the vector store is unavailable
                 context = self.data_engine.get_guidelines()[:2000]
-                
+            elif chunk_ids and self.answer_cache.enabled:
+                # The prompt depends only on the question and these chunks, so a close
+                # paraphrase that retrieved the same chunks can reuse the answer
+                try:
+                    vector = await asyncio.to_thread(self.rag.embed_query, user_query)
+                    answer_cache_key = (vector, chunk_ids, self.rag.corpus_hash)
+                    cached_answer = self.answer_cache.lookup(*answer_cache_key)
+                except Exception as e:
+                    logger.warning(f"Answer cache unavailable: {e}")
+                    answer_cache_key = None
+
             final_prompt = f"User Query: {user_query}\n\nRelevant TNEA Guidelines Context:\n{context}\n\nAnswer the user's question accurately using the context provided. If the context doesn't have the answer, use your general knowledge but mention that it might not be specific to TNEA 2024 rules."
 
-        # 4. Stream LLM Response
-        if final_prompt:
-            stream = await self.llm.generate_response(final_prompt, system_prompt=system_prompt, stream=True)
-            full_response = ""
+        # 4. Stream LLM Response (or the cached answer to an equivalent question, or the template)
+        # Data lookups, retrieval and prompt building since routing (per-stage timings for load tests)
+        prepare_s = loop.time() - routed
+        metrics.observe("agent.prepare_s", prepare_s)
+        metrics.observe(f"agent.prepare_s.{intent}", prepare_s)
+        if cached_answer is not None:
+            yield cached_answer
+            self.memory.add_message("assistant", cached_answer)
+            yield DISCLAIMER
+
+        elif template_answer is not None:
+            metrics.incr(f"template.hits.{intent}")
+            elaboration = None
+            if final_prompt and intent in config.TEMPLATE_ELABORATE_INTENTS:
+                # Requested before the template is yielded, so the model works while it renders
+                stream = await self.llm.generate_response(
+                    f"{final_prompt}\n\nThe student has already been shown this answer:\n{template_answer}\n\n"
+                    "Add only insight it does not cover, in a few sentences, without repeating its numbers.",
+                    system_prompt=system_prompt, stream=True, profile=profile_for_intent(intent), cancel=cancel)
+                elaboration = _PrefetchedStream(stream)
+                await asyncio.sleep(0)  # let the request go out before the template is handed over
+                metrics.incr(f"template.elaborations.{intent}")
+            parts = [template_answer]
+            try:
+                yield template_answer
+                if elaboration is not None:
+                    async for chunk, _ in elaboration:
+                        if len(parts) == 1:
+                            if is_error_response(chunk):
+                                # The template already answered; an upstream failure is not worth showing
+                                logger.warning(f"Elaboration for {intent} failed: {chunk[:80]}")
+                                break
+                            parts.append("\n\n")
+                            yield "\n\n"
+                        parts.append(chunk)
+                        yield chunk
+                    cancel.raise_if_cancelled()
+            finally:
+                if elaboration is not None:
+                    await elaboration.aclose()
+            self.memory.add_message("assistant", "".join(parts))
+            yield DISCLAIMER
+
+        elif final_prompt:
+            cancel.raise_if_cancelled()
+            stream = await self.llm.generate_response(final_prompt, system_prompt=system_prompt, stream=True,
+                                                      profile=profile_for_intent(intent), cancel=cancel)
+            parts = []
             async for chunk, _ in stream:
-                 full_response += chunk
+                 parts.append(chunk)
                  yield chunk
+            cancel.raise_if_cancelled()  # the stream just ends when cancelled; this answer is partial
+            full_response = "".join(parts)
             
             # 5. Save Agent Response to memory
             self.memory.add_message("assistant", full_response)
+            if answer_cache_key and full_response.strip() and not is_error_response(full_response):
+                vector, chunk_ids, corpus_hash = answer_cache_key
+                self.answer_cache.store(user_query, vector, chunk_ids, full_response, corpus_hash)
             
             # 6. Disclaimer (Reduced)
-            yield "\n\n<span style='font-size:0.8em; color:gray'>Note: Cutoff data from official TNEA records. Predictions are AI estimates. Verify with colleges.</span>"
+            yield DISCLAIMER
 
     # Branch alias mapping
     BRANCH_ALIASES = {
@@ -540,147 +678,141 @@ Be comprehensive and detailed. This table will be used by the student for actual
 
     def _build_grounded_college_prompt(self, user_query: str, mark: float, categorized: dict, 
                                         location: str = None, branch: str = None,
-                                        rank: int = None, percentile: float = None, total_students: int = None) -> str:
-        """Builds a fully data-grounded prompt with rank info and next steps."""
-        
-        def format_entries(entries, sort_key="cutoff_mark", reverse=True, max_items=10):
-            sorted_e = sorted(entries, key=lambda x: x.get(sort_key, 0), reverse=reverse)
-            college_groups = {}
-            for e in sorted_e:
-                key = e.get('code')
-                if key not in college_groups:
-                    college_groups[key] = []
-                college_groups[key].append(e)
-            
-            lines = []
-            for code in list(college_groups.keys())[:max_items]:
-                for e in college_groups[code]:
-                    placement = e.get('placement', 'No Data')
-                    if placement in (None, 'N/A', 'No_Data', '-', ''):
-                        placement = 'No Data'
-                    seats = e.get('total_seats')
-                    seats_str = f" | Seats: {seats}" if seats else ""
-                    lines.append(f"- {e['name']} | Branch: {e['branch_name']} | Cutoff: {e['cutoff_mark']} | Placement: {placement}{seats_str} | District: {e['district']}")
-            return "\n".join(lines) if lines else "None found."
+                                        rank: int = None, percentile: float = None, total_students: int = None,
+                                        budget_tokens: int = None) -> str:
+        """Builds a fully data-grounded prompt with rank info and next steps, within `budget_tokens`."""
         
-        safe_data = format_entries(categorized.get("Safe", []), reverse=True)
-        moderate_data = format_entries(categorized.get("Moderate", []), reverse=True)
-        ambitious_data = format_entries(categorized.get("Ambitious", []), reverse=False)
+        def top_colleges(entries, reverse=True, max_items=10):
+            sorted_e = sorted(entries, key=lambda x: x.get("cutoff_mark", 0), reverse=reverse)
+            return group_by_college(sorted_e, max_items)
         
         location_str = f" in {location}" if location else " across Tamil Nadu"
         branch_str = f" for {branch} branch" if branch else ""
         rank_str = f"\nStudent Rank: ~{rank} (Percentile: {percentile}, Total Students: ~{total_students})" if rank else ""
         
-        return f"""The student asked: "{user_query}"
+        builder = PromptBuilder(budget_tokens, name="colleges")
+        builder.add_text(f"""The student asked: "{user_query}"
 Student's Cutoff Mark: {mark}{rank_str}
 Search: Colleges{location_str}{branch_str}
 
 Below is the REAL data from our TNEA database. You MUST ONLY reference colleges from the data below. NEVER invent colleges, cutoffs, or placement numbers.
-
-=== SAFE CHOICES (Cutoff below student's mark — high admission chance) ===
-{safe_data}
-
-=== MODERATE CHOICES (Cutoff close to student's mark — competitive) ===
-{moderate_data}
-
-=== AMBITIOUS CHOICES (Cutoff above student's mark — reach goals) ===
-{ambitious_data}
-
+{COMPACT_LEGEND}
+
+=== SAFE CHOICES (Cutoff below student's mark — high admission chance) ===""")
+        # Moderate options matter most, ambitious ones least (trimmed first)
+        builder.add_colleges(top_colleges(categorized.get("Safe", []), reverse=True), priority=2)
+        builder.add_text("\n=== MODERATE CHOICES (Cutoff close to student's mark — competitive) ===")
+        builder.add_colleges(top_colleges(categorized.get("Moderate", []), reverse=True), priority=1)
+        builder.add_text("\n=== AMBITIOUS CHOICES (Cutoff above student's mark — reach goals) ===")
+        builder.add_colleges(top_colleges(categorized.get("Ambitious", []), reverse=False), priority=3)
+        builder.add_text(f"""
 INSTRUCTIONS:
 1. **Focus on RANK** for context: Start by mentioning their estimated rank (~{rank}) to set expectations. Mention cutoff only as a reference.
 2. Present the top 10 best college options from ALL categories above. Prioritize Moderate and Safe choices with the highest cutoffs (most competitive colleges the student can realistically get).
 3. For EACH college, mention: college name, ALL eligible branches with cutoffs, placement % from the data (if available), and label it ✅ Safe / ⚖️ Moderate / 🚀 Ambitious.
 4. NEVER invent any data. Use EXACT numbers from above.
-5. For placement: ONLY quote the placement % shown in the data above. If placement says "No Data", say "Placement: Not verified" — DO NOT make up percentages or salary figures.
+5. For placement: ONLY quote the placement % shown in the data above. If a college has no placement figure, say "Placement: Not verified" — DO NOT make up percentages or salary figures.
 6. Keep descriptions to 1-2 lines per college.
 7. Avoid repetitive headers like "Based on your cutoff...". Be conversational.
-
-NEXT STEPS (Always include these at the end):
+""")
+        builder.add_text("""NEXT STEPS (Always include these at the end):
 After presenting colleges, suggest 3-4 specific, actionable next steps such as:
 - Which documents to prepare for counselling
 - Whether to explore specific branches they haven't considered
 - How to check placement records for shortlisted colleges  
 - When to register for TNEA counselling and key deadlines
 - Whether they should consider both government and aided colleges
-
-IMPORTANT: Always end your response with this exact question (on a new line):
+""", priority=4)
+        builder.add_text("""IMPORTANT: Always end your response with this exact question (on a new line):
 "📋 **Would you like me to generate a complete choice-filling priority table with all eligible colleges ranked in recommended order?**"
-"""
+""")
+        return builder.build()
+
+    def _build_choice_filling_prompt(self, mark: float, categorized: dict, predicted_rank: int, percentile,
+                                     branch: str = None, location: str = None, community: str = "OC",
+                                     budget_tokens: int = None, shown_table: str = None) -> str:
+        """
+        Choice-filling prompt over the same colleges as `shown_table` (already streamed to the
+        student), encoded compactly instead of repeating that markdown table, within `budget_tokens`.
+        """
+        safe_count = len(categorized.get("Safe", []))
+        mod_count = len(categorized.get("Moderate", []))
+        amb_count = len(categorized.get("Ambitious", []))
+        
+        builder = PromptBuilder(budget_tokens, name="choice_filling", baseline_data=shown_table)
+        builder.add_text(f"""Generate a COMPLETE CHOICE-FILLING PRIORITY TABLE for this TNEA student.
+
+Student Profile:
+- Cutoff Mark: {mark}
+- Predicted Rank: ~{predicted_rank}
+- Percentile: {percentile}
+- Preferred Branch: {branch or 'All branches'}
+- Location: {location or 'All Tamil Nadu'}
+- Community: {community}
+- Total eligible: {safe_count} Safe + {mod_count} Moderate + {amb_count} Ambitious colleges
+
+DATA AVAILABLE (top colleges per category):
+{COMPACT_LEGEND}""")
+        # Same order and cap as the table shown to the student; ambitious picks are trimmed first
+        trim_priority = {"Moderate": 1, "Safe": 2, "Ambitious": 3}
+        for category, colleges in categorized.items():
+            if not colleges:
+                continue
+            priority = trim_priority.get(category, 3)
+            builder.add_text(f"\n### {category} ({len(group_by_college(colleges))} colleges)")
+            builder.add_colleges(group_by_college(self.formatter.sort_category(category, colleges, mark), 10),
+                                 priority=priority)
+        builder.add_text("""
+GENERATE THE FOLLOWING:
+
+1. **CHOICE-FILLING PRIORITY TABLE** with 20-25 choices in recommended filling order:
+   | Priority | College Name | Branch | Cutoff | Placement (from DB) | Category | Strategy |
+   Include a mix: 3-4 Ambitious (dream picks), 8-10 Moderate (realistic targets), 8-10 Safe (backup/guaranteed).
+   For the Placement column: ONLY use the exact placement % from the DATA AVAILABLE section above. If a college has no placement figure there, write "Not verified" — NEVER make up placement percentages or salary figures.
+
+2. **FILLING STRATEGY**: 
+   - Why this specific order matters
+   - How sliding admission works (if you get allotted a lower choice, you can slide up in later rounds)
+   - When to use "Float" vs "Freeze" options
+
+3. **KEY TIPS**:
+   - What to do if you don't get allotted in Round 1
+   - Management quota vs counselling trade-offs
+   - Branch priority vs college tier trade-offs
+
+4. **PLACEMENT NOTE**: Only quote placement data from the data above. If a college has no placement figure, say "Not verified — check the official college website." DO NOT fabricate placement percentages, salary ranges, or recruiter names.
 
-    def _resolve_college_name(self, college_input: str) -> str:
+Be comprehensive and detailed. This table will be used by the student for actual TNEA choice filling. Use ONLY the exact data provided — never invent cutoff numbers, college names, or placement statistics.
+""")
+        return builder.build()
+
+    def _candidate_colleges(self, location: str = None) -> list:
+        """Colleges near `location`, or the whole catalogue when there is none (or nothing nearby)."""
+        nearby_colleges = self.geo_locator.find_nearby_colleges(location) if location else None
+        return nearby_colleges or self.data_engine.colleges
+
+    async def _resolve_college_name(self, college_input: str) -> str:
         """Resolves abbreviations or fuzzy names to full college names."""
         if not college_input:
             return None
             
         college_input = college_input.strip()
-        
-        # 1. Aliases Map
-        ALIASES = {
-            "CEG": "COLLEGE OF ENGINEERING GUINDY",
-            "GUINDY": "COLLEGE OF ENGINEERING GUINDY",
-            "MIT": "MADRAS INSTITUTE OF TECHNOLOGY",
-            "MIT CHROMEPET": "MADRAS INSTITUTE OF TECHNOLOGY",
-            "ANNA UNIVERSITY MAIN CAMPUS": "COLLEGE OF ENGINEERING GUINDY",
-            "ANNA UNIV MAIN": "COLLEGE OF ENGINEERING GUINDY",
-            "SSN": "SSN COLLEGE OF ENGINEERING",
-            "KCT": "KUMARAGURU COLLEGE OF TECHNOLOGY",
-            "KUMARAGURU": "KUMARAGURU COLLEGE OF TECHNOLOGY",
-            "PSG": "PSG COLLEGE OF TECHNOLOGY", # Careful, there's also PSG iTech
-            "PSG TECH": "PSG COLLEGE OF TECHNOLOGY",
-            "PSG ITECH": "PSG INSTITUTE OF TECHNOLOGY AND APPLIED RESEARCH",
-            "SKCET": "SRI KRISHNA COLLEGE OF ENGINEERING AND TECHNOLOGY",
-            "REC": "RAJALAKSHMI ENGINEERING COLLEGE",
-            "SVCE": "SRI VENKATESWARA COLLEGE OF ENGINEERING",
-            "CIT": "COIMBATORE INSTITUTE OF TECHNOLOGY", # Could specify Chennai/Coimbatore? usually CBE
-            "GCT": "GOVERNMENT COLLEGE OF TECHNOLOGY",
-            "GCE": "GOVERNMENT COLLEGE OF ENGINEERING",
-            "SAIRAM": "SRI SAIRAM ENGINEERING COLLEGE",
-            "RMK": "R.M.K. ENGINEERING COLLEGE",
-            "RMD": "R.M.D. ENGINEERING COLLEGE",
-            "ST JOSEPH": "ST. JOSEPH'S COLLEGE OF ENGINEERING",
-            "JEPPIAAR": "JEPPIAAR ENGINEERING COLLEGE",
-            "LOYOLA": "LOYOLA-ICAM COLLEGE OF ENGINEERING AND TECHNOLOGY",
-            "LICET": "LOYOLA-ICAM COLLEGE OF ENGINEERING AND TECHNOLOGY",
-            "MEPCO": "MEPCO SCHLENK ENGINEERING COLLEGE",
-            "KONGU": "KONGU ENGINEERING COLLEGE",
-            "BANNARI": "BANNARI AMMAN INSTITUTE OF TECHNOLOGY",
-            "BIT": "BANNARI AMMAN INSTITUTE OF TECHNOLOGY",
-            "SONA": "SONA COLLEGE OF TECHNOLOGY",
-            "VELAMMAL": "VELAMMAL ENGINEERING COLLEGE",
-            "EASWARI": "EASWARI ENGINEERING COLLEGE",
-            "PANIMALAR": "PANIMALAR ENGINEERING COLLEGE",
-            "SAVITHA": "SAVEETHA ENGINEERING COLLEGE",
-            "SAVEETHA": "SAVEETHA ENGINEERING COLLEGE",
-        }
-        
-        upper_input = college_input.upper()
-        if upper_input in ALIASES:
-            return ALIASES[upper_input]
-
-        # 1.5 Semantic Search for Resolution
-        results = self.embedding_search.search(college_input, top_k=1, threshold=0.6)
-        if results:
-            return results[0][0].get('name')
-            
-        # 2. Fuzzy Match against known Aliases
-        match = difflib.get_close_matches(upper_input, ALIASES.keys(), n=1, cutoff=0.8)
-        if match:
-            return ALIASES[match[0]]
-            
-        # 3. Fuzzy match against all known college names in DB
-        all_names = [c.get('name', '').upper() for c in self.data_engine.colleges]
-        match = difflib.get_close_matches(upper_input, all_names, n=1, cutoff=0.7)
-        if match:
-            return match[0]
+
+        # 1-3. Exact/alias hash, lexical trigram index, then embeddings (see ai/college_resolver.py).
+        # The semantic stage encodes the query (loading the model on first use): keep it off the loop
+        resolved = await asyncio.to_thread(self.college_resolver.resolve, college_input)
+        if resolved:
+            return resolved["name"]
 
         # 4. LLM Fallback (Simulation of "Web Search" / Reasoning)
+        metrics.incr("resolver.llm_fallback")
         try:
             prompt = f"""Identify the specific Tamil Nadu engineering college referred to by: "{college_input}".
             Return ONLY the full official name of the college. If unsure or if it's not a college, return "UNKNOWN"."""
             
-            response, _ = self.llm.generate_response(prompt, max_tokens=50)
+            response, _ = await self.llm.generate_response(prompt, profile="resolver")
             cleaned = response.strip().replace('"', '').replace('.', '')
-            if "UNKNOWN" not in cleaned and len(cleaned) > 5:
+            if not is_error_response(response) and "UNKNOWN" not in cleaned and len(cleaned) > 5:
                  return cleaned
         except Exception:
             pass
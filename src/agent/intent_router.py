@@ -27,6 +27,26 @@ TN_DISTRICTS = [
     "CHENGALPATTU", "TENKASI", "MAYILADUTHURAI", "HOSUR", "AMBUR",
 ]
 
+# Intents scored by the local classifier
+LOCAL_INTENTS = ("PREDICT_PERCENTILE", "SUGGEST_COLLEGES", "CHOICE_FILLING", "CAREER_PLANNING",
+                 "SKILL_GUIDANCE", "TREND_ANALYSIS", "GUIDANCE")
+
+# LLM router labels (ai/prompts.py INTENT_ROUTER_PROMPT) -> internal intents
+LLM_INTENT_MAP = {
+    "RANK_PREDICTION": "PREDICT_PERCENTILE",
+    "COLLEGE_SUGGESTION": "SUGGEST_COLLEGES",
+    "LOCATION_FILTER": "SUGGEST_COLLEGES",
+    "MANAGEMENT_QUOTA": "CHECK_VACANCY",
+    "PROCESS_GUIDANCE": "GUIDANCE",
+    "GREETING": "GREETING",
+    "CHOICE_FILLING": "CHOICE_FILLING",
+    "CAREER_PLANNING": "CAREER_PLANNING",
+    "SKILL_GUIDANCE": "SKILL_GUIDANCE",
+}
+
+# Every intent route_query can return that is answered by the LLM (OFF_TOPIC never is)
+ROUTED_INTENTS = set(LOCAL_INTENTS) | set(LLM_INTENT_MAP.values()) | {"GREETING", "GENERAL_QUERY"}
+
 
 class IntentRouter:
     """Classifies user queries into specific intents using local rules + AI fallback."""
@@ -34,43 +54,51 @@ class IntentRouter:
     def __init__(self):
         self.llm = LLMClient()
     
+    async def route_query_async(self, query: str, history: list = None, user_profile: dict = None) -> Tuple[str, Dict[str, Any]]:
+        """Routes the query. Tries local classification first, falls back to LLM (awaited)."""
+        routed = self._route_locally(query, history, user_profile)
+        if routed is not None:
+            return routed
+        try:
+            analysis = await self.route_with_llm(query, history)
+        except Exception as e:
+            return self._llm_route_failed(query, e)
+        return self._map_llm_analysis(query, analysis)
+
     def route_query(self, query: str, history: list = None, user_profile: dict = None) -> Tuple[str, Dict[str, Any]]:
-        """Routes the query. Tries local classification first, falls back to LLM."""
-        
-        # 1. Try local classification (fast, free)
+        """Blocking facade of route_query_async for scripts; blocks the calling thread on the LLM."""
+        routed = self._route_locally(query, history, user_profile)
+        if routed is not None:
+            return routed
+        try:
+            analysis = self.route_with_llm_sync(query, history)
+        except Exception as e:
+            return self._llm_route_failed(query, e)
+        return self._map_llm_analysis(query, analysis)
+
+    def _route_locally(self, query: str, history: list = None, user_profile: dict = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Step 1 of both routing paths: local classification (fast, free); None means ask the LLM (slow, costs API)."""
         local_result = self._local_classify(query, history, user_profile)
         if local_result is not None:
             intent, entities = local_result
             logger.info(f"Local classification: intent={intent}, entities={entities}")
             return intent, entities
-        
-        # 2. Fall back to LLM classification (slow, costs API)
         logger.info(f"Local classification inconclusive, using LLM for: {query[:80]}")
-        try:
-            analysis = self.route_with_llm(query, history)
-        except Exception as e:
-            logger.error(f"LLM Routing Error: {e}")
-            return self._fallback_route(query)
-        
+        return None
+
+    def _llm_route_failed(self, query: str, error: Exception) -> Tuple[str, Dict[str, Any]]:
+        logger.error(f"LLM Routing Error: {error}")
+        return self._fallback_route(query)
+
+    def _map_llm_analysis(self, query: str, analysis: dict) -> Tuple[str, Dict[str, Any]]:
+        """Maps the LLM's JSON classification to internal intents and cleaned entities."""
         if analysis.get("is_off_topic", False):
             return "OFF_TOPIC", {}
         
         intent = analysis.get("intent", "GENERAL_QUERY").upper()
         entities = analysis.get("entities", {})
         
-        mapping = {
-            "RANK_PREDICTION": "PREDICT_PERCENTILE",
-            "COLLEGE_SUGGESTION": "SUGGEST_COLLEGES",
-            "LOCATION_FILTER": "SUGGEST_COLLEGES",
-            "MANAGEMENT_QUOTA": "CHECK_VACANCY",
-            "PROCESS_GUIDANCE": "GUIDANCE",
-            "GREETING": "GREETING",
-            "CHOICE_FILLING": "CHOICE_FILLING",
-            "CAREER_PLANNING": "CAREER_PLANNING",
-            "SKILL_GUIDANCE": "SKILL_GUIDANCE",
-        }
-        
-        internal_intent = mapping.get(intent, intent)
+        internal_intent = LLM_INTENT_MAP.get(intent, intent)
         cleaned_entities = {k: v for k, v in entities.items() if v is not None}
         
         college_intents = {"SUGGEST_COLLEGES", "CHOICE_FILLING", "PREDICT_PERCENTILE"}
@@ -152,15 +180,7 @@ class IntentRouter:
             return "OFF_TOPIC", {}
         
         # Score-based classification
-        scores = {
-            "PREDICT_PERCENTILE": 0,
-            "SUGGEST_COLLEGES": 0,
-            "CHOICE_FILLING": 0,
-            "CAREER_PLANNING": 0,
-            "SKILL_GUIDANCE": 0,
-            "TREND_ANALYSIS": 0,
-            "GUIDANCE": 0,
-        }
+        scores = dict.fromkeys(LOCAL_INTENTS, 0)
         
         # Prediction keywords
         pred_kw = ["predict", "rank", "percentile", "what rank", "my rank", "estimate", "expected rank"]
@@ -253,13 +273,13 @@ class IntentRouter:
         
         raise ValueError("No valid JSON found in response")
 
-    def route_with_llm(self, query: str, history: list = None) -> dict:
-        """Uses LLM to classify intent."""
+    @staticmethod
+    def _routing_prompt(query: str, history: list = None) -> str:
         context = ""
         if history:
             context = "\n".join([f"{m['role']}: {m['content']}" for m in history[-3:]])
         
-        prompt = f"""### History:
+        return f"""### History:
 {context}
 
 ### User Query:
@@ -267,8 +287,16 @@ class IntentRouter:
 
 Analyze the query and provide the JSON output as specified in system instructions.
 Ensure strict JSON format."""
-        
-        response, _ = self.llm.generate_response(prompt, system_prompt=INTENT_ROUTER_PROMPT)
+
+    async def route_with_llm(self, query: str, history: list = None) -> dict:
+        """Uses LLM to classify intent."""
+        response, _ = await self.llm.generate_response(self._routing_prompt(query, history), system_prompt=INTENT_ROUTER_PROMPT,
+                                                       profile="routing")
+        return self.extract_json(response)
+
+    def route_with_llm_sync(self, query: str, history: list = None) -> dict:
+        response, _ = self.llm.generate_response_sync(self._routing_prompt(query, history), system_prompt=INTENT_ROUTER_PROMPT,
+                                                      profile="routing")
         return self.extract_json(response)
 
     def _fallback_route(self, query: str) -> Tuple[str, Dict[str, Any]]:
@@ -0,0 +1,158 @@
+"""
+Semantic answer cache for guidance / FAQ questions.
+
+A generated answer is reused when a new question
+  - embeds within ANSWER_CACHE_MIN_SIMILARITY (cosine) of a cached question, and
+  - retrieves exactly the same guideline chunks, and
+  - was answered against the same guidelines file (corpus hash).
+The chunk check keeps paraphrases that are close in embedding space but about a
+different rule ("fee for SC" vs "fee for BC") from sharing an answer.
+
+Entries are bucketed by their chunk-id set, so a lookup only compares against the
+handful of questions that retrieved the same context.
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from config import config
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.ai.answer_cache")
+
+
+class _Entry(NamedTuple):
+    question: str
+    vector: np.ndarray
+    context_key: Tuple[str, ...]
+    answer: str
+    expires_at: float
+
+
+class SemanticAnswerCache:
+    """Process-wide LRU of (question embedding, retrieved chunk ids) -> answer, with a TTL."""
+
+    def __init__(self, max_entries: int = None, ttl_s: float = None, min_similarity: float = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = config.ANSWER_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl_s = config.ANSWER_CACHE_TTL_S if ttl_s is None else ttl_s
+        self.min_similarity = config.ANSWER_CACHE_MIN_SIMILARITY if min_similarity is None else min_similarity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_context: Dict[Tuple[str, ...], List[int]] = {}
+        self._next_id = itertools.count()
+        self.corpus_hash: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _context_key(chunk_ids: Iterable[str]) -> Tuple[str, ...]:
+        # Order-insensitive: a reranker swapping two chunks does not change the context
+        return tuple(sorted(chunk_ids))
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _check_corpus(self, corpus_hash: Optional[str]):
+        """Drops everything when the guidelines changed (call with the lock held)."""
+        if corpus_hash != self.corpus_hash:
+            if self._entries:
+                logger.info(f"Guidelines changed, dropping {len(self._entries)} cached answer(s)")
+                self.invalidations += 1
+                metrics.incr("answer_cache.invalidations")
+            self._entries.clear()
+            self._by_context.clear()
+            self.corpus_hash = corpus_hash
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        bucket = self._by_context[entry.context_key]
+        bucket.remove(entry_id)
+        if not bucket:
+            del self._by_context[entry.context_key]
+
+    def lookup(self, vector, chunk_ids: Iterable[str], corpus_hash: Optional[str]) -> Optional[str]:
+        """The cached answer for a matching question, or None."""
+        if not self.enabled:
+            return None
+        query = self._normalize(vector)
+        context_key = self._context_key(chunk_ids)
+        now = self._clock()
+
+        with self._lock:
+            self._check_corpus(corpus_hash)
+            best_id, best_score = None, self.min_similarity
+            for entry_id in list(self._by_context.get(context_key, ())):
+                entry = self._entries[entry_id]
+                if entry.expires_at <= now:
+                    self._remove(entry_id)
+                    metrics.incr("answer_cache.expired")
+                    continue
+                score = float(entry.vector @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                metrics.incr("answer_cache.misses")
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            entry = self._entries[best_id]
+
+        metrics.incr("answer_cache.hits")
+        metrics.observe("answer_cache.hit_similarity", best_score)
+        logger.info(f"Answer cache hit ({best_score:.3f}) for question like '{entry.question[:60]}'")
+        return entry.answer
+
+    def store(self, question: str, vector, chunk_ids: Iterable[str], answer: str, corpus_hash: Optional[str]):
+        if not self.enabled or not answer:
+            return
+        entry = _Entry(question, self._normalize(vector), self._context_key(chunk_ids), answer,
+                       self._clock() + self.ttl_s)
+        entry.vector.setflags(write=False)
+        with self._lock:
+            self._check_corpus(corpus_hash)
+            entry_id = next(self._next_id)
+            self._entries[entry_id] = entry
+            self._by_context.setdefault(entry.context_key, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+            self.corpus_hash = None
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+
+# Shared across sessions: guidance answers do not depend on the student's profile
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,325 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import config
+from ai.college_resolver import display_name
+from ai.embedding_cache import EmbeddingDiskCache, query_embedding_cache
+from ai.embedding_search import top_k_scores
+from ai.model_provider import EmbeddingModelProvider
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.ai.branch_index")
+
+COMMUNITIES = ["OC", "BC", "BCM", "MBC", "SC", "SCA", "ST"]
+
+
+def _placement_pct(value) -> float:
+    try:
+        return float(str(value).strip().rstrip("%"))
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def build_branch_documents(colleges: List[Dict[str, Any]], predictions: List[Dict[str, Any]],
+                           cutoffs: Dict[tuple, Dict] = None) -> List[Dict[str, Any]]:
+    """
+    One document per college x branch offered, with attributes attached.
+
+    `predictions` are predictions.json rows (one per community); they are folded into a
+    per-community `percentiles` dict. `cutoffs` is DataEngine.get_latest_branch_cutoffs()
+    and adds the latest official cutoff marks when the SQLite DB is available.
+    """
+    cutoffs = cutoffs or {}
+    by_code = {str(c.get("code")): c for c in colleges}
+    docs: Dict[tuple, Dict[str, Any]] = {}
+
+    def add(college_code: str, branch_code: str, branch_name: str) -> Optional[Dict[str, Any]]:
+        key = (college_code, branch_code)
+        if key in docs:
+            return docs[key]
+        college = by_code.get(college_code)
+        if college is None:
+            return None
+        hostel = str(college.get("hostel_boys", "")).lower() in ("permanent", "rental") or \
+            str(college.get("hostel_girls", "")).lower() in ("permanent", "rental")
+        docs[key] = {
+            "college_code": college_code,
+            "college_name": college.get("name", ""),
+            "branch_code": branch_code,
+            "branch_name": " ".join(str(branch_name).split()),
+            "district": college.get("district", ""),
+            "hostel": hostel,
+            "autonomous": college.get("autonomous") == "Autonomous",
+            "placement": college.get("placement", "N/A"),
+            "percentiles": {},
+            "cutoffs": {},
+            "year": None,
+        }
+        return docs[key]
+
+    for row in predictions:
+        doc = add(str(row.get("college_code")), row.get("branch_code", ""), row.get("branch_name", ""))
+        if doc is not None and row.get("predicted_percentile") is not None:
+            doc["percentiles"][row.get("community", "OC")] = float(row["predicted_percentile"])
+
+    for (college_code, branch_code), info in cutoffs.items():
+        doc = add(str(college_code), branch_code, info.get("branch_name", ""))
+        if doc is not None:
+            doc["cutoffs"] = {k: v for k, v in info.get("cutoffs", {}).items() if v is not None}
+            doc["year"] = info.get("year")
+
+    return sorted(docs.values(), key=lambda d: (int(d["college_code"]) if d["college_code"].isdigit() else 0, d["branch_code"]))
+
+
+def branch_search_texts(docs: List[Dict[str, Any]]) -> List[str]:
+    """Strings that get embedded, e.g. "Computer Science And Engineering (CS) at PSG College of Technology, Coimbatore district. Hostel."""
+    texts = []
+    for d in docs:
+        extras = []
+        if d["hostel"]:
+            extras.append("Hostel")
+        if d["autonomous"]:
+            extras.append("Autonomous")
+        texts.append(f"{d['branch_name'].title()} ({d['branch_code']}) at {display_name(d['college_name'])}, "
+                     f"{str(d['district']).title()} district. {'. '.join(extras)}".strip())
+    return texts
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest neighbour index over L2-normalized vectors (NumPy only).
+
+    Vectors are clustered with spherical k-means into `n_lists` lists; a query scores the
+    centroids, then only the vectors of its `nprobe` closest lists. nprobe == n_lists is exact.
+    Vectors are stored grouped by list, so each probed list is one contiguous slice.
+    """
+
+    def __init__(self, n_lists: int = None, nprobe: int = 8, iterations: int = 10, seed: int = 0):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.vectors = None   # (n, dim), grouped by list
+        self.ids = None       # original row of each stored vector
+        self.offsets = None   # list i is vectors[offsets[i]:offsets[i + 1]]
+
+    def __len__(self) -> int:
+        return 0 if self.ids is None else len(self.ids)
+
+    def build(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        n = len(vectors)
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(n, n_lists, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            counts = np.bincount(assign, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty lists with random vectors so every list stays in use
+                sums[empty] = vectors[rng.choice(n, int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        self.centroids = centroids
+        self.vectors = vectors[order]
+        self.ids = order
+        self.offsets = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        self.n_lists = n_lists
+
+    def search(self, queries: np.ndarray, top_k: int, nprobe: int = None,
+               mask: np.ndarray = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Returns one (row_ids, scores) pair per query, best first.
+        `mask` is a boolean array over the original rows; only True rows are returned.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        probe_lists, _ = top_k_scores(queries @ self.centroids.T, nprobe)
+
+        results = []
+        for q, lists in zip(queries, probe_lists):
+            # Each list is a contiguous slice: score slices, no gather of the vectors
+            scores = np.concatenate([self.vectors[self.offsets[i]:self.offsets[i + 1]] @ q for i in lists])
+            ids = np.concatenate([self.ids[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+            if mask is not None:
+                keep = mask[ids]
+                scores, ids = scores[keep], ids[keep]
+            top, top_scores = top_k_scores(scores[None, :], top_k)
+            results.append((ids[top[0]], top_scores[0]))
+        return results
+
+    def search_exact(self, queries: np.ndarray, top_k: int, mask: np.ndarray = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Brute-force search over every (masked) vector; the recall reference."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if mask is None:
+            top, top_scores = top_k_scores(queries @ self.vectors.T, top_k)
+            return [(self.ids[t], s) for t, s in zip(top, top_scores)]
+        rows = np.flatnonzero(mask[self.ids])
+        top, top_scores = top_k_scores(queries @ self.vectors[rows].T, top_k)
+        return [(self.ids[rows[t]], s) for t, s in zip(top, top_scores)]
+
+
+class BranchSearch:
+    """
+    Semantic search over college x branch documents ("good CSE college near Coimbatore with hostel").
+
+    Documents come from predictions.json (and SQLite cutoffs when available); attribute
+    columns (district, hostel, per-community percentiles, ...) are kept as NumPy arrays and
+    applied as a mask during the search. Corpora up to BRANCH_INDEX_EXACT_BELOW documents are
+    searched exactly and stored as a single list, without clustering: IVF is off for the ~3.5k
+    TNEA documents (brute force takes about a millisecond, and the probe loses recall there)
+    and only serves larger corpora. The index is built on first search, so the embedding model
+    is still only loaded when something actually needs it.
+    """
+    _instance = None
+
+    # Filters selecting at most this many rows are brute-forced: exact and cheaper than probing
+    BRUTE_FORCE_BELOW = 1024
+    # A failed build is retried by a later search, at most this often
+    RETRY_AFTER_S = 60.0
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(BranchSearch, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.provider = EmbeddingModelProvider()
+        # Separate directory: EmbeddingDiskCache instances must not share files
+        self.disk_cache = EmbeddingDiskCache(self.provider.cache_namespace, cache_dir=config.EMBEDDING_CACHE_DIR / "branches")
+        self.docs: List[Dict[str, Any]] = []
+        self.index: Optional[IVFIndex] = None
+        self.columns: Dict[str, np.ndarray] = {}
+        self._pending = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._initialized = True
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def set_source(self, load_documents: Callable[[], List[Dict[str, Any]]]):
+        """Registers a loader for the documents; they are loaded and indexed lazily on first search."""
+        self._pending = load_documents
+
+    def index_documents(self, docs: List[Dict[str, Any]]):
+        """Encodes (or loads from the disk cache) and indexes the given documents."""
+        if not self.provider.available or not docs:
+            return
+        start_time = time.perf_counter()
+        try:
+            embeddings = self.disk_cache.get_or_encode(branch_search_texts(docs), self.provider.encode)
+        except Exception as e:
+            logger.error(f"Failed to index branches: {e}")
+            return
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        # Exact-search corpora get one list: no k-means at build time, and any probe is exact
+        n_lists = 1 if len(docs) <= config.BRANCH_INDEX_EXACT_BELOW else config.BRANCH_INDEX_NLIST or None
+        index = IVFIndex(n_lists=n_lists, nprobe=config.BRANCH_INDEX_NPROBE)
+        index.build(embeddings / np.maximum(norms, 1e-12))
+
+        self.columns = {
+            "college_code": np.array([d["college_code"] for d in docs]),
+            "branch_code": np.array([d["branch_code"] for d in docs]),
+            "district": np.array([str(d["district"]).upper() for d in docs]),
+            "hostel": np.array([d["hostel"] for d in docs], dtype=bool),
+            "autonomous": np.array([d["autonomous"] for d in docs], dtype=bool),
+            "placement": np.array([_placement_pct(d["placement"]) for d in docs], dtype=np.float32),
+        }
+        for community in COMMUNITIES:
+            self.columns[f"percentile_{community}"] = np.array(
+                [d["percentiles"].get(community, np.nan) for d in docs], dtype=np.float32)
+        self.docs = docs
+        self.index = index
+        logger.info(f"Indexed {len(docs)} college-branch documents in {index.n_lists} lists "
+                    f"in {time.perf_counter() - start_time:.2f}s")
+
+    def _ensure_index(self) -> bool:
+        if self.index is None and self._pending is not None and time.monotonic() >= self._retry_at:
+            with self._lock:
+                if self.index is None and self._pending is not None and time.monotonic() >= self._retry_at:
+                    try:
+                        docs = self._pending()
+                        self.index_documents(docs)
+                    except Exception as e:
+                        docs = None
+                        logger.error(f"Failed to build branch index: {e}")
+                    if self.index is not None or docs == []:
+                        self._pending = None
+                    else:
+                        # Keep the loader: a later search retries instead of failing for good
+                        self._retry_at = time.monotonic() + self.RETRY_AFTER_S
+                        metrics.incr("branch_index.build_failed")
+        return self.index is not None
+
+    def filter_mask(self, district: str = None, college_codes: Iterable = None, branch_codes: Iterable = None,
+                    hostel: bool = None, autonomous: bool = None, community: str = None,
+                    max_percentile: float = None, min_placement: float = None) -> Optional[np.ndarray]:
+        """
+        Boolean row mask from attribute filters (None = no filtering).
+        `max_percentile` keeps rows whose predicted closing percentile for `community` is at most the value.
+        """
+        mask = np.ones(len(self.docs), dtype=bool)
+        if district:
+            mask &= np.char.find(self.columns["district"], district.upper()) >= 0
+        if college_codes is not None:
+            mask &= np.isin(self.columns["college_code"], [str(c) for c in college_codes])
+        if branch_codes is not None:
+            mask &= np.isin(self.columns["branch_code"], list(branch_codes))
+        if hostel is not None:
+            mask &= self.columns["hostel"] == hostel
+        if autonomous is not None:
+            mask &= self.columns["autonomous"] == autonomous
+        if max_percentile is not None:
+            column = self.columns.get(f"percentile_{(community or 'OC').upper()}", self.columns["percentile_OC"])
+            mask &= column <= max_percentile  # NaN (no prediction) compares False
+        if min_placement is not None:
+            mask &= self.columns["placement"] >= min_placement
+        return None if mask.all() else mask
+
+    def search(self, query: str, top_k: int = 10, threshold: float = 0.2, nprobe: int = None,
+               **filters) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Returns [(document, score)] best first. Keyword filters are those of `filter_mask`.
+        `nprobe` overrides BRANCH_INDEX_NPROBE; it has no effect below BRANCH_INDEX_EXACT_BELOW
+        documents, where the index is a single list.
+        """
+        if not self.provider.available or not self._ensure_index():
+            return []
+        start_time = time.perf_counter()
+        try:
+            query_vec = query_embedding_cache.get_or_encode([query], self.provider.encode, namespace=self.provider.cache_namespace)
+        except Exception as e:
+            logger.error(f"Branch search failed: {e}")
+            return []
+
+        mask = self.filter_mask(**filters)
+        if mask is not None and not mask.any():
+            return []
+        if self.index.n_lists == 1 or (mask is not None and mask.sum() <= self.BRUTE_FORCE_BELOW):
+            rows, scores = self.index.search_exact(query_vec, top_k, mask=mask)[0]
+        else:
+            nprobe = nprobe or self.index.nprobe
+            rows, scores = self.index.search(query_vec, top_k, nprobe=nprobe, mask=mask)[0]
+            # A selective filter can leave the probed lists short of top_k; widen the probe
+            while len(rows) < top_k and nprobe < self.index.n_lists:
+                nprobe *= 2
+                rows, scores = self.index.search(query_vec, top_k, nprobe=nprobe, mask=mask)[0]
+        metrics.observe("branch_index.search_s", time.perf_counter() - start_time)
+        return [(self.docs[r], float(s)) for r, s in zip(rows, scores) if s >= threshold]
@@ -0,0 +1,325 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.ai.resolver")
+
+# Words ignored when building acronyms ("College of Engineering Guindy" -> "CEG")
+ACRONYM_STOPWORDS = {"OF", "AND", "THE", "FOR", "&", "IN", "AT"}
+# Words that end the distinctive prefix of a name ("Sri Sivasubramaniya Nadar College ..." -> "SSN")
+GENERIC_NAME_WORDS = {"COLLEGE", "INSTITUTE", "UNIVERSITY", "ENGINEERING", "SCHOOL", "POLYTECHNIC"}
+
+
+def normalize_key(text: str) -> str:
+    """
+    Canonical form for exact lookups: upper case, punctuation removed, runs of
+    single letters joined ("R.M.K." / "R M K" -> "RMK"), whitespace collapsed.
+    """
+    if not text:
+        return ""
+    text = text.upper().replace(".", " ").replace("'", "")
+    tokens = re.sub(r"[^A-Z0-9&]+", " ", text).split()
+    merged, letters = [], []
+    for tok in tokens:
+        if len(tok) == 1 and tok.isalpha():
+            letters.append(tok)
+            continue
+        if letters:
+            merged.append("".join(letters))
+            letters = []
+        merged.append(tok)
+    if letters:
+        merged.append("".join(letters))
+    return " ".join(merged)
+
+
+def short_name(name: str) -> str:
+    """College name without address or "(Autonomous)": text before the first comma."""
+    head = name.split(",")[0]
+    return re.sub(r"\([^)]*\)", " ", head).strip()
+
+
+def display_name(name: str) -> str:
+    """Short name plus the campus for multi-campus names ("... Anna University, Chennai - CEG Campus")."""
+    parts = name.split(",")
+    if len(parts) > 1 and "CAMPUS" in parts[1].upper():
+        return f"{short_name(name)}, {parts[1].strip()}"
+    return short_name(name)
+
+
+def _acronyms(name: str) -> List[str]:
+    """Candidate acronyms: initials of all significant words, and of the words before the first generic word."""
+    words = [w for w in normalize_key(short_name(name)).split() if w not in ACRONYM_STOPWORDS]
+    if len(words) < 2:
+        return []
+    full = "".join(w[0] for w in words if w.isalpha())
+    result = [full] if len(full) >= 3 else []
+    prefix = []
+    for w in words:
+        if w in GENERIC_NAME_WORDS:
+            break
+        prefix.append(w[0])
+    if 2 <= len(prefix) < len(words) and len(prefix) >= 3:
+        result.append("".join(prefix))
+    return result
+
+
+def _trigrams(text: str) -> Counter:
+    # Spaces are dropped so "Sai Ram" / "SAIRAM" and "R M K" / "RMK" share trigrams
+    padded = f" {normalize_key(text).replace(' ', '').lower()} "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class _TrigramIndex:
+    """TF-IDF weighted character-trigram index with cosine scoring (typo tolerant)."""
+
+    def __init__(self, docs: List[Tuple[str, Any]]):
+        self.targets = [target for _, target in docs]
+        grams = [_trigrams(text) for text, _ in docs]
+        n = len(docs)
+        df = Counter(g for doc in grams for g in doc)
+        self.vocab = {g: i for i, g in enumerate(df)}
+        self.idf = np.array([math.log(1 + n / df[g]) for g in self.vocab], dtype=np.float32)
+        self.unseen_idf = math.log(1 + n)
+
+        rows, cols, vals = [], [], []
+        for doc_id, doc in enumerate(grams):
+            for g, tf in doc.items():
+                rows.append(doc_id)
+                cols.append(self.vocab[g])
+                vals.append(tf)
+        matrix = sparse.csr_matrix((vals, (rows, cols)), shape=(n, len(self.vocab)), dtype=np.float32)
+        matrix = matrix.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        # Rows pre-divided by their norm, so one sparse mat-vec gives the cosine numerators
+        self.matrix = sparse.diags(1.0 / np.maximum(norms, 1e-12)).dot(matrix).tocsc()  # column slices per query
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[Any, float]]:
+        """Best `limit` matching docs as (target, cosine), best first."""
+        q = _trigrams(query)
+        cols, vals = [], []
+        q_norm = 0.0
+        for g, tf in q.items():
+            col = self.vocab.get(g)
+            weight = tf * (self.idf[col] if col is not None else self.unseen_idf)
+            q_norm += weight * weight
+            if col is not None:
+                cols.append(col)
+                vals.append(weight)
+        if not cols:
+            return []
+        scores = self.matrix[:, cols].dot(np.asarray(vals, dtype=np.float32)) / math.sqrt(q_norm)
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[scores[top] > 0]
+        order = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.targets[d], float(scores[d])) for d in order]
+
+
+class CollegeResolver:
+    """
+    Resolves abbreviations, aliases and misspelt college names to catalogue colleges.
+
+    Built once per process. Stages, cheapest first:
+      1. exact hash of normalized names, explicit aliases and unique auto-acronyms (~µs)
+      2. character-trigram lexical index; a confident, unambiguous hit returns without the model
+      3. embedding search, fused with the lexical scores
+    Returns None when nothing is confident, so the caller can fall back to the LLM.
+    """
+    _instance = None
+
+    LEXICAL_ACCEPT = 0.85      # lexical-only fast path
+    LEXICAL_MARGIN = 0.10      # ...and this far ahead of the runner-up college
+    LEXICAL_SOLO = 0.75        # accepted on its own after fusion (old difflib cutoff ~0.7-0.8)
+    SEMANTIC_SOLO = 0.60       # accepted on its own after fusion (old semantic threshold)
+    FUSED_ACCEPT = 0.45
+    LEXICAL_WEIGHT = 0.5
+    ALIAS_TARGET_ACCEPT = 0.75  # build-time lexical match of an alias's full name to a college
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CollegeResolver, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._lock = threading.Lock()
+        self.colleges: List[Dict[str, Any]] = []
+        self.embedding_search = None
+        self._source = None
+        self._exact: Dict[str, Tuple[Any, str]] = {}
+        self._index_of: Dict[str, int] = {}  # college code -> catalogue row, to map semantic hits
+        self._lexical: Optional[_TrigramIndex] = None
+        self._resolved_aliases: Dict[str, str] = {}
+        self._initialized = True
+
+    def index_colleges(self, colleges: List[Dict[str, Any]], aliases: Dict[str, str] = None, embedding_search=None):
+        """Builds the exact and lexical indexes. A no-op if the same catalogue is already indexed."""
+        aliases = aliases or {}
+        with self._lock:
+            self.embedding_search = embedding_search or self.embedding_search
+            if self._source is not None and self._source == (id(colleges), len(colleges), tuple(sorted(aliases.items()))):
+                return
+
+            start_time = time.perf_counter()
+            exact: Dict[str, Optional[int]] = {}
+
+            def add_exact(key: str, idx: int):
+                if not key:
+                    return
+                # Keys shared by several colleges are ambiguous and left to the later stages
+                exact[key] = idx if exact.get(key, idx) == idx else None
+
+            lexical_docs = []
+            for idx, college in enumerate(colleges):
+                name = college.get("name", "")
+                add_exact(normalize_key(name), idx)
+                add_exact(normalize_key(short_name(name)), idx)
+                add_exact(str(college.get("code", "")), idx)
+                lexical_docs.append((short_name(name), idx))
+                # Multi-campus names put the distinctive part after the first comma ("..., Chennai - CEG Campus")
+                if display_name(name) != short_name(name):
+                    lexical_docs.append((display_name(name), idx))
+
+            acronym_counts = Counter(a for c in colleges for a in set(_acronyms(c.get("name", ""))))
+            for idx, college in enumerate(colleges):
+                for acronym in _acronyms(college.get("name", "")):
+                    if acronym_counts[acronym] == 1 and acronym not in exact:
+                        exact[acronym] = idx
+
+            college_lexical = _TrigramIndex(lexical_docs)
+            self._exact = {k: (v, "exact") for k, v in exact.items() if v is not None}
+
+            # Explicit aliases win over generated keys; pin each to a catalogue college where possible
+            self._resolved_aliases = {}
+            pinned = {}
+            for alias, full_name in aliases.items():
+                idx = self._match_alias_target(alias, full_name, colleges, college_lexical)
+                if idx is not None:
+                    pinned[normalize_key(full_name)] = idx
+            for alias, full_name in aliases.items():
+                # Aliases sharing a full name share the pin ("GUINDY" follows "CEG")
+                idx = pinned.get(normalize_key(full_name))
+                target = idx if idx is not None else full_name
+                self._exact[normalize_key(alias)] = (target, "alias")
+                lexical_docs.append((alias, target))
+                if idx is not None:
+                    self._resolved_aliases[alias] = colleges[idx].get("name", full_name)
+
+            self._lexical = _TrigramIndex(lexical_docs)
+            self.colleges = colleges
+            self._index_of = {str(c.get("code")): i for i, c in enumerate(colleges)}
+            self._source = (id(colleges), len(colleges), tuple(sorted(aliases.items())))
+            logger.info(f"College resolver indexed {len(colleges)} colleges, {len(self._exact)} exact keys "
+                        f"in {(time.perf_counter() - start_time) * 1000:.1f}ms "
+                        f"({len(self._resolved_aliases)}/{len(aliases)} aliases pinned)")
+
+    def _match_alias_target(self, alias: str, full_name: str, colleges, lexical: _TrigramIndex) -> Optional[int]:
+        """Finds the catalogue college an alias refers to, or None if unsure."""
+        key = normalize_key(full_name)
+        if key in self._exact and isinstance(self._exact[key][0], int):
+            return self._exact[key][0]
+        alias_key = normalize_key(alias)
+        if alias_key in self._exact and isinstance(self._exact[alias_key][0], int):
+            return self._exact[alias_key][0]
+        # Alias as a standalone word of exactly one name ("MIT" -> "... - MIT Campus, Chrompet")
+        pattern = re.compile(rf"\b{re.escape(alias_key)}\b")
+        hits = [i for i, c in enumerate(colleges) if pattern.search(normalize_key(c.get("name", "")))]
+        if len(hits) == 1:
+            return hits[0]
+        ranked = self._best_per_college(lexical.search(full_name))
+        if ranked and ranked[0][1] >= self.ALIAS_TARGET_ACCEPT and (len(ranked) == 1 or ranked[0][1] - ranked[1][1] >= self.LEXICAL_MARGIN):
+            return ranked[0][0]
+        return None
+
+    @staticmethod
+    def _best_per_college(hits: List[Tuple[Any, float]]) -> List[Tuple[Any, float]]:
+        best: Dict[Any, float] = {}
+        for target, score in hits:
+            if score > best.get(target, -1.0):
+                best[target] = score
+        return sorted(best.items(), key=lambda x: -x[1])
+
+    def resolved_aliases(self) -> Dict[str, str]:
+        """{alias: catalogue college name} for aliases pinned to a college (for embedding enrichment)."""
+        return dict(self._resolved_aliases)
+
+    def _result(self, target, score: float, source: str) -> Dict[str, Any]:
+        college = self.colleges[target] if isinstance(target, int) else None
+        return {
+            "name": college.get("name") if college else target,
+            "college": college,
+            "score": round(float(score), 4),
+            "source": source,
+        }
+
+    def resolve(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"name", "college", "score", "source"} or None.
+        `college` is the catalogue dict (None when only an alias's full name is known).
+        """
+        if not query or self._lexical is None:
+            return None
+        start_time = time.perf_counter()
+        result = self._resolve(query.strip())
+        metrics.observe("resolver.resolve_s", time.perf_counter() - start_time)
+        metrics.incr(f"resolver.{result['source'] if result else 'unresolved'}")
+        return result
+
+    def _resolve(self, query: str) -> Optional[Dict[str, Any]]:
+        # 1. Exact hash
+        hit = self._exact.get(normalize_key(query))
+        if hit is not None:
+            return self._result(hit[0], 1.0, hit[1])
+
+        # 2. Lexical fast path
+        lexical = self._best_per_college(self._lexical.search(query))
+        if lexical:
+            top, top_score = lexical[0]
+            runner_up = lexical[1][1] if len(lexical) > 1 else 0.0
+            if top_score >= self.LEXICAL_ACCEPT and top_score - runner_up >= self.LEXICAL_MARGIN:
+                return self._result(top, top_score, "lexical")
+
+        # 3. Semantic + fusion
+        lexical_scores = dict(lexical[:20])
+        semantic_scores: Dict[Any, float] = {}
+        if self.embedding_search is not None:
+            for college, score in self.embedding_search.search(query, top_k=5, threshold=0.3):
+                idx = self._index_of.get(str(college.get("code")))
+                if idx is not None:
+                    semantic_scores[idx] = score
+
+        # Without the model, lexical evidence stands on its own
+        lexical_weight = self.LEXICAL_WEIGHT if semantic_scores else 1.0
+        best = None
+        for target in set(lexical_scores) | set(semantic_scores):
+            lex = lexical_scores.get(target, 0.0)
+            sem = semantic_scores.get(target, 0.0)
+            fused = lexical_weight * lex + (1 - lexical_weight) * sem
+            accepted = (semantic_scores and fused >= self.FUSED_ACCEPT) or sem >= self.SEMANTIC_SOLO or lex >= self.LEXICAL_SOLO
+            if accepted and (best is None or fused > best[1]):
+                best = (target, fused, "semantic" if sem > lex else ("fused" if sem else "lexical"))
+        if best:
+            return self._result(*best)
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        """Resolution counts per stage (incl. LLM fallbacks recorded by the caller)."""
+        stages = ["exact", "alias", "lexical", "fused", "semantic", "unresolved", "llm_fallback"]
+        counts = {s: metrics.counter(f"resolver.{s}") for s in stages}
+        total = sum(counts[s] for s in stages if s != "llm_fallback")
+        counts["llm_fallback_rate"] = counts["llm_fallback"] / total if total else 0.0
+        return counts
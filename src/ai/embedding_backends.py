@@ -0,0 +1,173 @@
+"""
+Embedding backends used by EmbeddingModelProvider.
+
+- "torch": sentence-transformers on PyTorch (reference implementation).
+- "onnx":  the same MiniLM exported to ONNX with int8 dynamic quantization, run on
+           onnxruntime's CPU provider. Tokenization uses the Rust `tokenizers`
+           library, so this path never imports torch.
+
+Select with EMBEDDING_BACKEND=torch|onnx.
+"""
+import importlib.util
+import logging
+import os
+from typing import List
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger("tnea_ai.ai.embedding_backends")
+
+
+def _hub_repo_id(model_name: str) -> str:
+    """sentence-transformers short names live under the sentence-transformers org."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class TorchEmbeddingBackend:
+    """sentence-transformers on PyTorch."""
+    name = "torch"
+
+    @staticmethod
+    def is_installed() -> bool:
+        return importlib.util.find_spec("sentence_transformers") is not None
+
+    @staticmethod
+    def cache_namespace_for(model_name: str) -> str:
+        return model_name
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class OnnxEmbeddingBackend:
+    """
+    Int8-quantized ONNX export of the sentence-transformer, run on onnxruntime (CPU).
+
+    Reproduces the sentence-transformers pipeline for MiniLM: WordPiece tokenization
+    (max 256 tokens), transformer, attention-masked mean pooling, L2 normalization.
+    The model file is EMBEDDING_ONNX_PATH if set, otherwise EMBEDDING_ONNX_FILE from the
+    model's Hugging Face repo (which ships pre-quantized exports under onnx/).
+    """
+    name = "onnx"
+    max_seq_length = 256
+    batch_size = 32
+
+    @staticmethod
+    def is_installed() -> bool:
+        return all(importlib.util.find_spec(m) is not None for m in ("onnxruntime", "tokenizers", "huggingface_hub"))
+
+    @staticmethod
+    def cache_namespace_for(model_name: str) -> str:
+        # int8 vectors differ slightly from fp32 ones, so they get their own cache namespace
+        onnx_name = os.path.basename(config.EMBEDDING_ONNX_PATH or config.EMBEDDING_ONNX_FILE)
+        return f"{model_name}+onnx:{onnx_name}"
+
+    def __init__(self, model_name: str, onnx_file: str = None, onnx_path: str = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        onnx_file = onnx_file or config.EMBEDDING_ONNX_FILE
+        onnx_path = onnx_path or config.EMBEDDING_ONNX_PATH
+
+        if onnx_path:
+            model_path = onnx_path
+            tokenizer_path = os.path.join(os.path.dirname(onnx_path), "tokenizer.json")
+        else:
+            from huggingface_hub import hf_hub_download
+            repo_id = _hub_repo_id(model_name)
+            model_path = hf_hub_download(repo_id, onnx_file)
+            tokenizer_path = hf_hub_download(repo_id, "tokenizer.json")
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if config.EMBEDDING_ONNX_THREADS:
+            options.intra_op_num_threads = config.EMBEDDING_ONNX_THREADS
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"ONNX embedding backend ready: {model_path}")
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        texts = list(texts)
+        if len(texts) <= self.batch_size:
+            return self._encode_batch(texts)
+        # Length-sorted batches keep padding (and wasted compute) small
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = np.empty((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            vectors = self._encode_batch([texts[i] for i in idx])
+            if out.shape[1] == 0:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[idx] = vectors
+        return out
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return _l2_normalize(pooled)
+
+
+BACKENDS = {
+    TorchEmbeddingBackend.name: TorchEmbeddingBackend,
+    OnnxEmbeddingBackend.name: OnnxEmbeddingBackend,
+}
+
+
+def get_backend_class(name: str = None):
+    name = (name or config.EMBEDDING_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def create_backend(model_name: str, name: str = None):
+    """Instantiates the configured backend (this is where the model is actually loaded)."""
+    return get_backend_class(name)(model_name)
+
+
+def quantize_onnx_model(fp32_path: str, int8_path: str):
+    """
+    Exports a custom int8 model from an fp32 ONNX file using dynamic (weight-only) quantization.
+    Only needed for models whose Hugging Face repo does not already ship a quantized export.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    logger.info(f"Wrote int8 model to {int8_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Quantize an fp32 ONNX embedding model to int8.")
+    parser.add_argument("fp32_path")
+    parser.add_argument("int8_path")
+    args = parser.parse_args()
+    quantize_onnx_model(args.fp32_path, args.int8_path)
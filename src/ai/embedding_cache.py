@@ -0,0 +1,283 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: in-process locking only
+    fcntl = None
+
+from config import config
+from utils.metrics import metrics
+from utils.normalizers import normalize_name
+
+logger = logging.getLogger("tnea_ai.ai.embedding_cache")
+
+
+class EmbeddingDiskCache:
+    """
+    On-disk store of text embeddings, keyed by a hash of the model name and the text.
+
+    Layout (one directory per model):
+        <cache_dir>/<model_hash>/vectors.npy   - (rows, dim) matrix, float32 or float16
+        <cache_dir>/<model_hash>/index.json    - {"model", "dtype", "dim", "keys": {text_hash: row}}
+        <cache_dir>/<model_hash>/.lock         - serializes workers sharing the directory
+
+    The matrix is memory-mapped on load, so re-indexing an unchanged catalogue
+    only hashes the input strings and gathers rows; only unseen texts are encoded.
+
+    Writers hold an exclusive file lock across re-reading the files, appending their new
+    rows to what is on disk and replacing both files, so the pair only ever grows by
+    appended rows and one worker never pairs its index with another's vectors. Readers
+    take the lock shared. (Without fcntl, e.g. on Windows, only the in-process lock applies.)
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = None, dtype: str = None):
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype or config.EMBEDDING_CACHE_DTYPE)
+        model_hash = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:16]
+        self.cache_dir = Path(cache_dir or config.EMBEDDING_CACHE_DIR) / model_hash
+        self.vectors_path = self.cache_dir / "vectors.npy"
+        self.index_path = self.cache_dir / "index.json"
+        self.lock_path = self.cache_dir / ".lock"
+
+        self._lock = threading.Lock()
+        self._keys: Dict[str, int] = {}
+        self._vectors = None  # np.memmap (read-only) or None
+        self._load()
+
+    def text_key(self, text: str) -> str:
+        """Stable key for one (model, text) pair."""
+        return hashlib.sha1(f"{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Cross-process lock on the cache directory (created for writers)."""
+        if fcntl is None:
+            yield
+            return
+        if exclusive:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        elif not self.cache_dir.exists():
+            yield  # nothing to read yet
+            return
+        with open(self.lock_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with self._file_lock(exclusive=False):
+                self._read()
+        except OSError as e:
+            logger.warning(f"Embedding cache at {self.cache_dir} could not be locked for reading: {e}")
+            self._read()
+
+    def _read(self):
+        """Loads the index and memory-maps the vector matrix, discarding it if inconsistent."""
+        self._keys = {}
+        self._vectors = None
+        if not (self.index_path.exists() and self.vectors_path.exists()):
+            return
+
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable embedding cache at {self.cache_dir}: {e}")
+            return
+
+        if meta.get("model") != self.model_name or np.dtype(meta.get("dtype", "float32")) != self.dtype:
+            logger.info(f"Embedding cache at {self.cache_dir} was built with different settings, rebuilding.")
+            return
+
+        # vectors.npy is written before index.json, so rows beyond the matrix are a torn write
+        rows = vectors.shape[0]
+        self._keys = {k: r for k, r in meta.get("keys", {}).items() if r < rows}
+        self._vectors = vectors
+
+    def _missing(self, keys: List[str], texts: List[str]) -> Dict[str, str]:
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self._keys and key not in missing:
+                missing[key] = text
+        return missing
+
+    def get_or_encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Returns a float32 (len(texts), dim) matrix for `texts`.
+        Only texts missing from the cache are passed to `encode_fn`; the rest are read from disk.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        keys = [self.text_key(t) for t in texts]
+
+        with self._lock:
+            missing = self._missing(keys, texts)
+            if missing:
+                logger.info(f"Embedding cache: encoding {len(missing)} new text(s), {len(texts) - len(missing)} cached")
+                new_vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+                self._append(list(missing.keys()), new_vectors)
+                # Re-reading the files can drop rows only this process had (another worker cleared them)
+                lost = self._missing(keys, texts)
+                if lost:
+                    self._append(list(lost.keys()), np.asarray(encode_fn(list(lost.values())), dtype=np.float32))
+            else:
+                logger.debug(f"Embedding cache: all {len(texts)} text(s) cached")
+
+            rows = [self._keys[k] for k in keys]
+            return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    def _merge(self, keys: List[str], vectors: np.ndarray) -> np.ndarray:
+        """The current matrix with the rows of `keys` not already present appended; updates the index."""
+        fresh = [i for i, key in enumerate(keys) if key not in self._keys]
+        vectors = vectors[fresh]
+        if self._vectors is not None and len(self._vectors):
+            if self._vectors.shape[1] != vectors.shape[1]:
+                logger.warning("Embedding dimension changed, discarding existing cache.")
+                existing = np.zeros((0, vectors.shape[1]), dtype=self.dtype)
+                self._keys = {}
+            else:
+                existing = np.asarray(self._vectors)
+            merged = np.concatenate([existing, vectors])
+        else:
+            merged = vectors
+
+        start = merged.shape[0] - vectors.shape[0]
+        for i, index in enumerate(fresh):
+            self._keys[keys[index]] = start + i
+        return merged
+
+    def _append(self, keys: List[str], vectors: np.ndarray):
+        """Appends rows to the on-disk cache under the file lock, replacing vectors first, then the index."""
+        vectors = vectors.astype(self.dtype)
+        merged = None
+        try:
+            with self._file_lock(exclusive=True):
+                self._read()  # rows other workers appended since this one last read
+                merged = self._merge(keys, vectors)
+                self._replace(self.vectors_path, lambda f: np.save(f, merged), "wb")
+                meta = {
+                    "model": self.model_name,
+                    "dtype": self.dtype.name,
+                    "dim": int(merged.shape[1]),
+                    "keys": self._keys,
+                }
+                self._replace(self.index_path, lambda f: json.dump(meta, f), "w")
+                self._vectors = np.load(self.vectors_path, mmap_mode="r")
+        except Exception as e:
+            # Cache is an optimisation only: keep serving from memory if the disk is read-only
+            logger.warning(f"Failed to persist embedding cache to {self.cache_dir}: {e}")
+            self._vectors = merged if merged is not None else self._merge(keys, vectors)
+
+    def _replace(self, path: Path, write: Callable, mode: str):
+        """Writes `path` through a uniquely named temp file in the same directory, then renames it."""
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def clear(self):
+        """Removes all cached embeddings for this model."""
+        with self._lock, self._file_lock(exclusive=True):
+            for path in (self.index_path, self.vectors_path):
+                if path.exists():
+                    path.unlink()
+            self._keys = {}
+            self._vectors = None
+
+
+class QueryEmbeddingCache:
+    """
+    Process-wide, size-bounded LRU of query text -> normalized embedding.
+
+    Keys are (namespace, normalized text), where the namespace is the model
+    identifier. Texts are lower-cased and whitespace-collapsed before lookup;
+    all-MiniLM-L6-v2 is an uncased model, so this does not change the vectors.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or config.QUERY_EMBEDDING_CACHE_SIZE
+        self._entries: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray], namespace: str) -> np.ndarray:
+        """Returns a float32 (len(texts), dim) matrix, encoding only texts not already cached."""
+        keys = [(namespace, normalize_name(t)) for t in texts]
+        found: Dict[tuple, np.ndarray] = {}
+        missing: Dict[tuple, str] = {}
+
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                vec = self._entries.get(key)
+                if vec is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vec
+                else:
+                    missing[key] = key[1]
+            hits = len(texts) - len(missing)
+            self.hits += hits
+            self.misses += len(missing)
+        metrics.incr("embedding.query_cache.hits", hits)
+        metrics.incr("embedding.query_cache.misses", len(missing))
+
+        if missing:
+            # Encode outside the lock; a concurrent miss on the same text only costs a duplicate encode
+            vectors = np.asarray(encode_fn(list(missing.values())), dtype=np.float32)
+            with self._lock:
+                for key, vec in zip(missing.keys(), vectors):
+                    vec.setflags(write=False)
+                    self._entries[key] = vec
+                    self._entries.move_to_end(key)
+                    found[key] = vec
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return np.stack([found[k] for k in keys])
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by every semantic lookup in the process (college search, resolution, RAG)
+query_embedding_cache = QueryEmbeddingCache()
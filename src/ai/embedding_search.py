@@ -2,15 +2,56 @@ import logging
 import time
 from typing import List, Dict, Any, Tuple
 import numpy as np
-try:
-    from sentence_transformers import SentenceTransformer, util
-    import torch
-except ImportError:
-    SentenceTransformer = None
-    torch = None
+
+from ai.embedding_cache import EmbeddingDiskCache, query_embedding_cache
+from ai.model_provider import EmbeddingModelProvider
 
 logger = logging.getLogger("tnea_ai.ai.embedding")
 
+
+def top_k_scores(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row-wise top-k of a (n_queries, n_items) score matrix without a full sort.
+    Returns (indices, scores), each (n_queries, k), ordered best-first.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.zeros((scores.shape[0], 0))
+        return empty.astype(np.intp), empty
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1)
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+def college_search_texts(colleges: List[Dict[str, Any]], aliases: Dict[str, str] = None) -> List[str]:
+    """
+    Composite per-college strings that get embedded, e.g. "Anna University Chennai 0001 CEG GUINDY".
+    `aliases` is { "ALIAS": "FULL NAME" }; aliases are appended to the college they name.
+    """
+    # Pre-process aliases: Map Full Name -> Space-separated Aliases
+    alias_map = {}
+    if aliases:
+        for alias, full_name in aliases.items():
+            alias_map.setdefault(full_name.upper(), []).append(alias)
+
+    texts = []
+    for college in colleges:
+        name = college.get('name', '')
+        district = college.get('district', '')
+        code = str(college.get('code', ''))
+
+        extra_context = ""
+        if name.upper() in alias_map:
+            extra_context = " " + " ".join(alias_map[name.upper()])
+
+        texts.append(f"{name} {district} {code}{extra_context}")
+    return texts
+
+
 class CollegeEmbeddingSearch:
     _instance = None
     
@@ -24,111 +65,83 @@ class CollegeEmbeddingSearch:
         if self._initialized:
             return
             
-        self.model = None
         self.college_embeddings = None
         self.college_names = []
         self.college_codes = []
         self.colleges_data = [] # Keep reference to full objects
         
-        self.model_name = 'all-MiniLM-L6-v2'
-        self._load_model()
+        # Shared, lazily loaded model: nothing is loaded until a text actually needs encoding
+        self.provider = EmbeddingModelProvider()
+        self.model_name = self.provider.model_name
+        self.disk_cache = EmbeddingDiskCache(self.provider.cache_namespace)
         self._initialized = True
 
-    def _load_model(self):
-        """Loads the sentence-transformer model."""
-        if SentenceTransformer is None:
-            logger.error("sentence-transformers not installed. Semantic search disabled.")
-            return
-
-        try:
-            logger.info(f"Loading embedding model: {self.model_name}...")
-            start_time = time.time()
-            self.model = SentenceTransformer(self.model_name)
-            logger.info(f"Model loaded in {time.time() - start_time:.2f}s")
-        except Exception as e:
-            logger.error(f"Failed to load embedding model: {e}")
-            self.model = None
-
     def index_colleges(self, colleges: List[Dict[str, Any]], aliases: Dict[str, str] = None):
         """Creates embeddings for a list of colleges, optionally enriched with aliases."""
-        if not self.model or not colleges:
+        if not self.provider.available or not colleges:
             return
 
         logger.info(f"Indexing {len(colleges)} colleges...")
         start_time = time.time()
         
         self.colleges_data = colleges
-        self.college_names = []
-        self.college_codes = []
-        
-        # Pre-process aliases: Map Full Name -> Space-separated Aliases
-        # The input aliases is { "ALIAS": "FULL NAME" }
-        alias_map = {}
-        if aliases:
-            for alias, full_name in aliases.items():
-                upper_name = full_name.upper()
-                if upper_name not in alias_map:
-                    alias_map[upper_name] = []
-                alias_map[upper_name].append(alias)
-        
-        # Prepare texts for embedding
-        texts_to_embed = []
-        
-        for college in colleges:
-            name = college.get('name', '')
-            district = college.get('district', '')
-            code = str(college.get('code', ''))
-            
-            # Check for aliases
-            extra_context = ""
-            if name.upper() in alias_map:
-                extra_context = " " + " ".join(alias_map[name.upper()])
-            
-            # Composite string for better semantic matching
-            # e.g. "Anna University Chennai 0001 CEG GUINDY"
-            search_text = f"{name} {district} {code}{extra_context}"
-            
-            self.college_names.append(name)
-            self.college_codes.append(code)
-            texts_to_embed.append(search_text)
+        self.college_names = [college.get('name', '') for college in colleges]
+        self.college_codes = [str(college.get('code', '')) for college in colleges]
+        texts_to_embed = college_search_texts(colleges, aliases)
 
         try:
-            self.college_embeddings = self.model.encode(texts_to_embed, convert_to_tensor=True)
+            # Only new or changed college strings are encoded; the rest come from the on-disk cache
+            embeddings = self.disk_cache.get_or_encode(texts_to_embed, self._encode_texts)
+            # Row-normalized, contiguous float32 so cosine similarity is a single mat-vec
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            self.college_embeddings = np.ascontiguousarray(embeddings / np.maximum(norms, 1e-12), dtype=np.float32)
             logger.info(f"Indexing completed in {time.time() - start_time:.2f}s")
         except Exception as e:
             logger.error(f"Failed to index colleges: {e}")
             self.college_embeddings = None
 
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encodes texts into normalized float32 vectors."""
+        return self.provider.encode(texts)
+
     def search(self, query: str, top_k: int = 5, threshold: float = 0.3) -> List[Tuple[Dict[str, Any], float]]:
         """
         Semantic search for colleges.
         Returns list of (college_dict, score) tuples.
         """
-        if not self.model or self.college_embeddings is None:
+        results = self.search_batch([query], top_k=top_k, threshold=threshold)
+        return results[0] if results else []
+
+    def search_batch(self, queries: List[str], top_k: int = 5, threshold: float = 0.3) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Semantic search for many queries at once (e.g. bulk alias resolution).
+        Scores all queries with one matrix multiply; returns one result list per query.
+        """
+        if not self.provider.available or self.college_embeddings is None:
             logger.warning("Search called but model/index not ready.")
+            return [[] for _ in queries]
+        if not queries:
             return []
 
         try:
-            # Encode query
-            query_embedding = self.model.encode(query, convert_to_tensor=True)
-            
-            # Compute cosine similarity
-            cos_scores = util.cos_sim(query_embedding, self.college_embeddings)[0]
-            
-            # Get top k results
-            top_results = torch.topk(cos_scores, k=min(top_k, len(self.colleges_data)))
-            
+            query_embeddings = query_embedding_cache.get_or_encode(list(queries), self._encode_texts, namespace=self.provider.cache_namespace)
+
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            scores = query_embeddings @ self.college_embeddings.T
+            top_idx, top_scores = top_k_scores(scores, top_k)
+
             results = []
-            for score, idx in zip(top_results.values, top_results.indices):
-                score_val = float(score)
-                if score_val >= threshold:
-                    results.append((self.colleges_data[idx], score_val))
-            
+            for idx_row, score_row in zip(top_idx, top_scores):
+                keep = score_row >= threshold
+                results.append([
+                    (self.colleges_data[i], float(s))
+                    for i, s in zip(idx_row[keep], score_row[keep])
+                ])
             return results
-            
+
         except Exception as e:
             logger.error(f"Error during semantic search: {e}")
-            return []
+            return [[] for _ in queries]
 
 if __name__ == "__main__":
     # Simple test
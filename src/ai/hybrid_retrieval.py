@@ -0,0 +1,125 @@
+"""
+Lexical side of GuidelineRAG's hybrid retriever.
+
+- BM25Index:   Okapi BM25 over the guideline chunks, so exact terms the embedding
+               model blurs ("BCM", "SCA", "Rs. 500", certificate names) still match.
+- fuse_scores: combines vector and BM25 scores over the union of both shortlists.
+- CrossEncoderReranker: optional second stage (RAG_RERANK_MODEL), loaded on first use.
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger("tnea_ai.ai.hybrid_retrieval")
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "be", "of", "for", "to", "in", "on", "at", "by", "from",
+    "and", "or", "with", "as", "it", "this", "that", "what", "which", "how", "when", "where", "who",
+    "do", "does", "i", "my", "me", "can", "will", "should", "there", "any", "if", "about", "tell",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; short community codes (sc, st, bc) and numbers are kept."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 with an inverted index (k1=1.5, b=0.75 by default)."""
+
+    def __init__(self, ids: List[str], documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.ids = list(ids)
+        self.k1 = k1
+        self.b = b
+        tokenized = [tokenize(d) for d in documents]
+        self.doc_len = [len(t) for t in tokenized]
+        self.avg_len = (sum(self.doc_len) / len(self.doc_len)) if self.doc_len else 0.0
+
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for doc_id, tokens in enumerate(tokenized):
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((doc_id, tf))
+        n = len(tokenized)
+        self.idf = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in self.postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, top_n: int = 20) -> List[Tuple[str, float]]:
+        """[(chunk_id, bm25_score)] best first, only chunks sharing a term with the query."""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / (self.avg_len or 1.0))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda x: -x[1])[:top_n]
+        return [(self.ids[d], s) for d, s in ranked]
+
+
+def fuse_scores(vector_hits: List[Tuple[str, float]], bm25_hits: List[Tuple[str, float]],
+                bm25_weight: float) -> List[Tuple[str, float]]:
+    """
+    Weighted sum of max-normalized scores over the union of both shortlists, best first.
+    Each component is divided by its best score (cosine clipped at 0), so the top chunk of
+    either retriever contributes its full weight. A chunk missing from a list gets 0 there.
+    """
+    fused: Dict[str, float] = defaultdict(float)
+    for hits, weight in ((vector_hits, 1 - bm25_weight), (bm25_hits, bm25_weight)):
+        best = max((s for _, s in hits), default=0.0)
+        if best <= 0:
+            continue
+        for cid, s in hits:
+            fused[cid] += weight * max(s, 0.0) / best
+    return sorted(fused.items(), key=lambda x: -x[1])
+
+
+class CrossEncoderReranker:
+    """Scores (query, chunk) pairs with a sentence-transformers CrossEncoder; None if unavailable."""
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(CrossEncoderReranker, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.model_name = config.RAG_RERANK_MODEL
+        self._model = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self._initialized = True
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.model_name) and not self._failed
+
+    def rerank(self, query: str, candidates: List[Tuple[str, str]]) -> Optional[List[Tuple[str, float]]]:
+        """`candidates` are (chunk_id, text); returns [(chunk_id, probability)] best first, or None."""
+        if not self.enabled or not candidates:
+            return None
+        with self._lock:
+            if self._model is None and not self._failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name)
+                    logger.info(f"Loaded reranker {self.model_name}")
+                except Exception as e:
+                    logger.error(f"Reranker unavailable, using fused scores: {e}")
+                    self._failed = True
+        if self._model is None:
+            return None
+        logits = self._model.predict([(query, text) for _, text in candidates])
+        scores = [1.0 / (1.0 + math.exp(-float(x))) for x in logits]
+        return sorted(zip([cid for cid, _ in candidates], scores), key=lambda x: -x[1])
@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from config import config
+from ai.embedding_backends import create_backend, get_backend_class
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.ai.model_provider")
+
+
+def _rss_mb() -> Optional[float]:
+    """Current resident set size of this process in MB (None if it cannot be measured)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class EmbeddingModelProvider:
+    """
+    Process-wide owner of the embedding model used by CollegeEmbeddingSearch and GuidelineRAG.
+
+    The model is loaded lazily on the first encode (not at agent construction),
+    exactly once per process, behind a lock so concurrent sessions do not race.
+    The runtime is chosen by EMBEDDING_BACKEND (see ai/embedding_backends.py).
+    A failed load (model download interrupted, disk full, ...) disables semantic search
+    for RETRY_AFTER_S only; the next encode after that tries again.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Seconds after a failed load before another attempt
+    RETRY_AFTER_S = 300.0
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(EmbeddingModelProvider, cls).__new__(cls)
+                cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.model_name = config.EMBEDDING_MODEL_NAME
+        self.backend_name = config.EMBEDDING_BACKEND.lower()
+        self._backend_class = get_backend_class(self.backend_name)
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._retry_at = 0.0  # monotonic time before which a failed load is not retried
+        self.load_time_s = None
+        self.load_memory_mb = None
+        self._initialized = True
+
+    @property
+    def available(self) -> bool:
+        """True unless the backend's libraries are missing or a load attempt failed within RETRY_AFTER_S."""
+        return self._backend_class.is_installed() and (self._model is not None or time.monotonic() >= self._retry_at)
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def cache_namespace(self) -> str:
+        """Key under which embeddings from this model/backend are cached (known without loading)."""
+        return self._backend_class.cache_namespace_for(self.model_name)
+
+    def get_model(self) -> Any:
+        """Returns the shared backend, loading the model on first use."""
+        if self._model is not None:
+            return self._model
+        if not self._backend_class.is_installed():
+            raise RuntimeError(f"Libraries for embedding backend '{self.backend_name}' not installed. Semantic search disabled.")
+
+        with self._load_lock:
+            if self._model is not None:
+                return self._model
+            if time.monotonic() < self._retry_at:
+                raise RuntimeError(f"Embedding model {self.model_name} failed to load earlier; "
+                                   f"retrying in {self._retry_at - time.monotonic():.0f}s.")
+
+            logger.info(f"Loading embedding model: {self.model_name} ({self.backend_name} backend)...")
+            rss_before = _rss_mb()
+            start_time = time.perf_counter()
+            try:
+                model = create_backend(self.model_name, self.backend_name)
+            except Exception as e:
+                self._retry_at = time.monotonic() + self.RETRY_AFTER_S
+                metrics.incr("embedding.model_load_failed")
+                logger.error(f"Failed to load embedding model (retrying in {self.RETRY_AFTER_S:.0f}s): {e}")
+                raise
+
+            self.load_time_s = time.perf_counter() - start_time
+            rss_after = _rss_mb()
+            if rss_before is not None and rss_after is not None:
+                self.load_memory_mb = rss_after - rss_before
+            metrics.observe("embedding.model_load_s", self.load_time_s)
+            mem_str = f", +{self.load_memory_mb:.0f} MB RSS" if self.load_memory_mb is not None else ""
+            logger.info(f"Model loaded in {self.load_time_s:.2f}s{mem_str}")
+            self._model = model
+            return self._model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encodes texts into L2-normalized float32 vectors of shape (len(texts), dim)."""
+        model = self.get_model()
+        start_time = time.perf_counter()
+        vectors = model.encode(list(texts))
+        metrics.observe("embedding.encode_s", time.perf_counter() - start_time)
+        metrics.incr("embedding.encoded_texts", len(texts))
+        return np.asarray(vectors, dtype=np.float32)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "backend": self.backend_name,
+            "loaded": self.loaded,
+            "load_time_s": self.load_time_s,
+            "load_memory_mb": self.load_memory_mb,
+        }
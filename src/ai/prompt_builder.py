@@ -0,0 +1,161 @@
+import logging
+import re
+from typing import Dict, List, Optional, Set
+
+from utils.metrics import metrics
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger("tnea_ai.prompt")
+
+_NO_PLACEMENT = (None, 'N/A', 'No_Data', 'No Data', '-', '')
+# Trailing PIN code of the address-style college names ("..., Guindy, Chennai 600 025")
+_PINCODE = re.compile(r"[\s,\-]*\d{3}\s?\d{3}\.?$")
+
+# Explains the compact rows to the model; goes in the prompt once, above the first college section
+COMPACT_LEGEND = ("Data rows: College [District; placement %]: Branch cutoff (seats), ... "
+                  "District and placement are given only where a college first appears. "
+                  "A college without a placement figure has no verified placement data.")
+
+
+def group_by_college(entries: List[Dict], max_colleges: int = None) -> List[List[Dict]]:
+    """Entries grouped per college code, in first-seen order; at most `max_colleges` groups."""
+    groups: Dict[object, List[Dict]] = {}
+    for e in entries:
+        groups.setdefault(e.get('code'), []).append(e)
+    return list(groups.values())[:max_colleges]
+
+
+def _placement(entry: Dict) -> Optional[str]:
+    placement = entry.get('placement')
+    return None if placement in _NO_PLACEMENT else str(placement)
+
+
+def _number(value) -> str:
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def verbose_rows(group: List[Dict]) -> str:
+    """The one-line-per-branch encoding the prompts used before compaction (size baseline)."""
+    lines = []
+    for e in group:
+        seats = e.get('total_seats')
+        seats_str = f" | Seats: {seats}" if seats else ""
+        lines.append(f"- {e['name']} | Branch: {e['branch_name']} | Cutoff: {e['cutoff_mark']} | "
+                     f"Placement: {_placement(e) or 'No Data'}{seats_str} | District: {e['district']}")
+    return "\n".join(lines)
+
+
+def compact_row(group: List[Dict], seen: Set = None) -> str:
+    """
+    One line per college: name (without its PIN code) once, district only when the name does
+    not already carry it, placement only when known, then every branch as "name cutoff (seats)".
+    Colleges already in `seen` (listed in an earlier section) get the bare name.
+    """
+    first = group[0]
+    name = _PINCODE.sub("", first.get('name', 'Unknown'))
+    branches = ", ".join(
+        f"{e['branch_name']} {_number(e['cutoff_mark'])}" + (f" ({e['total_seats']})" if e.get('total_seats') else "")
+        for e in group
+    )
+    if seen is not None:
+        if first.get('code') in seen:
+            return f"- {name}: {branches}"
+        seen.add(first.get('code'))
+    details = []
+    district = first.get('district') or ''
+    if district and district.upper() not in name.upper():
+        details.append(district)
+    if _placement(first):
+        details.append(_placement(first))
+    return f"- {name}" + (f" [{'; '.join(details)}]" if details else "") + f": {branches}"
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt from ordered sections within an estimated token budget.
+
+    Text sections with priority 0 are always kept. College sections are encoded with
+    compact_row and, while the estimate is over budget, lose their last (least relevant)
+    college, starting with the section of the highest priority number; optional text
+    (priority > 0) is dropped once rows of the same priority are used up.
+
+    After build(), `stats` compares the prompt with the same text around the data as it was
+    previously embedded: `baseline_data` when given (e.g. a markdown table), else verbose_rows.
+    """
+
+    def __init__(self, budget_tokens: int = None, name: str = "prompt", baseline_data: str = None):
+        self.budget_tokens = budget_tokens
+        self.name = name
+        self.baseline_data = baseline_data
+        self._sections: List[Dict] = []
+        self.stats: Dict[str, float] = {}
+
+    def add_text(self, text: str, priority: int = 0) -> "PromptBuilder":
+        self._sections.append({"kind": "text", "priority": priority, "text": text, "dropped": False})
+        return self
+
+    def add_colleges(self, groups: List[List[Dict]], priority: int = 1, empty: str = "None found.") -> "PromptBuilder":
+        self._sections.append({"kind": "colleges", "priority": priority, "groups": list(groups), "empty": empty})
+        return self
+
+    def _next_victim(self) -> Optional[Dict]:
+        candidates = [
+            s for s in self._sections
+            if s["priority"] > 0 and (s["groups"] if s["kind"] == "colleges" else not s["dropped"])
+        ]
+        # Highest priority number first; rows before the optional text of the same priority
+        return max(candidates, key=lambda s: (s["priority"], s["kind"] == "colleges"), default=None)
+
+    def _render(self) -> str:
+        seen = set()
+        parts = []
+        for s in self._sections:
+            if s["kind"] == "text":
+                if not s["dropped"]:
+                    parts.append(s["text"])
+            else:
+                parts.append("\n".join(compact_row(g, seen) for g in s["groups"]) or s["empty"])
+        return "\n".join(parts)
+
+    def build(self) -> str:
+        text_sections = [s for s in self._sections if s["kind"] == "text"]
+        college_sections = [s for s in self._sections if s["kind"] == "colleges"]
+        fixed = sum(estimate_tokens(s["text"]) for s in text_sections)
+        if self.baseline_data is not None:
+            baseline = fixed + estimate_tokens(self.baseline_data)
+        else:
+            baseline = fixed + sum(estimate_tokens(verbose_rows(g)) for s in college_sections for g in s["groups"])
+
+        # Costs are taken without cross-section dedup, so trimming errs on the safe side
+        costs = {id(s): [estimate_tokens(compact_row(g)) + 1 for g in s["groups"]] for s in college_sections}
+        total = fixed + sum(sum(c) for c in costs.values())
+        trimmed = 0
+        while self.budget_tokens and total > self.budget_tokens:
+            victim = self._next_victim()
+            if victim is None:
+                break
+            if victim["kind"] == "colleges":
+                victim["groups"].pop()
+                total -= costs[id(victim)].pop()
+                trimmed += 1
+            else:
+                victim["dropped"] = True
+                total -= estimate_tokens(victim["text"])
+
+        prompt = self._render()
+        tokens = estimate_tokens(prompt)
+        self.stats = {
+            "baseline_tokens": baseline,
+            "tokens": tokens,
+            "saved_ratio": round(1 - tokens / baseline, 3) if baseline else 0.0,
+            "colleges_trimmed": trimmed,
+            "budget_tokens": self.budget_tokens,
+        }
+        metrics.observe(f"prompt.{self.name}.tokens", tokens)
+        metrics.observe(f"prompt.{self.name}.saved_ratio", self.stats["saved_ratio"])
+        if trimmed:
+            metrics.incr(f"prompt.{self.name}.colleges_trimmed", trimmed)
+        budget_str = f", {trimmed} college(s) trimmed to fit {self.budget_tokens}" if self.budget_tokens else ""
+        logger.info(f"Prompt {self.name}: ~{tokens} tokens (previous encoding ~{baseline}, "
+                    f"-{self.stats['saved_ratio']:.0%}){budget_str}")
+        return prompt
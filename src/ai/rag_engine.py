@@ -1,12 +1,90 @@
 
 import os
-import chromadb
-from chromadb.utils import embedding_functions
+import re
+import json
+import time
+import hashlib
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from ai.embedding_cache import query_embedding_cache
+from ai.hybrid_retrieval import BM25Index, CrossEncoderReranker, fuse_scores
+from ai.model_provider import EmbeddingModelProvider
+from ai.vector_stores import create_vector_store
+from config import config
+from utils.metrics import metrics
 
 logger = logging.getLogger("tnea_ai.rag")
 
+# Bump when chunk_guidelines changes output for the same text, to force a re-sync
+CHUNKER_VERSION = 2
+
+HEADING_RE = re.compile(r"^\s*(#{1,6}\s+.+|\*\*[^*].*\*\*:?)\s*$")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[*A-Z0-9-])")
+
+
+def chunk_id(text: str) -> str:
+    """Content-addressed id: identical chunk text always maps to the same id."""
+    return "g_" + hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Sentences, with any sentence longer than max_chars cut at word boundaries."""
+    pieces = []
+    for sentence in SENTENCE_RE.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+    return pieces
+
+
+def chunk_guidelines(text: str, max_chars: int = 1000, min_chars: int = 100) -> List[Dict[str, str]]:
+    """
+    Structure-aware chunking: sections start at markdown/bold headings, chunks are packed
+    from whole paragraphs and sentences up to `max_chars`, and each chunk is prefixed with
+    its section heading. Returns [{"id", "text", "heading"}] in document order, de-duplicated.
+    """
+    sections, heading, lines = [], "", []
+    for line in text.splitlines():
+        if HEADING_RE.match(line):
+            sections.append((heading, lines))
+            heading, lines = line.strip().strip("#* :").strip(), []
+        else:
+            lines.append(line.rstrip())
+    sections.append((heading, lines))
+
+    chunks, seen = [], set()
+    for heading, lines in sections:
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", "\n".join(lines)) if p.strip()]
+        prefix = f"{heading}\n" if heading else ""
+        budget = max_chars - len(prefix)
+        current = ""
+
+        def flush():
+            body = current.strip()
+            chunk = prefix + body
+            if len(chunk) >= min_chars and chunk not in seen:
+                seen.add(chunk)
+                chunks.append({"id": chunk_id(chunk), "text": chunk, "heading": heading})
+
+        for paragraph in paragraphs:
+            for piece in ([paragraph] if len(paragraph) <= budget else _split_long(paragraph, budget)):
+                separator = "\n\n" if piece is paragraph else " "
+                if current and len(current) + len(separator) + len(piece) > budget:
+                    flush()
+                    current = ""
+                current = f"{current}{separator}{piece}" if current else piece
+        if current:
+            flush()
+    return chunks
+
+
 class GuidelineRAG:
     def __init__(self, data_dir: str = None):
         if data_dir is None:
@@ -18,88 +96,184 @@ class GuidelineRAG:
             
         self.vector_store_path = os.path.join(self.data_dir, "vector_store")
         
-        # Initialize ChromaDB
+        # BM25 over the same chunks, built on first query and after re-ingestion
+        self.lexical_index = None
+        self.chunk_texts: Dict[str, str] = {}
+        self.reranker = CrossEncoderReranker()
+        # sha1 of tnea_guidelines.txt as last synced; answer caches key on it
+        self.corpus_hash = None
+
+        # Initialize the vector store (RAG_BACKEND, see ai/vector_stores.py)
         try:
-            self.client = chromadb.PersistentClient(path=self.vector_store_path)
-            
-            # Use same model as embedding search for consistency
-            self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-                model_name="all-MiniLM-L6-v2"
-            )
-            
-            self.collection = self.client.get_or_create_collection(
-                name="tnea_guidelines",
-                embedding_function=self.embedding_fn
-            )
+            # Same (shared) model instance as CollegeEmbeddingSearch; embeddings are
+            # computed here and handed to the store, so it never loads its own copy.
+            self.provider = EmbeddingModelProvider()
+            self.model_name = self.provider.model_name
+
+            self.backend = config.RAG_BACKEND.lower()
+            self.collection = create_vector_store(self.vector_store_path, "tnea_guidelines", self.backend)
             
-            # Check if empty, then ingest
-            if self.collection.count() == 0:
-                self.ingest_guidelines()
+            # Re-ingests only what changed since the last run (no-op check is a hash compare)
+            self.sync_guidelines()
                 
         except Exception as e:
             logger.error(f"Failed to initialize RAG Engine: {e}")
-            self.client = None
             self.collection = None
 
-    def ingest_guidelines(self):
-        """Read text file, chunk it, and store in vector DB."""
-        file_path = os.path.join(self.data_dir, "docs", "tnea_guidelines.txt")
+    @property
+    def guidelines_path(self) -> str:
+        return os.path.join(self.data_dir, "docs", "tnea_guidelines.txt")
+
+    @property
+    def manifest_path(self) -> str:
+        # One manifest per backend: each store has its own copy of the chunks
+        return os.path.join(self.vector_store_path, f"guidelines_manifest.{self.backend}.json")
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def sync_guidelines(self, force: bool = False) -> Dict[str, int]:
+        """
+        Brings the vector store in line with tnea_guidelines.txt.
+
+        If the file hash, chunker version and embedding model match the manifest (and the
+        store still holds that many chunks) nothing else happens. Otherwise the file is
+        re-chunked and only chunk ids that appeared are embedded and added, and ids that
+        disappeared are deleted. Returns {"added", "removed", "unchanged"}.
+        """
+        start_time = time.perf_counter()
+        file_path = self.guidelines_path
         if not os.path.exists(file_path):
             logger.error(f"Guideline file not found at {file_path}")
-            return
-            
-        logger.info("Ingesting guidelines...")
+            return {"added": 0, "removed": 0, "unchanged": 0}
+
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        self.corpus_hash = hashlib.sha1(raw).hexdigest()
+        state = {
+            "file_sha1": self.corpus_hash,
+            "chunker_version": CHUNKER_VERSION,
+            "embedding_namespace": self.provider.cache_namespace,
+        }
+
+        manifest = self._read_manifest()
+        if not force and all(manifest.get(k) == v for k, v in state.items()) \
+                and len(manifest.get("chunk_ids", [])) == self.collection.count():
+            logger.info(f"Guidelines unchanged ({len(manifest['chunk_ids'])} chunks), "
+                        f"checked in {(time.perf_counter() - start_time) * 1000:.1f}ms")
+            return {"added": 0, "removed": 0, "unchanged": len(manifest["chunk_ids"])}
+
+        chunks = chunk_guidelines(raw.decode("utf-8"))
+        wanted = {c["id"]: c for c in chunks}
+        existing = set(self.collection.ids())
+        if manifest.get("embedding_namespace") not in (None, state["embedding_namespace"]):
+            # Vectors from another model/backend are not comparable: replace everything
+            logger.info("Embedding model changed since last ingestion, re-embedding all chunks.")
+            to_remove = list(existing)
+            existing = set()
+        else:
+            to_remove = [cid for cid in existing if cid not in wanted]
+        to_add = [c for cid, c in wanted.items() if cid not in existing]
+
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-                
-            # Simple chunking: 1000 chars with overlap
-            chunk_size = 1000
-            overlap = 200
-            chunks = []
-            ids = []
-            metadatas = []
-            
-            for i in range(0, len(text), chunk_size - overlap):
-                chunk = text[i:i + chunk_size]
-                if len(chunk) < 100:
-                    continue
-                chunks.append(chunk)
-                ids.append(f"chunk_{i}")
-                metadatas.append({"source": "tnea_guidelines"})
-                
-            self.collection.add(
-                documents=chunks,
-                ids=ids,
-                metadatas=metadatas
-            )
-            logger.info(f"Ingested {len(chunks)} chunks into ChromaDB.")
-            
+            if to_remove:
+                self.collection.delete(ids=to_remove)
+            if to_add:
+                texts = [c["text"] for c in to_add]
+                self.collection.add(
+                    ids=[c["id"] for c in to_add],
+                    documents=texts,
+                    metadatas=[{"source": "tnea_guidelines", "heading": c["heading"]} for c in to_add],
+                    embeddings=self.provider.encode(texts)
+                )
+            self._write_manifest({**state, "chunk_ids": list(wanted)})
+            self.lexical_index = None
         except Exception as e:
             logger.error(f"Error during ingestion: {e}")
+            return {"added": 0, "removed": 0, "unchanged": 0}
+
+        elapsed = time.perf_counter() - start_time
+        metrics.observe("rag.sync_s", elapsed)
+        logger.info(f"Synced guidelines in {elapsed:.2f}s: +{len(to_add)} / -{len(to_remove)} chunks, "
+                    f"{len(wanted) - len(to_add)} unchanged")
+        return {"added": len(to_add), "removed": len(to_remove), "unchanged": len(wanted) - len(to_add)}
+
+    def _get_lexical_index(self) -> BM25Index:
+        if self.lexical_index is None:
+            ids, documents = self.collection.documents()
+            self.chunk_texts = dict(zip(ids, documents))
+            self.lexical_index = BM25Index(ids, documents)
+        return self.lexical_index
+
+    def embed_query(self, query_text: str) -> np.ndarray:
+        """Query vector through the shared query cache (same entries as CollegeEmbeddingSearch)."""
+        return query_embedding_cache.get_or_encode(
+            [query_text], self.provider.encode, namespace=self.provider.cache_namespace
+        )[0]
+
+    def retrieve(self, query_text: str, n_results: int = 3) -> List[Dict[str, Any]]:
+        """
+        Hybrid retrieval: vector and BM25 shortlists, fused (and reranked when RAG_RERANK_MODEL
+        is set). Returns at most `n_results` chunks, dropping any that score below
+        RAG_MIN_RELATIVE_SCORE x the best one: [{"id", "document", "score"}], best first.
+        """
+        if self.collection is None:
+            return []
+        start_time = time.perf_counter()
+        candidates = config.RAG_CANDIDATES
+
+        vector_hits = []
+        try:
+            vector_hits = [(r["id"], r["score"]) for r in self.collection.query(self.embed_query(query_text), n_results=candidates)]
+        except Exception as e:
+            # BM25 alone still answers exact-term questions when the model is unavailable
+            logger.warning(f"Vector retrieval failed, using BM25 only: {e}")
+
+        lexical_index = self._get_lexical_index()
+        bm25_hits = lexical_index.search(query_text, top_n=candidates)
+        ranked = fuse_scores(vector_hits, bm25_hits, config.RAG_BM25_WEIGHT)
+        if not ranked:
+            return []
+
+        shortlist = ranked[:n_results * 3]
+        reranked = self.reranker.rerank(query_text, [(cid, self.chunk_texts.get(cid, "")) for cid, _ in shortlist])
+        ranked = reranked or shortlist
+
+        floor = config.RAG_MIN_RELATIVE_SCORE * ranked[0][1]
+        kept = [(cid, score) for cid, score in ranked[:n_results] if score >= floor and cid in self.chunk_texts]
+
+        metrics.observe("rag.retrieve_s", time.perf_counter() - start_time)
+        metrics.observe("rag.chunks_returned", len(kept))
+        return [{"id": cid, "document": self.chunk_texts[cid], "score": round(score, 4)} for cid, score in kept]
 
     def query(self, query_text: str, n_results: int = 3) -> str:
         """Retrieve relevant context for a query."""
-        if not self.collection:
-            return ""
-            
+        return self.query_with_sources(query_text, n_results=n_results)[0]
+
+    def query_with_sources(self, query_text: str, n_results: int = 3) -> Tuple[str, List[str]]:
+        """(context, chunk ids it was built from); ("", []) when nothing relevant is found."""
         try:
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=n_results
-            )
-            
-            # results['documents'] is a list of lists (one list per query)
-            documents = results.get('documents', [[]])[0]
-            
-            if not documents:
-                return ""
-                
-            return "\n\n---\n\n".join(documents)
+            results = self.retrieve(query_text, n_results=n_results)
+            if not results:
+                return "", []
+
+            context = "\n\n---\n\n".join(r["document"] for r in results)
+            metrics.observe("rag.context_chars", len(context))
+            return context, [r["id"] for r in results]
             
         except Exception as e:
             logger.error(f"RAG Retrieval failed: {e}")
-            return ""
+            return "", []
 
 if __name__ == "__main__":
     # Test run
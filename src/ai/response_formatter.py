@@ -6,6 +6,17 @@ logger = logging.getLogger("tnea_ai.formatter")
 
 class ResponseFormatter:
     """Formats structured data into Markdown for user display."""
+
+    @staticmethod
+    def sort_category(category: str, colleges: List[Dict], user_mark: float = None) -> List[Dict]:
+        """Display order within a category: best Safe first, nearest Ambitious first, closest Moderate first."""
+        if category == "Safe":
+            return sorted(colleges, key=lambda c: c.get('cutoff_mark', 0), reverse=True)
+        if category == "Ambitious":
+            return sorted(colleges, key=lambda c: c.get('cutoff_mark', 999))
+        if user_mark:
+            return sorted(colleges, key=lambda c: abs(c.get('cutoff_mark', 0) - user_mark))
+        return sorted(colleges, key=lambda c: c.get('cutoff_mark', 0), reverse=True)
     
     def format_college_list(self, categorized_colleges: Dict[str, List[Dict]], user_mark: float = None) -> str:
         """
@@ -19,15 +30,7 @@ class ResponseFormatter:
             if not colleges:
                 continue
             
-            if category == "Safe":
-                sorted_colleges = sorted(colleges, key=lambda c: c.get('cutoff_mark', 0), reverse=True)
-            elif category == "Ambitious":
-                sorted_colleges = sorted(colleges, key=lambda c: c.get('cutoff_mark', 999))
-            else:
-                if user_mark:
-                    sorted_colleges = sorted(colleges, key=lambda c: abs(c.get('cutoff_mark', 0) - user_mark))
-                else:
-                    sorted_colleges = sorted(colleges, key=lambda c: c.get('cutoff_mark', 0), reverse=True)
+            sorted_colleges = self.sort_category(category, colleges, user_mark)
             
             college_groups = {}
             for c in sorted_colleges:
@@ -0,0 +1,112 @@
+import logging
+import re
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("tnea_ai.templates")
+
+OFF_TOPIC_REPLY = ("I'm sorry, but I can only help with TNEA engineering admissions, college counselling, rank "
+                   "predictions, and career guidance. If you have questions about engineering colleges in Tamil "
+                   "Nadu, cutoffs, or the counselling process, I'd be happy to assist!")
+
+# (lowest percentile, competitiveness, what it usually opens up); checked top-down
+_PERCENTILE_BANDS = [
+    (98.0, "highly competitive",
+     "Tier 1 colleges (CEG, MIT, PSG Tech, SSN and similar) are realistic targets for many branches, "
+     "though the most sought-after ones such as CSE at CEG may still close above you."),
+    (90.0, "competitive",
+     "Strong Tier 2 colleges are likely options, and some Tier 1 colleges may be possible in less "
+     "crowded branches."),
+    (75.0, "moderately competitive",
+     "Tier 2 and Tier 3 colleges are likely options; popular branches at top colleges will be a reach."),
+    (50.0, "average",
+     "Tier 3 colleges are likely options, and being flexible on branch or district widens your choices."),
+    (0.0, "below average",
+     "Options through general counselling are limited, so consider less competitive branches, colleges "
+     "outside the big cities and, as a fallback, management quota seats (fees vary by college)."),
+]
+
+# Greeting words echoed back, so "Vanakkam" gets "Vanakkam" rather than "Hello"
+_SALUTATIONS = [
+    (re.compile(r"\bvanakk?am\b", re.I), "Vanakkam"),
+    (re.compile(r"\bgood\s+morning\b", re.I), "Good morning"),
+    (re.compile(r"\bgood\s+afternoon\b", re.I), "Good afternoon"),
+    (re.compile(r"\bgood\s+evening\b", re.I), "Good evening"),
+]
+
+_GREETING_OPENERS = [
+    "I'm TNEA AI, your engineering admissions counsellor.",
+    "Good to see you here! I'm TNEA AI.",
+    "Welcome to TNEA AI.",
+]
+
+_HELP_LINE = ("I can predict your percentile and rank from your cutoff, suggest colleges, build a "
+              "choice-filling list, or explain branch trends and the counselling process. "
+              "What's your cutoff mark?")
+
+
+def _fmt(value) -> str:
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+class TemplateResponder:
+    """
+    Renders answers for deterministic intents (greetings, percentile predictions, trend lookups,
+    off-topic refusals) from already-computed Predictor / TrendAnalysis output, without an LLM
+    call. Wording stays probabilistic: predictions are estimates, never promises.
+    """
+
+    def off_topic(self) -> str:
+        return OFF_TOPIC_REPLY
+
+    def greeting(self, user_query: str, user_profile: Dict = None, history: List[Dict] = None) -> str:
+        salutation = next((word for pattern, word in _SALUTATIONS if pattern.search(user_query or "")), "Hello")
+        mark = (user_profile or {}).get("mark")
+        if mark:
+            rank = (user_profile or {}).get("rank")
+            rank_str = f" (estimated rank ~{rank})" if rank else ""
+            return (f"{salutation}! Welcome back. I still have your cutoff of **{_fmt(mark)}**{rank_str}. "
+                    "Would you like college suggestions, a choice-filling list, or help with something else?")
+        # Rotate the opener with the conversation length so repeated greetings don't read identically
+        turns = len(history or [])
+        return f"{salutation}! {_GREETING_OPENERS[turns % len(_GREETING_OPENERS)]} {_HELP_LINE}"
+
+    @staticmethod
+    def percentile_band(percentile: float):
+        return next(band for band in _PERCENTILE_BANDS if percentile >= band[0])
+
+    def prediction(self, mark: float, percentile: float, rank: int, total: int,
+                   lower: Optional[float] = None, upper: Optional[float] = None) -> str:
+        _, level, outlook = self.percentile_band(percentile)
+        range_str = ""
+        if lower is not None and upper is not None and (lower, upper) != (percentile, percentile):
+            range_str = f" (likely between {_fmt(lower)} and {_fmt(upper)})"
+        lines = [
+            f"📊 **Your Prediction**: Cutoff **{_fmt(mark)}** → Percentile **~{_fmt(percentile)}**{range_str} "
+            f"→ Rank **~{rank}** (out of ~{total} applicants)",
+            "",
+            f"- **How competitive is it?** A {_fmt(percentile)} percentile is {level}: roughly "
+            f"{max(0.0, 100 - percentile):.1f}% of applicants are expected to score above you.",
+            f"- **What it may open up:** {outlook}",
+            "- **Keep in mind:** this is an estimate from past years' cutoffs. Your actual rank depends on "
+            "this year's applicants, tie-breaks and your community quota, which can move closing "
+            "cutoffs noticeably.",
+            "",
+            "Tell me your community, preferred branch or district and I can suggest colleges you're "
+            "likely to get.",
+        ]
+        return "\n".join(lines)
+
+    @staticmethod
+    def has_trend_data(trend_text: str) -> bool:
+        """TrendAnalysis returns its tables with a 📊 / 📈 heading and plain sentences when data is missing."""
+        return bool(trend_text) and trend_text.lstrip().startswith(("📊", "📈"))
+
+    def trend(self, branch: str = None) -> str:
+        """Closing note under the trend table TrendAnalysis already rendered."""
+        if branch:
+            return (f"Cutoff trends reflect demand for {branch.upper()}, not the quality of any single "
+                    "college, and closing marks can shift by a few points from year to year. Share your "
+                    f"cutoff and I can check which colleges offering {branch.upper()} are within reach.")
+        return ("Rising cutoffs mean more students are choosing a branch, so expect tighter competition "
+                "there; falling ones can be good value if the branch fits your interests. Ask about any "
+                "branch for its year-by-year trend.")
@@ -0,0 +1,173 @@
+"""
+Vector store backends used by GuidelineRAG.
+
+- "numpy":  chunk embeddings in a memory-mapped .npy file plus a JSON sidecar with
+            ids, documents and metadata. Exact top-k is one mat-vec + argpartition;
+            no database, server or background threads.
+- "chroma": ChromaDB persistent client (the original backend).
+
+Both store L2-normalized vectors and return cosine similarity scores.
+Select with RAG_BACKEND=numpy|chroma.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from config import config
+from ai.embedding_search import top_k_scores
+
+logger = logging.getLogger("tnea_ai.ai.vector_stores")
+
+
+class NumpyVectorStore:
+    """
+    In-process exact vector store for small corpora (the guidelines are ~130 chunks).
+
+    Layout:
+        <path>/<name>/vectors.npy  - (n, dim) float32, rows L2-normalized, memory-mapped on open
+        <path>/<name>/meta.json    - {"ids": [...], "documents": [...], "metadatas": [...]}
+    Writes rewrite both files atomically (vectors first); the corpus is small enough
+    that appending in place would not be worth the complexity.
+    """
+    name = "numpy"
+
+    def __init__(self, path: str, collection_name: str):
+        self.dir = os.path.join(path, "numpy", collection_name)
+        self.vectors_path = os.path.join(self.dir, "vectors.npy")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._vectors = None
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.meta_path) and os.path.exists(self.vectors_path)):
+            return
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            vectors = np.load(self.vectors_path, mmap_mode="r")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable vector store at {self.dir}: {e}")
+            return
+        if vectors.shape[0] != len(meta.get("ids", [])):
+            logger.warning(f"Vector store at {self.dir} is inconsistent, starting empty.")
+            return
+        self._ids = meta["ids"]
+        self._documents = meta["documents"]
+        self._metadatas = meta["metadatas"]
+        self._vectors = vectors
+
+    def _save(self, ids, documents, metadatas, vectors: np.ndarray):
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_vectors = f"{self.vectors_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_vectors, vectors)
+        os.replace(tmp_vectors, self.vectors_path)
+        tmp_meta = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "documents": documents, "metadatas": metadatas}, f)
+        os.replace(tmp_meta, self.meta_path)
+        self._ids, self._documents, self._metadatas = ids, documents, metadatas
+        self._vectors = np.load(self.vectors_path, mmap_mode="r")
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    def documents(self) -> Tuple[List[str], List[str]]:
+        """(ids, documents) for every stored chunk."""
+        return list(self._ids), list(self._documents)
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]], embeddings: np.ndarray):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with self._lock:
+            if self._vectors is not None and len(self._vectors):
+                vectors = np.concatenate([np.asarray(self._vectors), vectors])
+            self._save(self._ids + list(ids), self._documents + list(documents),
+                       self._metadatas + list(metadatas), vectors)
+
+    def delete(self, ids: List[str]):
+        drop = set(ids)
+        with self._lock:
+            keep = [i for i, cid in enumerate(self._ids) if cid not in drop]
+            if len(keep) == len(self._ids):
+                return
+            vectors = np.asarray(self._vectors)[keep] if self._vectors is not None else np.zeros((0, 0), np.float32)
+            self._save([self._ids[i] for i in keep], [self._documents[i] for i in keep],
+                       [self._metadatas[i] for i in keep], vectors)
+
+    def query(self, embedding: np.ndarray, n_results: int) -> List[Dict[str, Any]]:
+        """Exact top-n by cosine similarity: [{"id", "document", "metadata", "score"}], best first."""
+        if self._vectors is None or not len(self._ids):
+            return []
+        query = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        idx, scores = top_k_scores(query @ self._vectors.T, n_results)
+        return [{"id": self._ids[i], "document": self._documents[i], "metadata": self._metadatas[i], "score": float(s)}
+                for i, s in zip(idx[0], scores[0])]
+
+
+class ChromaVectorStore:
+    """ChromaDB persistent collection; embeddings are always supplied by the caller."""
+    name = "chroma"
+
+    def __init__(self, path: str, collection_name: str):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(name=collection_name, embedding_function=None)
+        # Chroma returns distances; the conversion to cosine similarity depends on the space
+        self.space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def ids(self) -> List[str]:
+        return self.collection.get(include=[])["ids"]
+
+    def documents(self) -> Tuple[List[str], List[str]]:
+        results = self.collection.get(include=["documents"])
+        return results["ids"], results["documents"]
+
+    def add(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]], embeddings: np.ndarray):
+        self.collection.add(ids=list(ids), documents=list(documents), metadatas=list(metadatas),
+                            embeddings=np.asarray(embeddings, dtype=np.float32).tolist())
+
+    def delete(self, ids: List[str]):
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def _similarity(self, distance: float) -> float:
+        if self.space == "l2":
+            return 1.0 - distance / 2.0  # squared L2 between unit vectors
+        return 1.0 - distance  # cosine / ip distances
+
+    def query(self, embedding: np.ndarray, n_results: int) -> List[Dict[str, Any]]:
+        results = self.collection.query(query_embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
+                                        n_results=n_results)
+        # Chroma returns a list of lists (one list per query)
+        return [{"id": i, "document": d, "metadata": m or {}, "score": self._similarity(dist)}
+                for i, d, m, dist in zip(results["ids"][0], results["documents"][0],
+                                         results["metadatas"][0], results["distances"][0])]
+
+
+STORES = {
+    NumpyVectorStore.name: NumpyVectorStore,
+    ChromaVectorStore.name: ChromaVectorStore,
+}
+
+
+def create_vector_store(path: str, collection_name: str, name: str = None):
+    """Opens the configured vector store backend."""
+    name = (name or config.RAG_BACKEND).lower()
+    if name not in STORES:
+        raise ValueError(f"Unknown RAG_BACKEND '{name}'. Choose one of: {', '.join(STORES)}")
+    return STORES[name](path, collection_name)
@@ -36,6 +36,12 @@ class Config:
         elif "MODEL_NAME" in st.secrets:
              os.environ["MODEL_NAME"] = st.secrets["MODEL_NAME"]
 
+        # FAST_MODEL_NAME
+        if "nvidia" in st.secrets and "FAST_MODEL_NAME" in st.secrets["nvidia"]:
+             os.environ["FAST_MODEL_NAME"] = st.secrets["nvidia"]["FAST_MODEL_NAME"]
+        elif "FAST_MODEL_NAME" in st.secrets:
+             os.environ["FAST_MODEL_NAME"] = st.secrets["FAST_MODEL_NAME"]
+
         # DEBUG
         if "app" in st.secrets and "DEBUG" in st.secrets["app"]:
              os.environ["DEBUG"] = str(st.secrets["app"]["DEBUG"])
@@ -51,6 +57,18 @@ class Config:
     NVIDIA_API_KEY = os.getenv("NVIDIA_API_KEY")
     NVIDIA_API_BASE = os.getenv("NVIDIA_API_BASE", "https://integrate.api.nvidia.com/v1")
     MODEL_NAME = os.getenv("MODEL_NAME", "qwen/qwen3-coder-480b-a35b-instruct")
+    # Small model for routing, name resolution and greetings (llm_profiles.py); empty = MODEL_NAME everywhere
+    FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "")
+    LLM_PROFILE_MODELS = os.getenv("LLM_PROFILE_MODELS", "")  # per-profile overrides: "greeting=model,routing=model"
+    LLM_PRICE_PER_1K_TOKENS = os.getenv("LLM_PRICE_PER_1K_TOKENS", "")  # "model=price,..." for the per-profile cost report
+    # Estimated input-token budgets for the data-heavy prompts (lowest-priority rows are trimmed first)
+    PROMPT_BUDGET_COLLEGES = int(os.getenv("PROMPT_BUDGET_COLLEGES", "1800"))
+    PROMPT_BUDGET_CHOICE_FILLING = int(os.getenv("PROMPT_BUDGET_CHOICE_FILLING", "2400"))
+    # Intents answered from local templates (ai/template_responder.py) instead of an LLM completion;
+    # those also listed in TEMPLATE_ELABORATE_INTENTS stream an LLM elaboration after the template
+    TEMPLATE_INTENTS = [i.strip().upper() for i in os.getenv(
+        "TEMPLATE_INTENTS", "GREETING,PREDICT_PERCENTILE,TREND_ANALYSIS").split(",") if i.strip()]
+    TEMPLATE_ELABORATE_INTENTS = [i.strip().upper() for i in os.getenv("TEMPLATE_ELABORATE_INTENTS", "").split(",") if i.strip()]
     
     # App Settings
     APP_NAME = os.getenv("APP_NAME", "TNEA AI")
@@ -62,14 +80,66 @@ class Config:
     SRC_DIR = BASE_DIR / "src"
     DATA_DIR = BASE_DIR / "data"
     CONVERSATIONS_DIR = SRC_DIR / "conversations"
-    
+
+    # Shared LLM gateway: one HTTP pool per endpoint, global admission control
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+    LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "16"))
+    LLM_KEEPALIVE_EXPIRY_S = float(os.getenv("LLM_KEEPALIVE_EXPIRY_S", "60"))
+    LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "600"))  # per HTTP read/write (openai default)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # upstream requests in flight per process
+    LLM_RATE_LIMIT_RPM = float(os.getenv("LLM_RATE_LIMIT_RPM", "40"))  # API quota in requests/minute; 0 = unlimited
+    LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "10"))
+
+    # LLM completion cache (SQLite); per-call TTLs override the default
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() in ("true", "1", "yes")
+    LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", str(DATA_DIR / "llm_cache.sqlite3")))
+    LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "86400"))
+    LLM_CACHE_BRANCH_TTL_S = float(os.getenv("LLM_CACHE_BRANCH_TTL_S", "604800"))  # career / skill answers per branch
+    LLM_COALESCE_REQUESTS = os.getenv("LLM_COALESCE_REQUESTS", "True").lower() in ("true", "1", "yes")  # join identical in-flight calls
+
+    # LLM call resilience: deadlines, retries, hedging, fallback models, circuit breaker
+    LLM_TTFT_TIMEOUT_S = float(os.getenv("LLM_TTFT_TIMEOUT_S", "20"))  # wait for the first streamed token
+    LLM_TOTAL_TIMEOUT_S = float(os.getenv("LLM_TOTAL_TIMEOUT_S", "120"))  # whole call, retries included
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))  # full-jitter backoff base / cap
+    LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "8"))
+    LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "0"))  # duplicate a silent stream after this long; 0 = off
+    LLM_FALLBACK_MODELS = [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if m.strip()]  # same endpoint
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # consecutive failures that open a model's circuit
+    LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+    # Offline record/replay of LLM calls (llm_cassette.py); replay needs no network or API key
+    LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "").lower()  # "" (off) | record | replay
+    LLM_CASSETTE_PATH = Path(os.getenv("LLM_CASSETTE_PATH", str(DATA_DIR / "cassettes" / "llm.jsonl")))
+    LLM_CASSETTE_LATENCY_SCALE = float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "0"))  # 0 = instant, 1 = as recorded
+
+    # Embeddings
+    EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch | onnx
+    EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")  # file in the model's HF repo
+    EMBEDDING_ONNX_PATH = os.getenv("EMBEDDING_ONNX_PATH")  # local int8 .onnx (tokenizer.json alongside); overrides FILE
+    EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+    EMBEDDING_CACHE_DIR = Path(os.getenv("EMBEDDING_CACHE_DIR", str(DATA_DIR / "embedding_cache")))
+    EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float32")  # float32 | float16
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+    RAG_BACKEND = os.getenv("RAG_BACKEND", "numpy")  # numpy | chroma
+    RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "20"))  # shortlist size per retriever before fusion
+    RAG_BM25_WEIGHT = float(os.getenv("RAG_BM25_WEIGHT", "0.4"))  # 0 = vector only, 1 = BM25 only
+    RAG_MIN_RELATIVE_SCORE = float(os.getenv("RAG_MIN_RELATIVE_SCORE", "0.6"))  # drop chunks below this x best
+    RAG_RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "")  # e.g. cross-encoder/ms-marco-MiniLM-L-6-v2; empty = off
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))  # cached guidance answers; 0 = off
+    ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", "86400"))
+    ANSWER_CACHE_MIN_SIMILARITY = float(os.getenv("ANSWER_CACHE_MIN_SIMILARITY", "0.92"))  # question cosine for a hit
+    BRANCH_INDEX_NLIST = int(os.getenv("BRANCH_INDEX_NLIST", "0"))  # IVF lists; 0 = sqrt(documents)
+    BRANCH_INDEX_NPROBE = int(os.getenv("BRANCH_INDEX_NPROBE", "16"))  # lists scanned per query
+    BRANCH_INDEX_EXACT_BELOW = int(os.getenv("BRANCH_INDEX_EXACT_BELOW", "20000"))  # brute-force corpora up to this size
+
     # Ensure directories exist
     CONVERSATIONS_DIR.mkdir(parents=True, exist_ok=True)
 
     @classmethod
     def validate(cls):
         """Validate critical configuration."""
-        if not cls.NVIDIA_API_KEY:
+        if not cls.NVIDIA_API_KEY and cls.LLM_CASSETTE_MODE != "replay":
             raise ValueError("Missing NVIDIA_API_KEY. Please set it in .env file.")
         
 config = Config()
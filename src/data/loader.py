@@ -35,6 +35,7 @@ class DataEngine:
         # self.seats = []   # Removed in favor of SQLite
         self.guidelines = ""
         self.percentile_ranges = None
+        self._predictions = None  # predictions.json, loaded on first use (~17k rows)
         
         # SQLite Connection
         self.db_path = os.path.join(self.data_dir, "tnea.db")
@@ -212,6 +213,49 @@ class DataEngine:
             logger.error(f"DB Error get_seats: {e}")
             return 0
 
+    def get_predictions(self) -> List[Dict]:
+        """Per college/branch/community predicted closing percentiles (predictions.json)."""
+        if self._predictions is None:
+            try:
+                with open(os.path.join(self.data_dir, "json/predictions.json"), "r") as f:
+                    self._predictions = json.load(f)
+                logger.info(f"Loaded {len(self._predictions)} prediction records")
+            except Exception as e:
+                logger.error(f"Error loading predictions: {e}")
+                self._predictions = []
+        return self._predictions
+
+    def get_latest_branch_cutoffs(self) -> Dict[tuple, Dict]:
+        """
+        Latest-year cutoffs for every college+branch in one query.
+        Returns {(college_code, branch_code): {'year', 'branch_name', 'cutoffs': {community: mark}}}.
+        """
+        if not self.conn:
+            return {}
+
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT c.* FROM cutoffs c
+                JOIN (SELECT college_code, branch_code, MAX(year) AS year FROM cutoffs GROUP BY college_code, branch_code) latest
+                ON c.college_code = latest.college_code AND c.branch_code = latest.branch_code AND c.year = latest.year
+            """)
+            results = {}
+            for row in cursor.fetchall():
+                r = dict(row)
+                results[(str(r['college_code']), r['branch_code'])] = {
+                    'year': r['year'],
+                    'branch_name': r['branch_name'],
+                    'cutoffs': {
+                        'OC': r['oc'], 'BC': r['bc'], 'BCM': r['bcm'], 'MBC': r['mbc'],
+                        'SC': r['sc'], 'SCA': r['sca'], 'ST': r['st']
+                    },
+                }
+            return results
+        except Exception as e:
+            logger.error(f"DB Error get_latest_branch_cutoffs: {e}")
+            return {}
+
     def get_guidelines(self) -> str:
         """Returns the TNEA guidelines text."""
         return self.guidelines
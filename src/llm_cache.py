@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import config
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.llm.cache")
+
+
+def completion_key(model: str, messages: List[Dict[str, Any]], **params) -> str:
+    """Stable hash of everything that determines a completion: model, messages (incl. system) and sampling."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params},
+                         sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    SQLite store of LLM completions, shared by every LLMClient in the process (and by
+    other processes using the same file).
+
+    One row per completion key with an absolute expiry, so each call site can choose its
+    own TTL. Expired rows are purged when the file is opened and then at most every
+    PURGE_INTERVAL_S from put(), so the file stays bounded by live entries.
+
+    Reads are fast, but a write commits and may wait up to the busy timeout on another
+    worker's lock, so coroutines use aget()/aput(), which run on a worker thread and keep
+    the shared event loop free.
+    """
+
+    PURGE_INTERVAL_S = 3600.0
+
+    def __init__(self, path: str = None):
+        self.path = str(path or config.LLM_CACHE_PATH)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._purged_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_expiry ON completions (expires_at)")
+            conn.commit()
+            self._conn = conn
+            self._purge(conn)
+        return self._conn
+
+    def _purge(self, conn: sqlite3.Connection) -> int:
+        """Deletes expired rows; the caller holds the lock."""
+        self._purged_at = time.time()
+        removed = conn.execute("DELETE FROM completions WHERE expires_at <= ?", (self._purged_at,)).rowcount
+        conn.commit()
+        if removed:
+            metrics.incr("llm.cache.purged", removed)
+        return removed
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached completion for `key`, or None if missing or expired."""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT content FROM completions WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            metrics.incr("llm.cache.misses")
+            return None
+        self.hits += 1
+        metrics.incr("llm.cache.hits")
+        return row[0]
+
+    def put(self, key: str, model: str, content: str, ttl_s: float):
+        if not content or ttl_s <= 0:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)",
+                             (key, model, content, now, now + ttl_s))
+                conn.commit()
+                if now - self._purged_at >= self.PURGE_INTERVAL_S:
+                    self._purge(conn)
+        except sqlite3.Error as e:
+            # Cache is an optimisation only: a read-only disk must not fail the request
+            logger.warning(f"LLM cache write failed: {e}")
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() on a worker thread, for coroutines."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, model: str, content: str, ttl_s: float):
+        """put() on a worker thread, for coroutines."""
+        await asyncio.to_thread(self.put, key, model, content, ttl_s)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge(self._connect())
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM completions")
+            conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_shared_cache: Optional[CompletionCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """Process-wide cache at LLM_CACHE_PATH, or None when LLM_CACHE_ENABLED is off."""
+    global _shared_cache
+    if not config.LLM_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = CompletionCache()
+        return _shared_cache
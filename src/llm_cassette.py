@@ -0,0 +1,256 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from config import config
+from llm_cache import completion_key
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.llm.cassette")
+
+MODES = ("record", "replay")
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded interaction for a request."""
+
+
+def _stream_chunk(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def _completion(content: str, usage: Optional[Dict[str, int]]):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                           usage=SimpleNamespace(**usage) if usage else None)
+
+
+class Cassette:
+    """
+    Recorded LLM interactions at the chat-completions transport, below LLMClient's cache,
+    retries and profiles, so everything above runs exactly as it does live.
+
+    record: requests go upstream and every finished interaction is appended to the JSONL
+    file at `path` (request key, model, messages, params, content, and for streams each
+    chunk with its offset from the request). Streams closed early (hedge losers, cancelled
+    turns) and failed calls are not written.
+
+    replay: requests are answered from the file, with no network or API key. Repeated
+    identical requests get their recordings in order (the last one repeats). Streamed
+    chunks keep their recorded spacing multiplied by `latency_scale` (0 = instant, 1 = as
+    recorded); non-streamed answers wait their recorded latency times the same factor. A
+    request that was never recorded raises CassetteMiss, which LLMClient reports like any
+    failed call (and counts as llm.cassette.misses).
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.path = str(path)
+        self.mode = mode
+        self.latency_scale = max(0.0, latency_scale)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._played: Dict[str, int] = defaultdict(int)
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            logger.warning(f"Cassette {self.path} not found; every request will miss")
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+        logger.info(f"Cassette {self.path}: {sum(map(len, self._entries.values()))} interaction(s) loaded")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(map(len, self._entries.values()))
+
+    @staticmethod
+    def key(model: str, messages: list, stream: bool, params: dict) -> str:
+        return completion_key(model, messages, stream=stream, **params)
+
+    def _write(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._entries[entry["key"]].append(entry)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        metrics.incr("llm.cassette.recorded")
+
+    def _next(self, key: str, model: str) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                metrics.incr("llm.cassette.misses")
+                raise CassetteMiss(f"no recorded interaction for this {model} request in {self.path}")
+            index = min(self._played[key], len(entries) - 1)
+            self._played[key] += 1
+        metrics.incr("llm.cassette.replayed")
+        return entries[index]
+
+    def _entry(self, key, model, messages, stream, params) -> Dict[str, Any]:
+        return {"key": key, "model": model, "messages": messages, "stream": stream, "params": params,
+                "recorded_at": time.time()}
+
+    # Async transport (AsyncOpenAI().chat.completions.create)
+
+    async def create(self, upstream, model: str, messages: list, stream: bool = False, **params):
+        key = self.key(model, messages, stream, params)
+        if self.mode == "replay":
+            entry = self._next(key, model)
+            if stream:
+                return _ReplayStream(entry["chunks"], self.latency_scale)
+            await asyncio.sleep(entry.get("latency_s", 0) * self.latency_scale)
+            return _completion(entry["content"], entry.get("usage"))
+
+        start = time.perf_counter()
+        response = await upstream.chat.completions.create(model=model, messages=messages, stream=stream, **params)
+        entry = self._entry(key, model, messages, stream, params)
+        if stream:
+            return _RecordingStream(response, start, entry, self._write)
+        self._write_completion(entry, response, time.perf_counter() - start)
+        return response
+
+    # Blocking transport (OpenAI().chat.completions.create, non-streaming only)
+
+    def create_sync(self, upstream, model: str, messages: list, stream: bool = False, **params):
+        key = self.key(model, messages, stream, params)
+        if self.mode == "replay":
+            entry = self._next(key, model)
+            time.sleep(entry.get("latency_s", 0) * self.latency_scale)
+            return _completion(entry["content"], entry.get("usage"))
+        start = time.perf_counter()
+        response = upstream.chat.completions.create(model=model, messages=messages, stream=stream, **params)
+        self._write_completion(self._entry(key, model, messages, stream, params), response,
+                               time.perf_counter() - start)
+        return response
+
+    def _write_completion(self, entry: Dict[str, Any], response, latency_s: float):
+        usage = getattr(response, "usage", None)
+        entry.update(content=response.choices[0].message.content, latency_s=round(latency_s, 4),
+                     usage={"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+                     if usage else None)
+        self._write(entry)
+
+    def async_client(self, upstream=None):
+        """Stands in for an AsyncOpenAI client; `upstream` is the real one (record mode only)."""
+        cassette = self
+
+        class _Completions:
+            async def create(self, model, messages, stream=False, **params):
+                return await cassette.create(upstream, model, messages, stream, **params)
+
+        return SimpleNamespace(chat=SimpleNamespace(completions=_Completions()))
+
+    def sync_client(self, upstream=None):
+        """Stands in for an OpenAI client, including with_options()."""
+        cassette = self
+
+        class _Completions:
+            def create(self, model, messages, stream=False, **params):
+                return cassette.create_sync(upstream, model, messages, stream, **params)
+
+        class _Client:
+            chat = SimpleNamespace(completions=_Completions())
+
+            def with_options(self, **options):
+                return cassette.sync_client(upstream.with_options(**options) if upstream is not None else None)
+
+        return _Client()
+
+
+class _ReplayStream:
+    """A recorded stream: chunks at their recorded offsets (scaled), closable like a live response."""
+
+    def __init__(self, chunks: List[List], latency_scale: float):
+        self._chunks = chunks
+        self._scale = latency_scale
+
+    async def close(self):
+        pass
+
+    async def __aiter__(self):
+        previous = 0.0
+        for offset, text in self._chunks:
+            if self._scale:
+                await asyncio.sleep(max(0.0, offset - previous) * self._scale)
+            previous = offset
+            yield _stream_chunk(text)
+
+
+class _RecordingStream:
+    """Passes a live stream through, noting each chunk's offset; written once read to the end."""
+
+    def __init__(self, response, start: float, entry: Dict[str, Any], write):
+        self._response = response
+        self._start = start
+        self._entry = entry
+        self._write = write
+
+    async def close(self):
+        close = getattr(self._response, "close", None)
+        if close is not None:
+            await close()
+
+    async def __aiter__(self):
+        chunks = []
+        async for chunk in self._response:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                chunks.append([round(time.perf_counter() - self._start, 4), text])
+            yield chunk
+        self._entry.update(chunks=chunks, content="".join(text for _, text in chunks))
+        self._write(self._entry)
+
+
+_shared: Dict[tuple, Cassette] = {}
+_shared_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Process-wide cassette from LLM_CASSETTE_MODE / LLM_CASSETTE_PATH, or None when off."""
+    mode = config.LLM_CASSETTE_MODE
+    if not mode:
+        return None
+    key = (mode, str(config.LLM_CASSETTE_PATH))
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = Cassette(config.LLM_CASSETTE_PATH, mode, config.LLM_CASSETTE_LATENCY_SCALE)
+        return _shared[key]
+
+
+def replay_without_key(path) -> bool:
+    """
+    For the scripts that talk to the live API (tests/test_harness.py, test_async_agent.py,
+    test_ai_router.py): with no NVIDIA_API_KEY and LLM_CASSETTE_MODE unset, replay `path`
+    instead of failing on auth. An explicit LLM_CASSETTE_MODE/PATH always wins. Call before
+    any LLMClient is built. Returns False when replay was chosen but `path` was never
+    recorded: the caller fails with record_hint() rather than skipping, so a missing
+    recording is noticed instead of passing silently.
+    """
+    if config.NVIDIA_API_KEY or config.LLM_CASSETTE_MODE:
+        return config.LLM_CASSETTE_MODE != "replay" or os.path.exists(config.LLM_CASSETTE_PATH)
+    if not os.getenv("LLM_CASSETTE_PATH"):
+        config.LLM_CASSETTE_PATH = path
+    config.LLM_CASSETTE_MODE = "replay"
+    logger.info(f"No NVIDIA_API_KEY: replaying {config.LLM_CASSETTE_PATH}")
+    return os.path.exists(config.LLM_CASSETTE_PATH)
+
+
+def record_hint(script: str) -> str:
+    """Failure message for a script whose cassette is missing: how to record it with a key."""
+    return (f"no NVIDIA_API_KEY and no cassette at {config.LLM_CASSETTE_PATH} to replay. "
+            f"Record it once with a key and commit the file:\n"
+            f"  NVIDIA_API_KEY=... LLM_CASSETTE_MODE=record "
+            f"LLM_CASSETTE_PATH={config.LLM_CASSETTE_PATH} python {script}")
@@ -1,29 +1,168 @@
+import asyncio
 import logging
-from openai import AsyncOpenAI
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
 import json
 import time
 from config import config
+from llm_cache import completion_key, get_completion_cache
+from llm_cassette import Cassette, get_cassette
+from llm_limits import PriorityLimiter
+from llm_profiles import GenerationProfile, get_profile, record_usage
+from llm_resilience import (CallPolicy, CircuitOpenError, LLMTimeout, ModelBreakers, backoff_delay,
+                            describe_error, is_model_missing, is_retryable)
+from llm_singleflight import singleflight
+from utils.cancellation import CancellationToken, OperationCancelled
+from utils.metrics import metrics
+from utils.tokens import estimate_tokens
 
 logger = logging.getLogger("tnea_ai.llm")
 
+# Failed calls return/yield text starting with these (callers must not treat it as an answer)
+ERROR_PREFIX = "Error communicating with NVIDIA API"
+SERVICE_UNAVAILABLE_PREFIX = "⚠️ AI Service Unavailable"
+# Appended when a stream fails after tokens were shown (the partial answer is not reusable either)
+INTERRUPTED_NOTICE = "\n\n⚠️ Response interrupted"
+
+
+def is_error_response(text: str) -> bool:
+    return bool(text) and (text.startswith((ERROR_PREFIX, SERVICE_UNAVAILABLE_PREFIX)) or INTERRUPTED_NOTICE in text)
+
+
+class LLMGateway:
+    """
+    Process-wide owner of the OpenAI-compatible HTTP clients and the request limiter.
+
+    Every LLMClient (agent, router, career and skill components, in every session) borrows
+    its clients from here, so the process keeps one keep-alive pool per endpoint instead of
+    one per component, and all upstream requests pass one PriorityLimiter. The openai clients'
+    own retries are off: LLMClient retries under its CallPolicy and the model circuit breakers.
+
+    httpx async pools belong to the event loop that opened their connections, so async
+    clients are kept per running loop; clients of loops that have since closed are dropped.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LLMGateway, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._lock = threading.Lock()
+        self._async_clients: Dict[Tuple[asyncio.AbstractEventLoop, str, str], AsyncOpenAI] = {}
+        self._sync_clients: Dict[Tuple[str, str], OpenAI] = {}
+        self.limiter = PriorityLimiter(
+            max_concurrency=config.LLM_MAX_CONCURRENCY,
+            rate_per_min=config.LLM_RATE_LIMIT_RPM,
+            burst=config.LLM_RATE_LIMIT_BURST,
+        )
+        # Per-model circuit breakers, shared so every session sees a failing model at once
+        self.breakers = ModelBreakers()
+        self._initialized = True
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY_S,
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        return httpx.Timeout(config.LLM_TIMEOUT_S, connect=5.0)
+
+    def async_client(self, base_url: str, api_key: str) -> AsyncOpenAI:
+        """The AsyncOpenAI client for this endpoint on the running event loop."""
+        loop = asyncio.get_running_loop()
+        key = (loop, base_url, api_key)
+        with self._lock:
+            client = self._async_clients.get(key)
+            if client is None:
+                for stale in [k for k in self._async_clients if k[0].is_closed()]:
+                    del self._async_clients[stale]
+                client = AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=self._timeout(), max_retries=0,
+                                     http_client=httpx.AsyncClient(limits=self._limits()))
+                self._async_clients[key] = client
+                logger.info(f"LLM HTTP pool opened for {base_url} ({len(self._async_clients)} event loop(s))")
+            return client
+
+    def sync_client(self, base_url: str, api_key: str) -> OpenAI:
+        """Blocking client for scripts; thread-safe and shared by all threads."""
+        key = (base_url, api_key)
+        with self._lock:
+            client = self._sync_clients.get(key)
+            if client is None:
+                client = OpenAI(base_url=base_url, api_key=api_key, timeout=self._timeout(), max_retries=0,
+                                http_client=httpx.Client(limits=self._limits()))
+                self._sync_clients[key] = client
+            return client
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            pools = len(self._async_clients) + len(self._sync_clients)
+        return {"http_pools": pools, **self.limiter.stats(), "breakers": self.breakers.states()}
+
 
 class LLMClient:
-    def __init__(self, model_name=None, base_url=None, api_key=None):
+    """
+    Thin per-component facade (model, endpoint, cache policy) over the shared LLMGateway.
+    Constructing one opens no connections.
+    """
+
+    def __init__(self, model_name=None, base_url=None, api_key=None, cache=None, cassette: Cassette = None):
         self.model_name = model_name or config.MODEL_NAME
         self.base_url = base_url or config.NVIDIA_API_BASE
         self.api_key = api_key or config.NVIDIA_API_KEY
+        # Preference order; fallbacks share the endpoint and are used while earlier circuits are open
+        self.models = [self.model_name] + [m for m in config.LLM_FALLBACK_MODELS if m != self.model_name]
+        # Record/replay of upstream calls (llm_cassette.py); None when LLM_CASSETTE_MODE is off
+        self.cassette = cassette if cassette is not None else get_cassette()
         
         if not self.api_key:
-             raise ValueError("API Key is required. Set NVIDIA_API_KEY in .env or pass it explicitly.")
+             if self.cassette is None or self.cassette.mode != "replay":
+                 raise ValueError("API Key is required. Set NVIDIA_API_KEY in .env or pass it explicitly.")
+             self.api_key = "replay"
 
-        self.client = AsyncOpenAI(
-            base_url=self.base_url,
-            api_key=self.api_key
-        )
+        self.gateway = LLMGateway()
+        self._client = None  # pinned client (tests); normally the gateway's pool is used
+        # Completion cache (llm_cache.py); None when LLM_CACHE_ENABLED is off. Off by default with a
+        # cassette, so every call reaches (and is recorded on / served from) the cassette.
+        if cache is None and self.cassette is None:
+            cache = get_completion_cache()
+        self.cache = cache
+        # Identical concurrent requests share one upstream call (llm_singleflight.py)
+        self.singleflight = singleflight if config.LLM_COALESCE_REQUESTS else None
         logger.info(f"LLM client initialized: model={self.model_name}")
 
-    async def generate_response(self, prompt: str, system_prompt: str = None, context: list = None, stream: bool = False):
-        """Generates a response from the LLM using NVIDIA API."""
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Async client for the running event loop (must be used inside one)."""
+        if self.cassette is not None and self.cassette.mode == "replay":
+            return self.cassette.async_client()
+        client = self._client or self.gateway.async_client(self.base_url, self.api_key)
+        return self.cassette.async_client(client) if self.cassette is not None else client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    @property
+    def sync_client(self) -> OpenAI:
+        if self.cassette is not None and self.cassette.mode == "replay":
+            return self.cassette.sync_client()
+        client = self.gateway.sync_client(self.base_url, self.api_key)
+        return self.cassette.sync_client(client) if self.cassette is not None else client
+
+    @staticmethod
+    def _build_messages(prompt: str, system_prompt: str = None, context: list = None) -> list:
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
@@ -32,68 +171,458 @@ class LLMClient:
             messages.extend(context)
             
         messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _cache_key(self, key: str, cache_ttl: float = None, use_cache: bool = True) -> Optional[str]:
+        """`key` when this call reads and writes the completion cache, else None."""
+        if self.cache is None:
+            return None
+        if not use_cache or (cache_ttl is not None and cache_ttl <= 0):
+            metrics.incr("llm.cache.bypass")
+            return None
+        return key
+
+    async def _cache_lookup(self, key: str, cache_ttl: float = None, use_cache: bool = True):
+        """(cache key or None when not caching this call, cached content or None)."""
+        cache_key = self._cache_key(key, cache_ttl, use_cache)
+        return cache_key, (await self.cache.aget(cache_key) if cache_key is not None else None)
+
+    def _cache_lookup_sync(self, key: str, cache_ttl: float = None, use_cache: bool = True):
+        cache_key = self._cache_key(key, cache_ttl, use_cache)
+        return cache_key, (self.cache.get(cache_key) if cache_key is not None else None)
 
+    def _should_store(self, key: str, content: str) -> bool:
+        return key is not None and bool(content) and not is_error_response(content)
+
+    async def _cache_store(self, key: str, content: str, cache_ttl: float = None, model: str = None):
+        if self._should_store(key, content):
+            await self.cache.aput(key, model or self.model_name, content,
+                                  config.LLM_CACHE_TTL_S if cache_ttl is None else cache_ttl)
+
+    def _cache_store_sync(self, key: str, content: str, cache_ttl: float = None, model: str = None):
+        if self._should_store(key, content):
+            self.cache.put(key, model or self.model_name, content,
+                           config.LLM_CACHE_TTL_S if cache_ttl is None else cache_ttl)
+
+    @staticmethod
+    async def _replay(content: str):
+        """Streams a cached completion with the same (token, sources) shape as a live stream."""
+        yield content, []
+        yield "", []
+
+    async def _cancellable(self, stream, cancel: CancellationToken, profile: GenerationProfile, max_tokens: int):
+        """
+        `stream`, ended as soon as `cancel` fires (or the consumer stops reading). Every read
+        races the token, so a stream stalled before or between chunks is abandoned at once: the
+        pending read is cancelled and the stream closed, which gives up its limiter slot or queue
+        place and closes the HTTP response, or detaches it from a shared flight. Output tokens
+        that were not generated are counted as llm.cancel.tokens_saved (against the token cap).
+        """
+        received = []
+        finished = False
+        cancelled = asyncio.ensure_future(cancel.wait())  # one waiter for the whole stream
+        read = None
         try:
-            if stream:
-                response = await self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages,
-                    temperature=0.6,
-                    top_p=0.7,
-                    max_tokens=2048,
-                    stream=True
-                )
-                async def streamer():
-                    full_response = ""
-                    async for chunk in response:
-                        if chunk.choices and chunk.choices[0].delta.content is not None:
-                            token = chunk.choices[0].delta.content
-                            full_response += token
-                            yield token, []
-                    yield "", []
-                return streamer()
+            cancel.raise_if_cancelled()
+            while True:
+                read = asyncio.ensure_future(stream.__anext__())
+                await asyncio.wait((read, cancelled), return_when=asyncio.FIRST_COMPLETED)
+                if not read.done():
+                    raise OperationCancelled(cancel.reason)
+                try:
+                    item = read.result()
+                except StopAsyncIteration:
+                    finished = True
+                    return
+                received.append(item[0])
+                yield item
+                cancel.raise_if_cancelled()
+        except OperationCancelled:
+            pass
+        finally:
+            cancelled.cancel()
+            if read is not None and not read.done():
+                read.cancel()
+                await asyncio.gather(read, return_exceptions=True)
+            await stream.aclose()
+            if not finished:
+                saved = max(0, max_tokens - estimate_tokens("".join(received)))
+                metrics.incr("llm.cancelled")
+                metrics.incr("llm.cancelled." + ("mid_stream" if received else "before_first_token"))
+                metrics.incr("llm.cancel.tokens_saved", saved)
+                metrics.incr(f"llm.profile.{profile.name}.tokens_saved", saved)
+                logger.info(f"LLM stream ({profile.name}) cancelled after {len(received)} chunk(s); "
+                            f"~{saved} output tokens saved")
+
+    @staticmethod
+    def _prompt_text(messages: list) -> str:
+        return "".join(m.get("content") or "" for m in messages)
+
+    @staticmethod
+    def _delta(chunk) -> str:
+        return chunk.choices[0].delta.content if chunk.choices else None
+
+    @staticmethod
+    async def _close(response):
+        # Releases the HTTP connection right away instead of when the response is collected
+        close = getattr(response, "close", None)
+        if close is not None:
+            await close()
+
+    def _candidates(self, model: str) -> list:
+        """A profile's model first, then this client's own model and fallbacks."""
+        return [model] + [m for m in self.models if m != model]
+
+    def _pick(self, models: list) -> str:
+        model = self.gateway.breakers.pick(models)
+        if model is None:
+            raise CircuitOpenError(f"circuit open for {', '.join(models)}")
+        return model
+
+    def _retry_delay(self, policy: CallPolicy, error: Exception, model: str, attempt_no: int,
+                     time_left: float) -> Optional[float]:
+        """
+        Books a failed attempt on `model`'s circuit and returns the backoff before the next one;
+        re-raises `error` when it is not retryable or no retry fits in the policy or deadline.
+        None means `model` does not exist upstream: its circuit is opened and the next
+        candidate is tried at once, without using up a retry.
+        """
+        if is_model_missing(error):
+            self.gateway.breakers.trip(model)
+            metrics.incr("llm.model_missing")
+            return None
+        if not is_retryable(error):
+            self.gateway.breakers.record_success(model)  # the model answered; the request was bad
+            raise error
+        self.gateway.breakers.record_failure(model)
+        delay = backoff_delay(attempt_no)
+        if attempt_no == policy.max_retries or delay >= time_left:
+            raise error
+        logger.warning(f"LLM call to {model} failed ({describe_error(error)}); "
+                       f"retry {attempt_no + 1}/{policy.max_retries} in {delay:.2f}s")
+        metrics.incr("llm.retries")
+        return delay
+
+    def _succeeded(self, model: str, models: list):
+        self.gateway.breakers.record_success(model)
+        if model != models[0]:
+            metrics.incr("llm.fallback")
+
+    async def _with_retries(self, policy: CallPolicy, attempt, deadline: float, models: list,
+                            lane: str = "interactive", hold_slot: bool = False):
+        """
+        Runs `attempt(model, timeout_s)` on the first of `models` whose circuit admits it and
+        retries retryable failures after a full-jitter backoff (on the next model once a circuit
+        opens), until policy.max_retries or the deadline is used up. Returns (model, result).
+        Each attempt takes its own limiter slot in `lane` and gives it back before the backoff,
+        so a failing upstream does not keep slots from queued calls while it sleeps. With
+        `hold_slot` the winning attempt's slot is kept and the caller releases it.
+        """
+        loop = asyncio.get_running_loop()
+        attempt_no = 0
+        while True:
+            model = self._pick(models)
+            await self.gateway.limiter.acquire(lane)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.gateway.limiter.release()
+                metrics.incr("llm.deadline_exceeded")
+                raise LLMTimeout(f"no answer within {policy.timeout_s:.0f}s")
+            try:
+                result = await attempt(model, remaining)
+            except BaseException as e:
+                self.gateway.limiter.release()
+                if not isinstance(e, Exception):
+                    raise
+                delay = self._retry_delay(policy, e, model, attempt_no, deadline - loop.time())
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    attempt_no += 1
+                continue
+            if not hold_slot:
+                self.gateway.limiter.release()
+            self._succeeded(model, models)
+            return model, result
+
+    def _with_retries_sync(self, policy: CallPolicy, attempt, deadline: float, models: list, lane: str = "batch"):
+        """_with_retries for blocking callers (time.perf_counter deadline, blocking limiter and sleep)."""
+        attempt_no = 0
+        while True:
+            model = self._pick(models)
+            self.gateway.limiter.acquire_blocking(lane)
+            try:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    metrics.incr("llm.deadline_exceeded")
+                    raise LLMTimeout(f"no answer within {policy.timeout_s:.0f}s")
+                result = attempt(model, remaining)
+            except LLMTimeout:
+                raise
+            except Exception as e:
+                error = e
             else:
-                completion = await self.client.chat.completions.create(
-                    model=self.model_name,
+                self._succeeded(model, models)
+                return model, result
+            finally:
+                self.gateway.limiter.release()
+            delay = self._retry_delay(policy, error, model, attempt_no, deadline - time.perf_counter())
+            if delay is not None:
+                time.sleep(delay)
+                attempt_no += 1
+
+    async def _complete(self, messages: list, profile: GenerationProfile, params: dict, cache_key: str = None,
+                        cache_ttl: float = None, lane: str = "interactive", policy: CallPolicy = None):
+        policy = policy or profile.policy or CallPolicy()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def attempt(model, timeout_s):
+            try:
+                return await asyncio.wait_for(self.client.chat.completions.create(
+                    model=model,
                     messages=messages,
-                    temperature=0.6,
-                    top_p=0.7,
-                    max_tokens=2048,
-                    stream=False
-                )
-                content = completion.choices[0].message.content
-                return content, []
+                    stream=False,
+                    **params
+                ), timeout_s)
+            except asyncio.TimeoutError:
+                raise LLMTimeout(f"{model} gave no answer within {timeout_s:.1f}s") from None
+
+        try:
+            model, completion = await self._with_retries(policy, attempt, start + policy.timeout_s,
+                                                         self._candidates(profile.model or self.model_name), lane)
+            content = completion.choices[0].message.content
+            usage = getattr(completion, "usage", None)
+            record_usage(profile.name, model,
+                         usage.prompt_tokens if usage else estimate_tokens(self._prompt_text(messages)),
+                         usage.completion_tokens if usage else estimate_tokens(content))
+            await self._cache_store(cache_key, content, cache_ttl, model)
+            return content, []
         except Exception as e:
-            error_msg = f"Error communicating with NVIDIA API: {str(e)}"
+            error_msg = f"{ERROR_PREFIX}: {describe_error(e)}"
             logger.error(error_msg)
-            if stream:
-                async def error_streamer():
-                    yield f"⚠️ AI Service Unavailable: {error_msg}", []
-                return error_streamer()
             return error_msg, []
+        finally:
+            metrics.observe("llm.latency_s", loop.time() - start)
+            metrics.observe(f"llm.profile.{profile.name}.latency_s", loop.time() - start)
 
-    async def chat(self, messages: list) -> str:
-        """Chat with the LLM using the completions API."""
+    async def _open_stream(self, model: str, messages: list, params: dict):
+        """Opens a stream and reads up to its first content token: (response, chunk iterator, token)."""
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+        chunks = response.__aiter__()
+        try:
+            async for chunk in chunks:
+                token = self._delta(chunk)
+                if token:
+                    return response, chunks, token
+            return response, chunks, ""
+        except BaseException:
+            await self._close(response)
+            raise
+
+    async def _first_token(self, model: str, messages: list, params: dict, hedge_after_s: float, timeout_s: float):
+        """
+        _open_stream within `timeout_s`. If the stream is still silent after `hedge_after_s` and the
+        limiter has a slot free right now, a duplicate request races it; the loser is cancelled and
+        closed, and the hedge's slot is returned as soon as the race is decided.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_s
+        attempts = [asyncio.ensure_future(self._open_stream(model, messages, params))]
+        hedged, winner, error = False, None, None
         try:
-            completion = await self.client.chat.completions.create(
-                model=self.model_name,
+            if 0 < hedge_after_s < timeout_s:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_after_s)
+                if not done and self.gateway.limiter.try_acquire():
+                    hedged = True
+                    metrics.incr("llm.hedge.sent")
+                    attempts.append(asyncio.ensure_future(self._open_stream(model, messages, params)))
+            pending = set(attempts)
+            while pending and winner is None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+            if winner is not None:
+                if hedged and winner is attempts[-1]:
+                    metrics.incr("llm.hedge.won")
+                return winner.result()
+            if error is not None and not pending:
+                raise error
+            raise LLMTimeout(f"{model} sent no tokens within {timeout_s:.1f}s")
+        finally:
+            for task in attempts:
+                if task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    await self._close(task.result()[0])
+            if hedged:
+                self.gateway.limiter.release()
+
+    async def _stream(self, messages: list, profile: GenerationProfile, params: dict, cache_key: str = None,
+                      cache_ttl: float = None, lane: str = "interactive", policy: CallPolicy = None):
+        policy = policy or profile.policy or CallPolicy()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + policy.timeout_s
+
+        def attempt(model, remaining):
+            return self._first_token(model, messages, params, policy.hedge_after_s,
+                                     min(policy.ttft_timeout_s, remaining))
+
+        try:
+            model, (response, chunks, first) = await self._with_retries(
+                policy, attempt, deadline, self._candidates(profile.model or self.model_name), lane, hold_slot=True)
+        except Exception as e:
+            error_msg = f"{ERROR_PREFIX}: {describe_error(e)}"
+            logger.error(error_msg)
+            yield f"{SERVICE_UNAVAILABLE_PREFIX}: {error_msg}", []
+            return
+        # The winning attempt's concurrency slot is held until the stream is read to the end or closed
+        try:
+            metrics.observe("llm.ttft_s", loop.time() - start)
+            metrics.observe(f"llm.profile.{profile.name}.ttft_s", loop.time() - start)
+
+            tokens = [first] if first else []
+            try:
+                if first:
+                    yield first, []
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - loop.time()))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        metrics.incr("llm.deadline_exceeded")
+                        raise LLMTimeout(f"answer not finished within {policy.timeout_s:.0f}s") from None
+                    token = self._delta(chunk)
+                    if token:
+                        tokens.append(token)
+                        yield token, []
+            except Exception as e:
+                # Retrying now would repeat text the user has already read: end the answer visibly instead
+                if is_retryable(e):
+                    self.gateway.breakers.record_failure(model)
+                metrics.incr("llm.interrupted")
+                logger.error(f"LLM stream from {model} interrupted: {describe_error(e)}")
+                yield f"{INTERRUPTED_NOTICE} ({describe_error(e)})", []
+                return
+            finally:
+                await self._close(response)
+        finally:
+            self.gateway.limiter.release()
+        metrics.observe("llm.latency_s", loop.time() - start)
+        metrics.observe(f"llm.profile.{profile.name}.latency_s", loop.time() - start)
+        content = "".join(tokens)
+        record_usage(profile.name, model, estimate_tokens(self._prompt_text(messages)), estimate_tokens(content))
+        # Only a stream read to the end is a complete answer worth caching
+        await self._cache_store(cache_key, content, cache_ttl, model)
+        yield "", []
+
+    async def generate_response(self, prompt: str, system_prompt: str = None, context: list = None, stream: bool = False,
+                                max_tokens: int = None, cache_ttl: float = None, use_cache: bool = True,
+                                lane: str = "interactive", policy: CallPolicy = None,
+                                profile: Union[str, GenerationProfile] = None, cancel: CancellationToken = None):
+        """
+        Generates a response from the LLM using NVIDIA API. Must be awaited; see generate_response_sync.
+        `profile` (llm_profiles.py) picks the model, token cap, sampling and stop sequences;
+        max_tokens and policy override the profile's.
+        Identical requests within `cache_ttl` seconds (default LLM_CACHE_TTL_S) are answered from
+        the completion cache; use_cache=False or cache_ttl=0 always calls the API. Identical
+        requests already in flight are joined rather than sent again. Upstream calls queue in
+        `lane` ("interactive" before "batch") for the gateway's concurrency and rate limits.
+        `policy` sets the call's deadlines, retries and hedging (defaults from config); failures
+        come back as text for which is_error_response() is true.
+        `cancel` abandons the call when the token fires: a stream just ends, a plain call raises
+        OperationCancelled.
+        """
+        profile = get_profile(profile)
+        messages = self._build_messages(prompt, system_prompt, context)
+        params = profile.params(max_tokens)
+        key = completion_key(profile.model or self.model_name, messages, **params)
+        cache_key, cached = await self._cache_lookup(key, cache_ttl, use_cache)
+        if cached is not None:
+            return self._replay(cached) if stream else (cached, [])
+
+        if stream:
+            open_stream = lambda: self._stream(messages, profile, params, cache_key, cache_ttl, lane, policy)
+            tokens = self.singleflight.stream(key, open_stream) if self.singleflight else open_stream()
+            return self._cancellable(tokens, cancel, profile, params["max_tokens"]) if cancel else tokens
+        complete = lambda: self._complete(messages, profile, params, cache_key, cache_ttl, lane, policy)
+        call = self.singleflight.call(key, complete) if self.singleflight else complete()
+        return await (cancel.run(call) if cancel else call)
+
+    def generate_response_sync(self, prompt: str, system_prompt: str = None, context: list = None,
+                               max_tokens: int = None, cache_ttl: float = None, use_cache: bool = True,
+                               lane: str = "batch", policy: CallPolicy = None,
+                               profile: Union[str, GenerationProfile] = None):
+        """
+        Blocking, non-streaming facade over the same request (and cache) for scripts and test
+        harnesses. Returns (content, []). Uses the gateway's sync client rather than running the
+        async one in a throwaway event loop, whose pooled connections would not survive the loop.
+        Queues in the "batch" lane by default so scripts yield to interactive sessions. Retries,
+        fallback models and the total deadline follow the policy exactly as the async path does.
+        """
+        profile = get_profile(profile)
+        messages = self._build_messages(prompt, system_prompt, context)
+        params = profile.params(max_tokens)
+        cache_key, cached = self._cache_lookup_sync(completion_key(profile.model or self.model_name, messages, **params),
+                                                    cache_ttl, use_cache)
+        if cached is not None:
+            return cached, []
+
+        policy = policy or profile.policy or CallPolicy()
+        start = time.perf_counter()
+
+        def attempt(model, timeout_s):
+            # Retries are ours (_with_retries_sync), not the openai client's
+            return self.sync_client.with_options(timeout=timeout_s, max_retries=0).chat.completions.create(
+                model=model,
                 messages=messages,
-                temperature=0.6,
-                top_p=0.7,
-                max_tokens=2048,
-                stream=False
+                stream=False,
+                **params
             )
-            return completion.choices[0].message.content
+
+        try:
+            model, completion = self._with_retries_sync(policy, attempt, start + policy.timeout_s,
+                                                        self._candidates(profile.model or self.model_name), lane)
+            content = completion.choices[0].message.content
+            usage = getattr(completion, "usage", None)
+            record_usage(profile.name, model,
+                         usage.prompt_tokens if usage else estimate_tokens(self._prompt_text(messages)),
+                         usage.completion_tokens if usage else estimate_tokens(content))
+            self._cache_store_sync(cache_key, content, cache_ttl, model)
+            return content, []
         except Exception as e:
-            logger.error(f"Error communicating with NVIDIA API: {str(e)}")
-            return f"Error communicating with NVIDIA API: {str(e)}"
+            error_msg = f"{ERROR_PREFIX}: {describe_error(e)}"
+            logger.error(error_msg)
+            return error_msg, []
+        finally:
+            metrics.observe(f"llm.profile.{profile.name}.latency_s", time.perf_counter() - start)
+
+    async def chat(self, messages: list, profile: Union[str, GenerationProfile] = None) -> str:
+        """Chat with the LLM using the completions API."""
+        profile = get_profile(profile)
+        content, _ = await self._complete(messages, profile, profile.params())
+        return content
 
 if __name__ == "__main__":
     try:
         logger.info(f"Loading config... Model: {config.MODEL_NAME}")
         client = LLMClient()
         logger.info(f"Testing connection to NVIDIA API...")
-        response, _ = client.generate_response("Hello, are you online?", system_prompt="You are a helpful AI assistant.")
+        response, _ = client.generate_response_sync("Hello, are you online?", system_prompt="You are a helpful AI assistant.")
         logger.info(f"Response: {response}")
     except Exception as e:
         logger.error(f"FAILED: {e}")
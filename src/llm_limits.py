@@ -0,0 +1,176 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.llm.limits")
+
+# Lower value is served first; FIFO within a lane
+LANES: Dict[str, int] = {"interactive": 0, "batch": 1}
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "wake", "granted", "cancelled")
+
+    def __init__(self, priority: int, seq: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class PriorityLimiter:
+    """
+    Process-wide admission control for upstream LLM requests.
+
+    A request needs a concurrency slot (at most `max_concurrency` in flight) and, when
+    `rate_per_min` > 0, a token from a bucket refilled at the API quota rate with room for
+    `burst` requests. Queued requests are admitted by lane priority, then arrival order.
+
+    State is guarded by a threading lock and waiters are woken through their own loop
+    (call_soon_threadsafe) or a threading.Event, so one limiter covers every event loop and
+    blocking caller in the process.
+    """
+
+    def __init__(self, max_concurrency: int, rate_per_min: float = 0, burst: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_per_s = max(0.0, rate_per_min) / 60.0
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._active = 0
+        self._tokens = float(self.burst)
+        self._refilled_at = clock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._timer: Optional[threading.Timer] = None
+
+    def _refill(self):
+        if self.rate_per_s:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_s)
+            self._refilled_at = now
+
+    def _can_admit(self) -> bool:
+        return self._active < self.max_concurrency and (not self.rate_per_s or self._tokens >= 1)
+
+    def _admit(self):
+        self._active += 1
+        if self.rate_per_s:
+            self._tokens -= 1
+
+    def _try_fast_path(self) -> bool:
+        """Admits immediately when nobody is queued and capacity is available (lock held)."""
+        self._refill()
+        if not self._queue and self._can_admit():
+            self._admit()
+            return True
+        return False
+
+    def _dispatch(self):
+        """Admits queued waiters in priority order; wakes them outside the lock."""
+        to_wake = []
+        with self._lock:
+            self._refill()
+            while self._queue and self._can_admit():
+                waiter = heapq.heappop(self._queue)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                self._admit()
+                to_wake.append(waiter)
+            if self._queue and self._active < self.max_concurrency and self._timer is None:
+                # Blocked on the bucket only: come back when the next token is due
+                delay = (1 - self._tokens) / self.rate_per_s
+                self._timer = threading.Timer(delay, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        for waiter in to_wake:
+            waiter.wake()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self._dispatch()
+
+    def _enqueue(self, lane: str, wake: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(LANES.get(lane, LANES["batch"]), next(self._seq), wake)
+        heapq.heappush(self._queue, waiter)
+        metrics.incr(f"llm.limiter.queued.{lane}")
+        return waiter
+
+    def _abandon(self, waiter: _Waiter):
+        """A waiter gave up: return its slot if it was already granted, else drop it from the queue."""
+        with self._lock:
+            granted = waiter.granted
+            waiter.cancelled = True
+        if granted:
+            self.release()
+
+    async def acquire(self, lane: str = "interactive"):
+        start = time.perf_counter()
+        with self._lock:
+            if self._try_fast_path():
+                metrics.observe(f"llm.limiter.wait_s.{lane}", 0.0)
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+
+            def wake():
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+            waiter = self._enqueue(lane, wake)
+        self._dispatch()
+        try:
+            await future
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        metrics.observe(f"llm.limiter.wait_s.{lane}", time.perf_counter() - start)
+
+    def acquire_blocking(self, lane: str = "batch"):
+        """acquire() for synchronous callers (blocks the calling thread)."""
+        start = time.perf_counter()
+        with self._lock:
+            if self._try_fast_path():
+                metrics.observe(f"llm.limiter.wait_s.{lane}", 0.0)
+                return
+            event = threading.Event()
+            waiter = self._enqueue(lane, event.set)
+        self._dispatch()
+        try:
+            event.wait()
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        metrics.observe(f"llm.limiter.wait_s.{lane}", time.perf_counter() - start)
+
+    def try_acquire(self) -> bool:
+        """Takes a slot only if one is free right now, never queueing (optional work such as hedges)."""
+        with self._lock:
+            return self._try_fast_path()
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+        self._dispatch()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            self._refill()
+            return {
+                "active": self._active,
+                "queued": sum(1 for w in self._queue if not w.cancelled),
+                "max_concurrency": self.max_concurrency,
+                "tokens": round(self._tokens, 2) if self.rate_per_s else None,
+            }
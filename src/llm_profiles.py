@@ -0,0 +1,153 @@
+import logging
+from typing import Dict, List, Optional, Union
+
+from config import config
+from llm_resilience import CallPolicy
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.llm.profiles")
+
+DEFAULT_MAX_TOKENS = 2048
+
+
+class GenerationProfile:
+    """
+    Model, output cap, sampling and stop sequences (plus an optional CallPolicy) for one kind
+    of LLM call. model=None means the calling LLMClient's own model (MODEL_NAME).
+    input_budget caps the estimated prompt tokens where the prompt is built from trimmable
+    data (ai/prompt_builder.py); None means no cap.
+    """
+
+    def __init__(self, name: str, model: str = None, max_tokens: int = DEFAULT_MAX_TOKENS, temperature: float = 0.6,
+                 top_p: float = 0.7, stop: List[str] = None, policy: CallPolicy = None, input_budget: int = None):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.stop = list(stop) if stop else None
+        self.policy = policy
+        self.input_budget = input_budget
+
+    def params(self, max_tokens: int = None) -> dict:
+        """Request parameters (also part of the completion cache key)."""
+        params = {"temperature": self.temperature, "top_p": self.top_p, "max_tokens": max_tokens or self.max_tokens}
+        if self.stop:
+            params["stop"] = self.stop
+        return params
+
+    def __repr__(self) -> str:
+        return f"GenerationProfile({self.name!r}, model={self.model or 'default'}, max_tokens={self.max_tokens})"
+
+
+def _model_overrides() -> Dict[str, str]:
+    """LLM_PROFILE_MODELS="greeting=meta/llama-3.1-8b-instruct,routing=..." pins models per profile."""
+    overrides = {}
+    for item in config.LLM_PROFILE_MODELS.split(","):
+        name, _, model = item.partition("=")
+        if name.strip() and model.strip():
+            overrides[name.strip()] = model.strip()
+    return overrides
+
+
+def _build_profiles() -> Dict[str, GenerationProfile]:
+    # Tiering follows tests/model_sizing_recommendations.md: classification, extraction and
+    # greetings are safe on a small model; reasoning over cutoffs, rules and trends is not.
+    fast = config.FAST_MODEL_NAME or None
+    profiles = [
+        GenerationProfile("default"),
+        # JSON intent + entities; deterministic, and the rule-based router covers failures
+        GenerationProfile("routing", model=fast, max_tokens=256, temperature=0.0, top_p=1.0,
+                          policy=CallPolicy(timeout_s=15, max_retries=1)),
+        # One college name; the user's own wording is used if this fails
+        GenerationProfile("resolver", model=fast, max_tokens=50, temperature=0.0, top_p=1.0, stop=["\n"],
+                          policy=CallPolicy(timeout_s=10, max_retries=1)),
+        GenerationProfile("greeting", model=fast, max_tokens=150, temperature=0.7, top_p=0.9),
+        GenerationProfile("prediction", max_tokens=768, temperature=0.3),
+        GenerationProfile("colleges", max_tokens=2048, temperature=0.4, input_budget=config.PROMPT_BUDGET_COLLEGES),
+        GenerationProfile("choice_filling", max_tokens=3072, temperature=0.3,
+                          input_budget=config.PROMPT_BUDGET_CHOICE_FILLING),
+        GenerationProfile("branch_info", max_tokens=1024),
+        GenerationProfile("career", max_tokens=1024),
+        GenerationProfile("trends", max_tokens=768, temperature=0.4),
+        GenerationProfile("guidance", max_tokens=1024, temperature=0.3),
+    ]
+    for name, model in _model_overrides().items():
+        for profile in profiles:
+            if profile.name == name:
+                profile.model = model
+    return {p.name: p for p in profiles}
+
+
+PROFILES: Dict[str, GenerationProfile] = _build_profiles()
+
+# Profile for the answer the agent streams back for each intent
+INTENT_PROFILES: Dict[str, str] = {
+    "GREETING": "greeting",
+    "PREDICT_PERCENTILE": "prediction",
+    "SUGGEST_COLLEGES": "colleges",
+    "CHOICE_FILLING": "choice_filling",
+    "CAREER_PLANNING": "career",
+    "SKILL_GUIDANCE": "career",
+    "TREND_ANALYSIS": "trends",
+    # Guideline RAG answers (the agent's catch-all branch)
+    "GUIDANCE": "guidance",
+    "CHECK_VACANCY": "guidance",
+    "GENERAL_QUERY": "guidance",
+}
+
+
+def get_profile(profile: Union[str, GenerationProfile, None]) -> GenerationProfile:
+    if isinstance(profile, GenerationProfile):
+        return profile
+    if profile and profile not in PROFILES:
+        logger.warning(f"Unknown generation profile {profile!r}; using default")
+    return PROFILES.get(profile or "default", PROFILES["default"])
+
+
+def profile_for_intent(intent: str) -> GenerationProfile:
+    return PROFILES[INTENT_PROFILES.get(intent, "default")]
+
+
+def _prices() -> Dict[str, float]:
+    """LLM_PRICE_PER_1K_TOKENS="model=price,..." (any currency); unpriced models cost 0."""
+    prices = {}
+    for item in config.LLM_PRICE_PER_1K_TOKENS.split(","):
+        model, _, price = item.partition("=")
+        try:
+            prices[model.strip()] = float(price)
+        except ValueError:
+            continue
+    return prices
+
+
+def record_usage(profile: str, model: str, prompt_tokens: int, completion_tokens: int):
+    """Accumulates tokens and cost for the profile report."""
+    metrics.incr(f"llm.profile.{profile}.calls")
+    metrics.incr(f"llm.profile.{profile}.prompt_tokens", prompt_tokens)
+    metrics.incr(f"llm.profile.{profile}.completion_tokens", completion_tokens)
+    price = _prices().get(model)
+    if price:
+        metrics.incr(f"llm.profile.{profile}.cost", (prompt_tokens + completion_tokens) / 1000 * price)
+
+
+def profile_report() -> Dict[str, Dict[str, Optional[float]]]:
+    """Calls, latency, time to first token, tokens and cost per profile used so far in this process."""
+    report = {}
+    for name, profile in PROFILES.items():
+        calls = metrics.counter(f"llm.profile.{name}.calls")
+        if not calls:
+            continue
+        latency = metrics.summary(f"llm.profile.{name}.latency_s")
+        ttft = metrics.summary(f"llm.profile.{name}.ttft_s")
+        report[name] = {
+            "model": profile.model or config.MODEL_NAME,
+            "calls": calls,
+            "latency_p50_s": latency.get("p50"),
+            "latency_p95_s": latency.get("p95"),
+            "ttft_p50_s": ttft.get("p50"),
+            "prompt_tokens": metrics.counter(f"llm.profile.{name}.prompt_tokens"),
+            "completion_tokens": metrics.counter(f"llm.profile.{name}.completion_tokens"),
+            "cost": metrics.counter(f"llm.profile.{name}.cost"),
+        }
+    return report
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import openai
+
+from config import config
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.llm.resilience")
+
+
+class CallPolicy:
+    """
+    Deadlines and retry behaviour for one LLM call site. Unset values come from config.
+
+    ttft_timeout_s: longest wait for the first streamed token (per attempt)
+    timeout_s:      deadline for the whole call, retries and streaming included
+    max_retries:    extra attempts after a retryable failure before the first token
+    hedge_after_s:  when a stream has produced nothing after this long, send a duplicate
+                    request and keep whichever answers first (0 = never)
+    """
+
+    def __init__(self, ttft_timeout_s: float = None, timeout_s: float = None, max_retries: int = None,
+                 hedge_after_s: float = None):
+        self.ttft_timeout_s = config.LLM_TTFT_TIMEOUT_S if ttft_timeout_s is None else ttft_timeout_s
+        self.timeout_s = config.LLM_TOTAL_TIMEOUT_S if timeout_s is None else timeout_s
+        self.max_retries = config.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.hedge_after_s = config.LLM_HEDGE_AFTER_S if hedge_after_s is None else hedge_after_s
+
+    def __repr__(self) -> str:
+        return (f"CallPolicy(ttft={self.ttft_timeout_s}s, total={self.timeout_s}s, "
+                f"retries={self.max_retries}, hedge_after={self.hedge_after_s}s)")
+
+
+class LLMTimeout(asyncio.TimeoutError):
+    """A deadline of the CallPolicy ran out (retryable while no token has been streamed)."""
+
+
+class CircuitOpenError(Exception):
+    """Every candidate model's breaker is open; the call fails without touching the network."""
+
+
+# Upstream health problems worth retrying (and counting against the model's breaker);
+# 4xx other than 408/429 are request errors and fail immediately.
+_RETRYABLE = (asyncio.TimeoutError, ConnectionError, openai.APITimeoutError, openai.APIConnectionError,
+              openai.RateLimitError, openai.InternalServerError)
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, _RETRYABLE):
+        return True
+    return isinstance(error, openai.APIStatusError) and (error.status_code >= 500 or error.status_code == 408)
+
+
+def is_model_missing(error: BaseException) -> bool:
+    """404 from the chat endpoint: the model name is unknown there (e.g. a mistyped FAST_MODEL_NAME)."""
+    return isinstance(error, openai.NotFoundError)
+
+
+def backoff_delay(attempt: int, base_s: float = None, cap_s: float = None) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    base_s = config.LLM_RETRY_BASE_S if base_s is None else base_s
+    cap_s = config.LLM_RETRY_MAX_S if cap_s is None else cap_s
+    return random.uniform(0, min(cap_s, base_s * (2 ** attempt)))
+
+
+def describe_error(error: BaseException) -> str:
+    return str(error) or type(error).__name__
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker: opens after `failure_threshold` consecutive retryable failures,
+    rejects calls for `reset_after_s`, then lets one trial call through (half-open). A trial
+    that never reports back (caller cancelled) is replaced after another `reset_after_s`.
+    """
+
+    def __init__(self, failure_threshold: int, reset_after_s: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self._clock() - self.opened_at >= self.reset_after_s else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        now = self._clock()
+        if state == "half_open" and (self._trial_at is None or now - self._trial_at >= self.reset_after_s):
+            self._trial_at = now
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_at = None
+
+    def trip(self):
+        """Opens the breaker right away, whatever the failure count (the model cannot answer at all)."""
+        self.failures = max(self.failures, self.failure_threshold)
+        self.opened_at = self._clock()
+        self._trial_at = None
+
+    def record_failure(self) -> bool:
+        """Returns True when this failure opened (or re-opened) the breaker."""
+        self.failures += 1
+        was_trial, self._trial_at = self._trial_at is not None, None
+        if was_trial or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self.opened_at = self._clock()
+            return True
+        return False
+
+
+class ModelBreakers:
+    """Breakers for the primary and fallback models, shared process-wide through the gateway."""
+
+    def __init__(self, failure_threshold: int = None, reset_after_s: float = None):
+        self.failure_threshold = config.LLM_BREAKER_FAILURES if failure_threshold is None else failure_threshold
+        self.reset_after_s = config.LLM_BREAKER_RESET_S if reset_after_s is None else reset_after_s
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def _get(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_after_s)
+        return breaker
+
+    def pick(self, models: List[str]) -> Optional[str]:
+        """First model in preference order whose breaker admits a call, or None."""
+        with self._lock:
+            for model in models:
+                if self._get(model).allow():
+                    return model
+        metrics.incr("llm.breaker.rejected")
+        return None
+
+    def record_success(self, model: str):
+        with self._lock:
+            self._get(model).record_success()
+
+    def record_failure(self, model: str):
+        with self._lock:
+            opened = self._get(model).record_failure()
+        if opened:
+            metrics.incr("llm.breaker.opened")
+            logger.warning(f"Circuit opened for model {model} after repeated failures; "
+                           f"retrying it in {self.reset_after_s:.0f}s")
+
+    def trip(self, model: str):
+        with self._lock:
+            self._get(model).trip()
+        metrics.incr("llm.breaker.opened")
+        logger.warning(f"Circuit opened for model {model}: the endpoint does not serve it; "
+                       f"retrying it in {self.reset_after_s:.0f}s")
+
+    def states(self) -> Dict[str, str]:
+        with self._lock:
+            return {model: breaker.state for model, breaker in self._breakers.items()}
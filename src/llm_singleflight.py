@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.llm.singleflight")
+
+
+class _CallFlight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """Items produced so far plus a wake-up event; late subscribers replay from the start."""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def push(self, item: Any):
+        self.items.append(item)
+        self._notify()
+
+    def finish(self, error: BaseException = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def changed(self) -> asyncio.Event:
+        return self._changed
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight LLM requests into one upstream call.
+
+    Flights are keyed by (event loop, request key): asyncio tasks and events belong to one
+    loop, so requests on different loops never share a flight.
+
+    Semantics:
+      - Every waiter on a flight gets the same result, exception or stream items; a stream
+        joined late replays what was already produced, then continues live.
+      - A waiter that is cancelled (or closes its stream early) only detaches. The upstream
+        call is cancelled when its last waiter leaves, and the flight is dropped at once so a
+        new request starts fresh instead of joining a cancelled call.
+      - Finished flights are forgotten immediately; reuse of finished results is the
+        completion cache's job, not this one's.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, str], _CallFlight] = {}
+        self._streams: Dict[Tuple[asyncio.AbstractEventLoop, str], _StreamFlight] = {}
+
+    def _forget(self, table: dict, flight_key, flight):
+        with self._lock:
+            if table.get(flight_key) is flight:
+                del table[flight_key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._streams)
+
+    async def call(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Awaits `fn()`, or the identical call already in flight."""
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self._lock:
+            flight = self._calls.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _CallFlight(loop.create_task(fn()))
+                self._calls[flight_key] = flight
+                flight.task.add_done_callback(lambda _: self._forget(self._calls, flight_key, flight))
+            flight.waiters += 1
+        metrics.incr("llm.singleflight.upstream" if leader else "llm.singleflight.coalesced")
+
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0 and not flight.task.done()
+                if abandoned and self._calls.get(flight_key) is flight:
+                    del self._calls[flight_key]
+            if abandoned:
+                flight.task.cancel()
+                metrics.incr("llm.singleflight.cancelled")
+
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Items of `open_stream()`, shared with every identical stream in flight."""
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self._lock:
+            flight = self._streams.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _StreamFlight()
+                self._streams[flight_key] = flight
+                flight.task = loop.create_task(self._produce(flight_key, flight, open_stream))
+            flight.subscribers += 1
+        metrics.incr("llm.singleflight.upstream" if leader else "llm.singleflight.coalesced")
+
+        position = 0
+        try:
+            while True:
+                while position < len(flight.items):
+                    position += 1
+                    yield flight.items[position - 1]
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.changed().wait()
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                abandoned = flight.subscribers == 0 and not flight.done
+                if abandoned and self._streams.get(flight_key) is flight:
+                    del self._streams[flight_key]
+            if abandoned:
+                flight.task.cancel()
+                metrics.incr("llm.singleflight.cancelled")
+
+    async def _produce(self, flight_key, flight: _StreamFlight, open_stream):
+        try:
+            async for item in open_stream():
+                flight.push(item)
+            flight.finish()
+        except asyncio.CancelledError:
+            flight.finish(asyncio.CancelledError())
+            raise
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            self._forget(self._streams, flight_key, flight)
+
+
+# One per process, shared by every LLMClient (the request key includes the model)
+singleflight = SingleFlight()
@@ -9,10 +9,13 @@ import plotly.graph_objects as go
 # Add src to path if needed
 sys.path.append(os.path.dirname(__file__))
 
-from agent.counsellor_agent import CounsellorAgent
+from agent.counsellor_agent import CANCELLED_NOTE, CounsellorAgent
 from agent.session_memory import SessionMemory
 from web.map_component import MapComponent
 from web.compare_component import CompareComponent
+from web.render_buffer import RenderBuffer
+from utils.async_bridge import AsyncBridge
+from utils.cancellation import CancellationToken
 
 # Page Config
 st.set_page_config(
@@ -327,6 +330,11 @@ if st.session_state.current_view == "chat":
 
     # User Input
     if prompt := st.chat_input("Ask about TNEA counselling, colleges, ranks, or career paths..."):
+        # A turn still generating for this session is superseded by the new message
+        if st.session_state.get("cancel_token") is not None:
+            st.session_state.cancel_token.cancel("superseded by a new message")
+        cancel = st.session_state.cancel_token = CancellationToken()
+
         # Clear visual feedback for processing
         with st.chat_message("user"):
             st.markdown(prompt)
@@ -336,29 +344,45 @@ if st.session_state.current_view == "chat":
         
         # Generate Assistant Response
         with st.chat_message("assistant"):
-            response_placeholder = st.empty()
+            # Finished paragraphs stay in their own elements; only the one being written is re-sent
+            response_area = st.container()
             
-            async def run_agent_stream():
-                full_response = ""
+            def render_agent_stream():
+                buffer = RenderBuffer(response_area.empty)
+                finished = False
+                # The agent runs on the process-wide background loop; chunks come back here
+                stream = AsyncBridge().stream(
+                    st.session_state.agent.process_query_stream(prompt, cancel=cancel), heartbeat_s=0.25)
                 try:
-                    # use generator from agent
-                    async for chunk in st.session_state.agent.process_query_stream(prompt):
-                        full_response += chunk
-                        response_placeholder.markdown(full_response + "▌")
-                    return full_response
+                    for chunk in stream:
+                        # None is a heartbeat: any st call raises Streamlit's rerun/stop request (new
+                        # message, view switch), so keep touching the page while the model is silent
+                        if chunk is None:
+                            buffer.heartbeat()
+                        else:
+                            buffer.append(chunk)
+                    finished = True
+                    return buffer.finish()
                 except Exception as e:
+                    finished = True
                     return f"Error: {e}"
+                finally:
+                    if not finished:
+                        # Abandoned render: stop the agent before its stream is closed below
+                        cancel.cancel("render abandoned")
+                    # Every exit (done, error, abandoned) stops the producer; a no-op once it has finished
+                    stream.close()
+                    if not finished and len(buffer):
+                        st.session_state.messages.append(
+                            {"role": "assistant", "content": f"{buffer.text}\n\n{CANCELLED_NOTE}"})
 
-            import asyncio
             try:
-                full_response = asyncio.run(run_agent_stream())
+                full_response = render_agent_stream()
                 
                 # If it started with Error:, handle gracefully
                 if full_response and full_response.startswith("Error:"):
                      st.error(full_response)
                 else:
-                    response_placeholder.markdown(full_response)
-                
                     # Auto-scroll and focus after response
                     st.components.v1.html(
                         """
@@ -383,7 +407,7 @@ if st.session_state.current_view == "chat":
             except Exception as e:
                 st.error(f"Error executing async agent: {e}")
                 full_response = "I encountered an error while processing your request. Please try again."
-                response_placeholder.markdown(full_response)
+                response_area.markdown(full_response)
 
 elif st.session_state.current_view == "analytics":
     st.header("📊 Analytics Dashboard")
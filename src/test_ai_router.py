@@ -1,7 +1,23 @@
+import os
+from unittest import mock
+
 from agent.intent_router import IntentRouter
+from config import config
+from llm_cassette import record_hint, replay_without_key
 import json
 
+# Replayed when no API key is set (record with LLM_CASSETTE_MODE=record, see README)
+CASSETTE_PATH = os.path.join(os.path.dirname(__file__), "tests", "cassettes", "ai_router.jsonl")
+
 def test_ai_router():
+    # Collected by pytest beside the unit tests: the cassette settings are put back afterwards
+    with mock.patch.multiple(config, LLM_CASSETTE_MODE=config.LLM_CASSETTE_MODE,
+                             LLM_CASSETTE_PATH=config.LLM_CASSETTE_PATH,
+                             NVIDIA_API_KEY=config.NVIDIA_API_KEY):
+        assert replay_without_key(CASSETTE_PATH), record_hint("test_ai_router.py")
+        check_router()
+
+def check_router():
     router = IntentRouter()
     
     test_cases = [
@@ -0,0 +1,316 @@
+"""
+How many concurrent students one worker can serve: simulated counselling sessions through
+CounsellorAgent.process_query_stream against a stubbed LLM.
+
+Each session is a student (random mark, district, branch and community) who walks one of the
+SCRIPTS turn by turn: prediction, then college suggestions, then choice filling, plus trend,
+career and process-guidance questions. Every session gets its own CounsellorAgent and
+SessionMemory, as a Streamlit session does, and all sessions share one event loop, as they do
+on the worker's background loop (utils/async_bridge.py). --concurrency sessions run at once
+until --sessions have finished; --think-ms adds an exponential pause between a student's turns.
+
+The LLM is tests/llm_stub_server.py, started in this process with the --profile latency preset
+(and --error-rate / --abort-rate chaos), or any OpenAI-compatible endpoint given by --llm-base,
+e.g. a stub in its own process so it does not share this worker's GIL. One session of each
+script runs first as a warm-up (models, indexes, database) and is not measured. The
+completion cache and the semantic answer cache (ai/answer_cache.py) are off, so every prompt is
+load: the scripts repeat the same guidance questions, which would otherwise be answered from
+the warm-up. --llm-cache keeps the completion cache on, in a throwaway file (never
+LLM_CACHE_PATH); --answer-cache keeps the answer cache on, emptied after the warm-up. The LLM limiter keeps its configured quota (LLM_RATE_LIMIT_RPM), which
+is usually the first limit hit; set LLM_RATE_LIMIT_RPM=0 to measure the worker itself.
+
+Reported:
+  throughput       turns/s and sessions/s over the measured run, failed turns
+  per step         time to first chunk (TTFC) and full-response percentiles, per script step
+  stages           where turn time goes, from utils.metrics: routing, data preparation, LLM
+                   concurrency queue, LLM time to first token, whole LLM calls, retrieval parts
+                   (the registry keeps the last 2,000 samples of each)
+  memory           worker RSS after warm-up, peak during the run, and at the end
+--json FILE writes the same numbers (and the arguments) to compare releases.
+
+Usage:
+    cd src
+    python tests/bench_agent_load.py [--sessions 200] [--concurrency 50] [--script all]
+        [--think-ms 0] [--profile typical] [--tokens 250] [--error-rate 0] [--abort-rate 0]
+        [--llm-base URL] [--seed 1] [--llm-cache] [--answer-cache] [--json report.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+from config import config
+from agent.counsellor_agent import CounsellorAgent
+from agent.session_memory import SessionMemory
+from ai.answer_cache import answer_cache
+from ai.model_provider import _rss_mb
+from llm_gateway import INTERRUPTED_NOTICE, is_error_response
+from llm_stub_server import PROFILES, StubServer
+from utils.metrics import MetricsRegistry, metrics
+
+# Script name -> [(step, query template)]; the steps are the rows of the per-step report
+SCRIPTS = {
+    "admission_journey": [
+        ("predict", "My cutoff is {mark}"),
+        ("suggest", "Suggest colleges in {district} for {branch}"),
+        ("choice_filling", "Help me with choice filling, my community is {community}"),
+        ("guidance", "What documents are needed for counselling registration?"),
+    ],
+    "bare_mark": [
+        ("predict", "{mark}"),
+        ("suggest", "Which colleges can I get for {branch}?"),
+        ("trend", "What are the cutoff trends for {branch}?"),
+    ],
+    "explorer": [
+        ("greeting", "hi"),
+        ("trend", "Which branches are in demand, are cutoffs increasing?"),
+        ("career", "What is the career scope of {branch}?"),
+        ("guidance", "What is the eligibility for TNEA and how many rounds are there?"),
+    ],
+}
+
+DISTRICTS = ["Chennai", "Coimbatore", "Madurai", "Trichy", "Salem", "Tirunelveli", "Erode", "Vellore"]
+BRANCHES = ["CSE", "ECE", "MECH", "IT", "EEE", "CIVIL", "AIDS"]
+COMMUNITIES = ["OC", "BC", "MBC", "SC"]
+
+# (label, metric) rows of the stage breakdown; indented rows are parts of the row above
+STAGES = [
+    ("routing", "agent.route_s"),
+    ("  LLM intent calls", "llm.profile.routing.latency_s"),
+    ("data preparation", "agent.prepare_s"),
+    ("  college resolver", "resolver.resolve_s"),
+    ("  branch index search", "branch_index.search_s"),
+    ("  guideline retrieval", "rag.retrieve_s"),
+    ("  embedding encode", "embedding.encode_s"),
+    ("LLM queue wait", "llm.limiter.wait_s.interactive"),
+    ("LLM time to first token", "llm.ttft_s"),
+    ("LLM call, whole", "llm.latency_s"),
+]
+
+
+def student(rng: random.Random) -> dict:
+    return {"mark": round(rng.uniform(120, 199.5) * 2) / 2, "district": rng.choice(DISTRICTS),
+            "branch": rng.choice(BRANCHES), "community": rng.choice(COMMUNITIES)}
+
+
+class LoadRun:
+    """One measured run: sessions, their per-turn samples, and an RSS sampler."""
+
+    def __init__(self, args, storage_dir: str):
+        self.args = args
+        self.storage_dir = storage_dir
+        self.rng = random.Random(args.seed)
+        self.samples = MetricsRegistry(max_samples=10 ** 6)
+        self.turns = 0
+        self.failed = 0
+        self.sessions = 0
+        self.rss_peak = 0.0
+
+    def _agent(self, session_id: str) -> CounsellorAgent:
+        memory = SessionMemory(session_id)
+        memory.file_path = os.path.join(self.storage_dir, f"{session_id}.json")
+        return CounsellorAgent(memory=memory)
+
+    async def session(self, session_id: str, script: str, measure: bool = True):
+        start = time.perf_counter()
+        # Built off the loop, as Streamlit builds it on the session's script thread
+        agent = await asyncio.to_thread(self._agent, session_id)
+        if measure:
+            self.samples.observe("session.setup_s", time.perf_counter() - start)
+        values = student(self.rng)
+        for i, (step, template) in enumerate(SCRIPTS[script]):
+            if i and self.args.think_ms:
+                await asyncio.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+            await self.turn(agent, step, template.format(**values), measure)
+        if measure:
+            self.sessions += 1
+
+    async def turn(self, agent: CounsellorAgent, step: str, query: str, measure: bool):
+        start = time.perf_counter()
+        first = None
+        failed = False
+        try:
+            async for chunk in agent.process_query_stream(query):
+                if first is None and chunk.strip():
+                    first = time.perf_counter() - start
+                if is_error_response(chunk) or INTERRUPTED_NOTICE in chunk:
+                    failed = True
+        except Exception as e:
+            print(f"  turn failed ({step}): {type(e).__name__}: {e}", file=sys.stderr)
+            failed = True
+        if not measure:
+            return
+        total = time.perf_counter() - start
+        self.turns += 1
+        self.failed += failed
+        for prefix in ("turn", f"step.{step}"):
+            self.samples.observe(f"{prefix}.full_s", total)
+            if first is not None:
+                self.samples.observe(f"{prefix}.ttfc_s", first)
+            if failed:
+                self.samples.incr(f"{prefix}.failed")
+
+    async def sample_rss(self):
+        while True:
+            self.rss_peak = max(self.rss_peak, _rss_mb() or 0.0)
+            await asyncio.sleep(0.1)
+
+    async def run(self) -> dict:
+        names = list(SCRIPTS) if self.args.script == "all" else [self.args.script]
+        for name in names:
+            await self.session(f"load_warmup_{name}", name, measure=False)
+        # Warm-up answers would turn the measured guidance turns into hits
+        answer_cache.clear()
+        metrics.reset()
+        rss_start = _rss_mb()
+        self.rss_peak = rss_start or 0.0
+
+        queue = asyncio.Queue()
+        for i in range(self.args.sessions):
+            queue.put_nowait((f"load_{i:05d}", names[i % len(names)]))
+
+        async def worker():
+            while not queue.empty():
+                session_id, script = queue.get_nowait()
+                await self.session(session_id, script)
+
+        sampler = asyncio.create_task(self.sample_rss())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(min(self.args.concurrency, self.args.sessions))))
+        duration = time.perf_counter() - start
+        sampler.cancel()
+        return self.report(duration, rss_start)
+
+    def report(self, duration: float, rss_start: float) -> dict:
+        steps = []
+        for step in dict.fromkeys(s for script in SCRIPTS.values() for s, _ in script):
+            full = self.samples.summary(f"step.{step}.full_s")
+            if full["count"]:
+                steps.append({"step": step, "full_s": full, "ttfc_s": self.samples.summary(f"step.{step}.ttfc_s"),
+                              "failed": int(self.samples.counter(f"step.{step}.failed"))})
+        return {
+            "args": vars(self.args),
+            "duration_s": duration,
+            "sessions": self.sessions,
+            "turns": self.turns,
+            "failed_turns": self.failed,
+            "turns_per_s": self.turns / duration if duration else 0.0,
+            "sessions_per_s": self.sessions / duration if duration else 0.0,
+            "session_setup_s": self.samples.summary("session.setup_s"),
+            "ttfc_s": self.samples.summary("turn.ttfc_s"),
+            "full_s": self.samples.summary("turn.full_s"),
+            "steps": steps,
+            "stages": {metric: metrics.summary(metric) for _, metric in STAGES},
+            "rss_mb": {"start": rss_start, "peak": self.rss_peak, "end": _rss_mb()},
+            "llm_queued": metrics.counter("llm.limiter.queued.interactive"),
+            "llm_interrupted": metrics.counter("llm.interrupted"),
+            "answer_cache_hits": answer_cache.hits,
+        }
+
+
+def _ms(summary: dict, key: str) -> str:
+    return f"{summary[key] * 1000:>8.0f}" if summary.get("count") else f"{'-':>8}"
+
+
+def print_report(report: dict):
+    print(f"\n{report['sessions']} sessions, {report['turns']} turns in {report['duration_s']:.1f}s: "
+          f"{report['turns_per_s']:.1f} turns/s, {report['sessions_per_s']:.2f} sessions/s, "
+          f"{report['failed_turns']} failed turns")
+    print(f"Session setup (agent + memory): p50 {_ms(report['session_setup_s'], 'p50').strip()} ms, "
+          f"p95 {_ms(report['session_setup_s'], 'p95').strip()} ms")
+
+    print(f"\n{'step':<16} {'turns':>6} {'failed':>7} {'TTFC p50':>9} {'p95':>8} {'p99':>8} "
+          f"{'full p50':>9} {'p95':>8} {'p99':>8}   (ms)")
+    rows = report["steps"] + [{"step": "all turns", "full_s": report["full_s"], "ttfc_s": report["ttfc_s"],
+                               "failed": report["failed_turns"]}]
+    for row in rows:
+        ttfc, full = row["ttfc_s"], row["full_s"]
+        print(f"{row['step']:<16} {full['count']:>6} {row['failed']:>7} {_ms(ttfc, 'p50'):>9} {_ms(ttfc, 'p95')} "
+              f"{_ms(ttfc, 'p99')} {_ms(full, 'p50'):>9} {_ms(full, 'p95')} {_ms(full, 'p99')}")
+
+    print(f"\n{'stage':<26} {'count':>7} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}   (ms)")
+    for label, metric in STAGES:
+        s = report["stages"][metric]
+        print(f"{label:<26} {s['count']:>7} {_ms(s, 'mean')} {_ms(s, 'p50')} {_ms(s, 'p95')} {_ms(s, 'max')}")
+    print(f"LLM requests queued for a concurrency slot: {report['llm_queued']:.0f}, "
+          f"streams interrupted: {report['llm_interrupted']:.0f}, "
+          f"answer cache hits: {report['answer_cache_hits']}")
+
+    rss = report["rss_mb"]
+    if rss["start"] is not None:
+        print(f"\nWorker RSS: {rss['start']:.0f} MB after warm-up, peak {rss['peak']:.0f} MB, "
+              f"end {rss['end']:.0f} MB ({rss['end'] - rss['start']:+.0f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--script", default="all", choices=["all"] + sorted(SCRIPTS))
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a student's turns")
+    parser.add_argument("--profile", default="typical", choices=sorted(PROFILES), help="stub latency preset")
+    parser.add_argument("--tokens", type=int, default=250, help="words in a stub prose answer")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--abort-rate", type=float, default=0.0)
+    parser.add_argument("--llm-base", help="use this endpoint instead of an in-process stub")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--llm-cache", action="store_true",
+                        help="keep the completion cache on (in a throwaway file) to include cache hits")
+    parser.add_argument("--answer-cache", action="store_true",
+                        help="keep the semantic answer cache on (emptied after the warm-up) to include its hits")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+    # Per-turn INFO logs would dominate the output (and the worker's time) at this volume
+    for name in ("tnea_ai", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    stub = None
+    if args.llm_base:
+        config.NVIDIA_API_BASE = args.llm_base
+    else:
+        stub = StubServer(profile=args.profile, tokens=args.tokens, error_rate=args.error_rate,
+                          abort_rate=args.abort_rate, seed=args.seed).start()
+        config.NVIDIA_API_BASE = stub.base_url
+    config.NVIDIA_API_KEY = config.NVIDIA_API_KEY or "stub"
+    print(f"LLM endpoint {config.NVIDIA_API_BASE}; {args.sessions} sessions, concurrency {args.concurrency}, "
+          f"scripts: {args.script}")
+    print(f"LLM limits: {config.LLM_MAX_CONCURRENCY} requests in flight, "
+          f"{config.LLM_RATE_LIMIT_RPM or 'unlimited'} requests/minute (LLM_MAX_CONCURRENCY, LLM_RATE_LIMIT_RPM)")
+
+    try:
+        with tempfile.TemporaryDirectory() as storage_dir:
+            # Never the production cache: stub prose would be stored under real model keys and
+            # served to students, and repeated prompts would be hits rather than load
+            config.LLM_CACHE_ENABLED = args.llm_cache
+            config.LLM_CACHE_PATH = os.path.join(storage_dir, "llm_cache.sqlite3")
+            print(f"Completion cache: {'on, in a throwaway file' if args.llm_cache else 'off'}")
+            if not args.answer_cache:
+                answer_cache.max_entries = 0
+            print(f"Answer cache: {'on, emptied after the warm-up' if answer_cache.enabled else 'off'}")
+            report = asyncio.run(LoadRun(args, storage_dir).run())
+    finally:
+        if stub is not None:
+            stub.stop()
+    report["llm_cache"] = "throwaway" if args.llm_cache else "off"
+    report["answer_cache"] = "on" if answer_cache.enabled else "off"
+    if stub is not None:
+        report["stub"] = dict(stub.stats)
+    print_report(report)
+    if stub is not None:
+        print(f"Stub served: {report['stub']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Recall-versus-latency benchmark for the college x branch IVF index.
+
+Sweeps nprobe and reports recall@k against brute force together with per-query
+latency. By default it uses synthetic clustered embeddings at the real document
+count; --real embeds the actual documents (needs the embedding model) and uses
+held-out document texts as queries. --scale N replicates the synthetic set to
+show how the index behaves past the current catalogue size. BranchSearch only
+builds and probes the IVF index above BRANCH_INDEX_EXACT_BELOW documents (the real
+catalogue is searched exactly); use this sweep to pick that threshold and
+BRANCH_INDEX_NPROBE for larger corpora.
+
+Usage:
+    cd src
+    python tests/bench_branch_index.py [--n 3515] [--scale 1] [--lists 0] [--top-k 10] [--real]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.branch_index import IVFIndex
+
+
+def synthetic(n, dim, n_clusters, n_queries, seed=42):
+    """Mixture of spherical clusters (sentence embeddings are strongly clustered, unlike white noise)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    points = centers[rng.integers(0, n_clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    queries = points[rng.integers(0, n, n_queries)] + 0.4 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return points, queries
+
+
+def real(n_queries, seed=42):
+    from data.loader import DataEngine
+    from ai.branch_index import build_branch_documents, branch_search_texts
+    from ai.model_provider import EmbeddingModelProvider
+    engine = DataEngine()
+    docs = build_branch_documents(engine.colleges, engine.get_predictions(), engine.get_latest_branch_cutoffs())
+    provider = EmbeddingModelProvider()
+    vectors = provider.encode(branch_search_texts(docs))
+    rng = np.random.default_rng(seed)
+    query_texts = [
+        "good CSE college near Coimbatore with hostel",
+        "mechanical engineering in Madurai",
+        "artificial intelligence and data science autonomous college Chennai",
+        "civil engineering government college Salem",
+    ]
+    picks = rng.integers(0, len(docs), max(0, n_queries - len(query_texts)))
+    # Paraphrase-like queries: the branch and district of random documents
+    query_texts += [f"{docs[i]['branch_name'].lower()} college in {str(docs[i]['district']).lower()}" for i in picks]
+    return vectors, provider.encode(query_texts)
+
+
+def recall_at_k(approx, exact):
+    hits = sum(len(set(a[0].tolist()) & set(e[0].tolist())) for a, e in zip(approx, exact))
+    return hits / sum(len(e[0]) for e in exact)
+
+
+def per_query_us(fn, queries, repeat):
+    fn(queries[:1])  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for q in queries:
+            fn(q[None, :])
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=3515, help="Documents (synthetic); matches predictions.json pairs")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the synthetic document count")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=120, help="Synthetic topic clusters")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--lists", type=int, default=0, help="IVF lists (0 = sqrt(n))")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--real", action="store_true", help="Embed the real documents (needs the model)")
+    args = parser.parse_args()
+
+    if args.real:
+        vectors, queries = real(args.queries)
+    else:
+        vectors, queries = synthetic(args.n * args.scale, args.dim, args.clusters * args.scale, args.queries)
+
+    index = IVFIndex(n_lists=args.lists or None)
+    start = time.perf_counter()
+    index.build(vectors)
+    print(f"Documents: {len(vectors)} x {vectors.shape[1]}, lists: {index.n_lists}, "
+          f"build: {time.perf_counter() - start:.2f}s, queries: {len(queries)}, top_k={args.top_k}\n")
+
+    exact = index.search_exact(queries, args.top_k)
+    brute_us = per_query_us(lambda q: index.search_exact(q, args.top_k), queries, args.repeat)
+
+    print(f"{'nprobe':>8}{'scanned %':>12}{'recall@k':>12}{'µs/query':>12}")
+    print(f"{'brute':>8}{100.0:>12.1f}{1.0:>12.3f}{brute_us:>12.1f}")
+    nprobe = 1
+    while nprobe <= index.n_lists:
+        approx = index.search(queries, args.top_k, nprobe=nprobe)
+        us = per_query_us(lambda q: index.search(q, args.top_k, nprobe=nprobe), queries, args.repeat)
+        scanned = 100.0 * nprobe / index.n_lists
+        print(f"{nprobe:>8}{scanned:>12.1f}{recall_at_k(approx, exact):>12.3f}{us:>12.1f}")
+        nprobe *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Latency / memory benchmark of the embedding backends (torch vs int8 ONNX).
+
+Each backend runs in a fresh subprocess so import cost (e.g. torch) and RSS are
+measured from a cold interpreter. Reports cold start (imports + model load),
+RSS after load, single-query latency over the alias queries and the time to
+encode the full college catalogue.
+
+Usage:
+    cd src
+    python tests/bench_embedding_backends.py [--backends torch onnx] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _worker(backend_name: str, repeat: int):
+    start = time.perf_counter()
+    sys.path.append(SRC_DIR)
+    from config import config
+    from ai.embedding_backends import create_backend
+    from ai.model_provider import _rss_mb
+    from ai.embedding_search import college_search_texts
+    backend = create_backend(config.EMBEDDING_MODEL_NAME, backend_name)
+    cold_start = time.perf_counter() - start
+    rss = _rss_mb()
+
+    with open(os.path.join(config.DATA_DIR, "json", "colleges.json")) as f:
+        colleges = json.load(f)
+    sys.path.append(os.path.dirname(__file__))
+    from test_embedding_search import ALIAS_QUERIES
+    queries = [q for q, _ in ALIAS_QUERIES] + ["CEG", "PSG", "SSN", "KCT", "anna university main campus"]
+
+    backend.encode(queries)  # warm-up
+    latencies = []
+    for _ in range(repeat):
+        for q in queries:
+            t = time.perf_counter()
+            backend.encode([q])
+            latencies.append((time.perf_counter() - t) * 1000)
+    latencies.sort()
+
+    texts = college_search_texts(colleges)
+    t = time.perf_counter()
+    backend.encode(texts)
+    catalogue_s = time.perf_counter() - t
+
+    print(json.dumps({
+        "backend": backend_name,
+        "cold_start_s": cold_start,
+        "rss_mb": rss,
+        "query_p50_ms": latencies[len(latencies) // 2],
+        "query_p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "catalogue_encode_s": catalogue_s,
+        "catalogue_size": len(texts),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker, args.repeat)
+        return
+
+    rows = []
+    for name in args.backends:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", name, "--repeat", str(args.repeat)],
+            capture_output=True, text=True,
+        )
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"[{name}] failed:\n{proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'no output'}")
+            continue
+        rows.append(json.loads(lines[-1]))
+
+    if not rows:
+        return
+    print(f"\n{'Backend':<10}{'cold start s':>14}{'RSS MB':>10}{'query p50 ms':>14}{'query p95 ms':>14}{'catalogue s':>13}")
+    for r in rows:
+        rss = f"{r['rss_mb']:.0f}" if r['rss_mb'] is not None else "n/a"
+        print(f"{r['backend']:<10}{r['cold_start_s']:>14.2f}{rss:>10}{r['query_p50_ms']:>14.2f}"
+              f"{r['query_p95_ms']:>14.2f}{r['catalogue_encode_s']:>13.2f}")
+    print(f"\n(catalogue = {rows[0]['catalogue_size']} college strings)")
+
+
+if __name__ == "__main__":
+    main()
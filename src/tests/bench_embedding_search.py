@@ -0,0 +1,123 @@
+"""
+Benchmark for CollegeEmbeddingSearch scoring paths.
+
+Compares the previous torch path (util.cos_sim + torch.topk + Python threshold loop)
+against the NumPy mat-vec + argpartition path, and the batched path used for
+bulk alias resolution. Query encoding is identical across paths, so scoring runs
+on pre-computed embeddings (synthetic by default, or the real index with --real).
+
+Usage:
+    cd src
+    python tests/bench_embedding_search.py [--n 448] [--dim 384] [--queries 64] [--real]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.embedding_search import top_k_scores
+
+
+def _timeit(fn, repeat):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6  # µs per call
+
+
+def legacy_torch_search(query_vecs, index_t, top_k, threshold):
+    import torch
+    from sentence_transformers import util
+    out = []
+    for q in query_vecs:
+        cos_scores = util.cos_sim(q, index_t)[0]
+        top = torch.topk(cos_scores, k=min(top_k, index_t.shape[0]))
+        out.append([(int(i), float(s)) for s, i in zip(top.values, top.indices) if float(s) >= threshold])
+    return out
+
+
+def numpy_search(query_vecs, index, top_k, threshold):
+    out = []
+    for q in query_vecs:
+        idx, vals = top_k_scores((index @ q)[None, :], top_k)
+        keep = vals[0] >= threshold
+        out.append(list(zip(idx[0][keep].tolist(), vals[0][keep].tolist())))
+    return out
+
+
+def numpy_search_batch(query_vecs, index, top_k, threshold):
+    idx, vals = top_k_scores(query_vecs @ index.T, top_k)
+    keep = vals >= threshold
+    return [list(zip(i[k].tolist(), v[k].tolist())) for i, v, k in zip(idx, vals, keep)]
+
+
+def load_real_index():
+    from data.loader import DataEngine
+    from ai.embedding_search import CollegeEmbeddingSearch
+    from agent.counsellor_agent import CounsellorAgent
+    searcher = CollegeEmbeddingSearch()
+    searcher.index_colleges(DataEngine().colleges, CounsellorAgent.STRATEGIC_ALIASES)
+    queries = list(CounsellorAgent.STRATEGIC_ALIASES.keys())
+    return searcher.college_embeddings, np.asarray(searcher._encode_texts(queries), dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=448, help="Number of indexed colleges (synthetic)")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (synthetic)")
+    parser.add_argument("--queries", type=int, default=64, help="Number of queries (synthetic)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--real", action="store_true", help="Use the real college index and alias queries")
+    args = parser.parse_args()
+
+    if args.real:
+        index, queries = load_real_index()
+    else:
+        rng = np.random.default_rng(42)
+        index = rng.standard_normal((args.n, args.dim)).astype(np.float32)
+        index /= np.linalg.norm(index, axis=1, keepdims=True)
+        # Queries near random index rows so thresholding keeps some results
+        queries = index[rng.integers(0, args.n, args.queries)] + 0.5 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    index = np.ascontiguousarray(index, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+
+    print(f"Index: {index.shape[0]} x {index.shape[1]}, queries: {len(queries)}, top_k={args.top_k}\n")
+    rows = []
+
+    try:
+        import torch
+        index_t = torch.from_numpy(index)
+        query_t = torch.from_numpy(queries)
+        legacy = legacy_torch_search(query_t, index_t, args.top_k, args.threshold)
+        t = _timeit(lambda: legacy_torch_search(query_t, index_t, args.top_k, args.threshold), args.repeat)
+        rows.append(("torch cos_sim + topk (previous)", t))
+    except ImportError:
+        legacy = None
+        print("torch / sentence-transformers not installed: skipping previous path.\n")
+
+    single = numpy_search(queries, index, args.top_k, args.threshold)
+    rows.append(("numpy mat-vec + argpartition", _timeit(lambda: numpy_search(queries, index, args.top_k, args.threshold), args.repeat)))
+    batch = numpy_search_batch(queries, index, args.top_k, args.threshold)
+    rows.append(("numpy search_batch (one matmul)", _timeit(lambda: numpy_search_batch(queries, index, args.top_k, args.threshold), args.repeat)))
+
+    if legacy is not None:
+        same = all([i for i, _ in a] == [i for i, _ in b] for a, b in zip(legacy, single))
+        print(f"Result parity with previous path: {'OK' if same else 'MISMATCH'}")
+    assert all([i for i, _ in a] == [i for i, _ in b] for a, b in zip(single, batch))
+
+    print(f"{'Path':<36}{'total µs':>12}{'µs/query':>12}")
+    for name, t in rows:
+        print(f"{name:<36}{t:>12.1f}{t / len(queries):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Server-side cost of rendering a streamed 2,000-token chat answer in the Streamlit chat view.
+
+Replays a synthetic answer (a choice-filling table followed by ~2,000 tokens of prose in
+paragraphs, one token every --token-ms on a simulated clock) through three strategies:
+
+  per-token   markdown(full_text + cursor) on one placeholder for every token (the old view)
+  throttled   the same single placeholder, re-rendered at most every 50 ms / 400 chars
+  buffer      web/render_buffer.RenderBuffer: throttled, finished paragraphs sealed
+
+Each render is serialized as the Streamlit ForwardMsg (delta -> markdown element) the server
+would send over the websocket; CPU is process time for building and serializing the
+messages, bytes are the serialized sizes. Without streamlit installed, the UTF-8 size of the
+markdown body stands in for the message.
+
+Usage:
+    cd src
+    python tests/bench_render_buffer.py [--tokens 2000] [--token-ms 20] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from web.render_buffer import CURSOR, RenderBuffer
+
+try:
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+except ImportError:  # pragma: no cover - streamlit is a core dependency of the app
+    ForwardMsg = None
+
+
+class WirePlaceholder:
+    """Counts what st.empty().markdown(text) would put on the websocket."""
+
+    def __init__(self, wire):
+        self.wire = wire
+
+    def markdown(self, text: str):
+        if ForwardMsg is None:
+            size = len(text.encode("utf-8"))
+        else:
+            msg = ForwardMsg()
+            msg.delta.new_element.markdown.body = text
+            size = len(msg.SerializeToString())
+        self.wire["messages"] += 1
+        self.wire["bytes"] += size
+
+
+def synthetic_answer(tokens: int):
+    table = ["### Moderate Choices (10 colleges, showing top 10)",
+             "| # | College Name | Branch | Cutoff | Seats | Placement | District |",
+             "|---|---|---|---|---|---|---|"]
+    table += [f"| {i} | **Sample College of Engineering {i}** | COMPUTER SCIENCE AND ENGINEERING | {190 - i / 2} "
+              f"| 60 | 85% | CHENNAI |" for i in range(1, 41)]
+    chunks = ["\n".join(table) + "\n\n"]
+    words = "the cutoff for this branch has risen over recent years so apply early and keep safe options".split()
+    for i in range(tokens):
+        end = "\n\n" if i % 120 == 119 else (". " if i % 15 == 14 else " ")
+        chunks.append(words[i % len(words)] + end)
+    return chunks
+
+
+class SimClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_per_token(chunks, token_s):
+    wire = {"messages": 0, "bytes": 0}
+    placeholder = WirePlaceholder(wire)
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        placeholder.markdown(text + CURSOR)
+    placeholder.markdown(text)
+    return wire
+
+
+def run_throttled(chunks, token_s, interval_s=0.05, max_chars=400):
+    wire = {"messages": 0, "bytes": 0}
+    placeholder = WirePlaceholder(wire)
+    parts, pending, clock, rendered_at = [], 0, 0.0, None
+    for chunk in chunks:
+        parts.append(chunk)
+        pending += len(chunk)
+        clock += token_s
+        if rendered_at is None or clock - rendered_at >= interval_s or pending >= max_chars:
+            placeholder.markdown("".join(parts) + CURSOR)
+            rendered_at, pending = clock, 0
+    placeholder.markdown("".join(parts))
+    return wire
+
+
+def run_buffer(chunks, token_s):
+    wire = {"messages": 0, "bytes": 0}
+    clock = SimClock()
+    buffer = RenderBuffer(lambda: WirePlaceholder(wire), clock=clock)
+    for chunk in chunks:
+        clock.now += token_s
+        buffer.append(chunk)
+    buffer.finish()
+    return wire
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2000)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks = synthetic_answer(args.tokens)
+    total_chars = sum(len(c) for c in chunks)
+    print(f"Answer: {len(chunks)} chunks, {total_chars} characters; "
+          f"serialization: {'ForwardMsg protobuf' if ForwardMsg else 'UTF-8 body size'}\n")
+    print(f"{'strategy':<11} {'messages':>9} {'bytes sent':>13} {'x answer':>9} {'server CPU ms':>14}")
+    for name, run in (("per-token", run_per_token), ("throttled", run_throttled), ("buffer", run_buffer)):
+        cpu = []
+        for _ in range(args.repeat):
+            start = time.process_time()
+            wire = run(chunks, args.token_ms / 1000)
+            cpu.append((time.process_time() - start) * 1000)
+        print(f"{name:<11} {wire['messages']:>9} {wire['bytes']:>13,} {wire['bytes'] / total_chars:>9.1f} "
+              f"{min(cpu):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Cold start / query latency / memory benchmark of the GuidelineRAG vector stores (numpy vs chroma).
+
+The real guideline chunks are stored with synthetic 384-d embeddings (query encoding is
+identical for both backends, so it is left out). Each backend is populated once, then
+measured in a fresh subprocess: cold start is the store module import plus opening the
+persisted store; RSS is the growth over the bare interpreter with NumPy loaded.
+
+Usage:
+    cd src
+    python tests/bench_vector_stores.py [--backends numpy chroma] [--queries 500] [--n-results 4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DIM = 384
+
+
+def _populate(backend_name: str, path: str):
+    sys.path.append(SRC_DIR)
+    import numpy as np
+    from config import config
+    from ai.rag_engine import chunk_guidelines
+    from ai.vector_stores import create_vector_store
+    with open(os.path.join(config.DATA_DIR, "docs", "tnea_guidelines.txt"), encoding="utf-8") as f:
+        chunks = chunk_guidelines(f.read())
+    vectors = np.random.default_rng(0).standard_normal((len(chunks), DIM)).astype(np.float32)
+    store = create_vector_store(path, "tnea_guidelines", backend_name)
+    store.add([c["id"] for c in chunks], [c["text"] for c in chunks],
+              [{"heading": c["heading"]} for c in chunks], vectors)
+    print(json.dumps({"chunks": len(chunks)}))
+
+
+def _measure(backend_name: str, path: str, queries: int, n_results: int):
+    import numpy as np
+    sys.path.append(SRC_DIR)
+    from ai.model_provider import _rss_mb
+    rss_before = _rss_mb()
+
+    start = time.perf_counter()
+    from ai.vector_stores import create_vector_store
+    store = create_vector_store(path, "tnea_guidelines", backend_name)
+    count = store.count()
+    cold_start = time.perf_counter() - start
+
+    query_vectors = np.random.default_rng(1).standard_normal((queries, DIM)).astype(np.float32)
+    store.query(query_vectors[0], n_results)  # warm-up
+    latencies = []
+    for q in query_vectors:
+        t = time.perf_counter()
+        store.query(q, n_results)
+        latencies.append((time.perf_counter() - t) * 1000)
+    latencies.sort()
+    rss_after = _rss_mb()
+
+    print(json.dumps({
+        "backend": backend_name,
+        "chunks": count,
+        "cold_start_s": cold_start,
+        "rss_delta_mb": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        "query_p50_ms": latencies[len(latencies) // 2],
+        "query_p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+    }))
+
+
+def _run(args):
+    proc = subprocess.run([sys.executable, __file__] + args, capture_output=True, text=True, cwd=SRC_DIR)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "worker failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["numpy", "chroma"])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--n-results", type=int, default=4)
+    parser.add_argument("--populate", help=argparse.SUPPRESS)
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.populate:
+        _populate(args.populate, args.path)
+        return
+    if args.measure:
+        _measure(args.measure, args.path, args.queries, args.n_results)
+        return
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends:
+            path = os.path.join(tmp, name)
+            try:
+                _run(["--populate", name, "--path", path])
+                rows.append(_run(["--measure", name, "--path", path,
+                                  "--queries", str(args.queries), "--n-results", str(args.n_results)]))
+            except RuntimeError as e:
+                print(f"{name}: failed ({e})")
+
+    print(f"{'Backend':<10}{'chunks':>8}{'cold start s':>14}{'RSS +MB':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for r in rows:
+        rss = f"{r['rss_delta_mb']:.1f}" if r["rss_delta_mb"] is not None else "n/a"
+        print(f"{r['backend']:<10}{r['chunks']:>8}{r['cold_start_s']:>14.3f}{rss:>10}"
+              f"{r['query_p50_ms']:>10.3f}{r['query_p95_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Shared fixtures for the LLM client tests.
+
+IsolatedGateway gives each test a fresh limiter (no rate limit) and fresh circuit breakers on
+the process-wide LLMGateway, and puts the real ones back afterwards. offline_client() builds an
+LLMClient that only talks to what the test provides: no completion cache, and no request
+coalescing unless asked for.
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llm_gateway import LLMClient, LLMGateway
+from llm_limits import PriorityLimiter
+from llm_resilience import ModelBreakers
+
+
+class IsolatedGateway:
+    """unittest.TestCase mixin (list it first); `breaker_failures` overrides LLM_BREAKER_FAILURES."""
+    breaker_failures = None
+
+    def setUp(self):
+        super().setUp()
+        gateway = LLMGateway()
+        self._gateway_state = gateway.limiter, gateway.breakers
+        gateway.limiter = PriorityLimiter(max_concurrency=64)
+        gateway.breakers = ModelBreakers(failure_threshold=self.breaker_failures)
+
+    def tearDown(self):
+        LLMGateway().limiter, LLMGateway().breakers = self._gateway_state
+        super().tearDown()
+
+
+def offline_client(model_name: str = "test-model", completions=None, coalesce: bool = False, **kwargs) -> LLMClient:
+    """
+    LLMClient for tests. `completions` stands in for client.chat.completions; other keyword
+    arguments go to LLMClient (a `cache` passed there is kept, otherwise there is none).
+    """
+    client = LLMClient(model_name=model_name, api_key=kwargs.pop("api_key", "test"), **kwargs)
+    client.cache = kwargs.get("cache")
+    if not coalesce:
+        client.singleflight = None
+    if completions is not None:
+        client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client
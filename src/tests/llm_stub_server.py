@@ -0,0 +1,372 @@
+"""
+OpenAI-compatible chat-completions stub for load and chaos testing, without API cost or throttling.
+
+Serves POST /v1/chat/completions (streamed as server-sent events, or whole) and GET /v1/models,
+so LLMClient talks to it exactly as it does to the NVIDIA endpoint:
+
+    NVIDIA_API_BASE=http://127.0.0.1:8765/v1 NVIDIA_API_KEY=stub streamlit run streamlit_app.py
+
+Latency: the time to first token and the gap between tokens are drawn from log-normal
+distributions given as median and p95 in milliseconds (--ttft-ms 800,2000 --itl-ms 30,60), or
+from a preset (--profile, see PROFILES). A non-streamed answer waits the TTFT plus one gap per
+token, like a model that generates before replying.
+
+Errors: --error-rate answers that share of requests with an HTTP error drawn from
+--error-statuses (429 carries Retry-After); --abort-rate cuts that share of streams off
+mid-answer; --hang-rate accepts that share of requests and never answers (client timeouts).
+
+Content is chosen by the system prompt. Built in: the intent router gets a JSON
+classification, the college resolver gets UNKNOWN, everything else gets counselling-style prose
+of about --tokens words (capped by the request's max_tokens). --responses FILE adds rules: a
+JSON object mapping a system-prompt substring to a reply ("*" matches any request); the first
+matching rule wins.
+
+Usage:
+    cd src
+    python tests/llm_stub_server.py [--port 8765] [--profile typical] [--tokens 250]
+        [--ttft-ms MEDIAN,P95] [--itl-ms MEDIAN,P95] [--error-rate 0.02]
+        [--error-statuses 429,500,503] [--abort-rate 0.01] [--hang-rate 0]
+        [--responses replies.json] [--seed 1]
+
+From Python, StubServer(...).start() serves from a background thread until stop().
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Sequence
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.prompts import INTENT_ROUTER_PROMPT
+
+
+class Latency:
+    """Log-normal delay from its median and p95 (seconds); a zero median means no delay."""
+
+    def __init__(self, median_s: float, p95_s: float = None):
+        self.median_s = max(0.0, median_s)
+        self.p95_s = max(self.median_s, p95_s if p95_s is not None else median_s)
+        self._sigma = math.log(self.p95_s / self.median_s) / 1.645 if self.median_s else 0.0
+
+    @classmethod
+    def parse_ms(cls, text: str) -> "Latency":
+        """'800' or '800,2000' (median[,p95] in milliseconds)."""
+        values = [float(v) / 1000 for v in text.split(",")]
+        return cls(values[0], values[1] if len(values) > 1 else None)
+
+    def sample(self, rng: random.Random) -> float:
+        if not self.median_s:
+            return 0.0
+        return rng.lognormvariate(math.log(self.median_s), self._sigma)
+
+    def __repr__(self):
+        return f"Latency(median={self.median_s * 1000:.0f}ms, p95={self.p95_s * 1000:.0f}ms)"
+
+
+# (time to first token, gap between tokens)
+PROFILES: Dict[str, tuple] = {
+    "instant": (Latency(0), Latency(0)),
+    "fast": (Latency(0.25, 0.6), Latency(0.01, 0.02)),
+    "typical": (Latency(0.8, 2.0), Latency(0.03, 0.06)),
+    "congested": (Latency(3.0, 9.0), Latency(0.06, 0.2)),
+}
+
+RESOLVER_MARKER = "Identify the specific Tamil Nadu engineering college"
+
+_WORDS = ("based on recent cutoff trends this option looks realistic for your mark so keep it in the "
+          "middle of your choice list and add a few safer colleges below it while you also compare "
+          "placement records fees hostel facilities and the distance from home before the round").split()
+
+
+def _router_reply(user_text: str) -> str:
+    """A classification in INTENT_ROUTER_PROMPT's format, from a few keywords of the query."""
+    query = user_text.split("### User Query:")[-1].split("Analyze the query")[0].strip().lower()
+    entities = {}
+    mark = re.search(r"\b(\d{2,3}(?:\.\d+)?)\b", query)
+    if mark and float(mark.group(1)) <= 200:
+        entities["mark"] = float(mark.group(1))
+    intent = "GENERAL_QUERY"
+    for keyword, candidate in (("choice", "CHOICE_FILLING"), ("college", "COLLEGE_SUGGESTION"),
+                               ("trend", "TREND_ANALYSIS"), ("career", "CAREER_PLANNING"),
+                               ("skill", "SKILL_GUIDANCE"), ("counselling", "PROCESS_GUIDANCE")):
+        if keyword in query:
+            intent = candidate
+            break
+    if intent == "GENERAL_QUERY" and entities:
+        intent = "RANK_PREDICTION"
+    return json.dumps({"intent": intent, "entities": entities, "is_off_topic": False})
+
+
+def _prose(words: int, rng: random.Random) -> str:
+    parts = []
+    for i in range(words):
+        word = _WORDS[rng.randrange(len(_WORDS))]
+        end = "\n\n" if i % 60 == 59 else (". " if i % 12 == 11 else " ")
+        parts.append((word.capitalize() if i % 12 == 0 else word) + end)
+    return "".join(parts).strip() + "."
+
+
+class StubServer:
+    """
+    The stub server (see the module docstring). Runs on its own event loop, from main() or on a
+    daemon thread via start()/stop() (also a context manager).
+    Counters of what it served are in `stats`; `base_url` is what NVIDIA_API_BASE should be.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, profile: str = "typical",
+                 ttft: Latency = None, itl: Latency = None, tokens: int = 250, error_rate: float = 0.0,
+                 error_statuses: Sequence[int] = (429, 500, 503), abort_rate: float = 0.0,
+                 hang_rate: float = 0.0, responses: Optional[Dict[str, str]] = None, seed: int = None):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown latency profile {profile!r} (expected one of {', '.join(PROFILES)})")
+        self.host = host
+        self.port = port
+        self.ttft = ttft or PROFILES[profile][0]
+        self.itl = itl or PROFILES[profile][1]
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.abort_rate = abort_rate
+        self.hang_rate = hang_rate
+        self.responses = dict(responses or {})
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0, "aborted": 0, "hung": 0, "tokens": 0}
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._connections = set()
+        self._ready = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    # Content
+
+    def reply_for(self, messages: list, max_tokens: int = None) -> str:
+        system = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        user = "\n".join(m.get("content") or "" for m in messages if m.get("role") == "user")
+        for marker, reply in self.responses.items():
+            if marker == "*" or marker in system:
+                return reply
+        if INTENT_ROUTER_PROMPT.strip() in system:
+            return _router_reply(user)
+        if RESOLVER_MARKER in user:
+            return "UNKNOWN"
+        return _prose(min(self.tokens, max_tokens or self.tokens), self.rng)
+
+    @staticmethod
+    def _split(text: str) -> list:
+        """Streamed pieces: one word (with its trailing whitespace) per token."""
+        return re.findall(r"\S+\s*|\s+", text) or [text]
+
+    # HTTP
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    return
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if not await self._route(method, path.split("?")[0], body, writer):
+                    return
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # server stopping; finishing normally keeps asyncio from logging the cancelled handler
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def _send(self, writer, status: int, payload: dict, headers: Dict[str, str] = None):
+        body = json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}"] + [f"{k}: {v}" for k, v in (headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+
+    async def _route(self, method: str, path: str, body: bytes, writer) -> bool:
+        """Answers one request; False when the connection must be dropped."""
+        if method == "GET" and path.endswith("/models"):
+            self._send(writer, 200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+            return True
+        if method != "POST" or not path.endswith("/chat/completions"):
+            self._send(writer, 404, {"error": {"message": f"no route for {method} {path}"}})
+            return True
+
+        request = json.loads(body or b"{}")
+        self.stats["requests"] += 1
+        roll = self.rng.random()
+        if roll < self.hang_rate:
+            self.stats["hung"] += 1
+            await asyncio.Event().wait()  # until the client gives up and the server stops
+        if roll < self.hang_rate + self.error_rate:
+            status = self.rng.choice(self.error_statuses)
+            self.stats["errors"] += 1
+            self._send(writer, status, {"error": {"message": f"injected {status}", "type": "stub_error"}},
+                       {"Retry-After": "1"} if status == 429 else None)
+            return True
+
+        model = request.get("model", "stub")
+        messages = request.get("messages", [])
+        pieces = self._split(self.reply_for(messages, request.get("max_tokens")))
+        usage = {"prompt_tokens": sum(len(m.get("content") or "") for m in messages) // 4,
+                 "completion_tokens": len(pieces)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        await asyncio.sleep(self.ttft.sample(self.rng))
+        if not request.get("stream"):
+            await asyncio.sleep(sum(self.itl.sample(self.rng) for _ in pieces[1:]))
+            self.stats["tokens"] += len(pieces)
+            self._send(writer, 200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(pieces)},
+                             "finish_reason": "stop"}],
+                "usage": usage})
+            return True
+
+        self.stats["streamed"] += 1
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Transfer-Encoding: chunked\r\n\r\n")
+        abort_at = None
+        if len(pieces) > 1 and self.rng.random() < self.abort_rate:
+            abort_at = self.rng.randrange(1, len(pieces))
+
+        async def event(data: str):
+            payload = f"data: {data}\n\n".encode()
+            writer.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+            await writer.drain()
+
+        def chunk(delta: dict, finish_reason=None, **extra) -> str:
+            return json.dumps({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                               "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                               **extra})
+
+        for i, piece in enumerate(pieces):
+            if i:
+                await asyncio.sleep(self.itl.sample(self.rng))
+            if i == abort_at:
+                self.stats["aborted"] += 1
+                writer.transport.abort()
+                return False
+            await event(chunk({"role": "assistant", "content": piece} if i == 0 else {"content": piece}))
+            self.stats["tokens"] += 1
+        await event(chunk({}, "stop"))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            await event(json.dumps({"id": completion_id, "object": "chat.completion.chunk",
+                                    "created": int(time.time()), "model": model, "choices": [], "usage": usage}))
+        await event("[DONE]")
+        writer.write(b"0\r\n\r\n")
+        return True
+
+    # Lifecycle
+
+    async def _open(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=2 ** 20,
+                                                  backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+    async def _close(self):
+        self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def start(self) -> "StubServer":
+        """Serves from a daemon thread; returns once the port is bound."""
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self._open())
+                loop.run_forever()
+                loop.run_until_complete(self._close())
+            finally:
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name="llm-stub-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(10)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--profile", default="typical", choices=sorted(PROFILES))
+    parser.add_argument("--ttft-ms", type=Latency.parse_ms, help="time to first token: MEDIAN[,P95]")
+    parser.add_argument("--itl-ms", type=Latency.parse_ms, help="gap between tokens: MEDIAN[,P95]")
+    parser.add_argument("--tokens", type=int, default=250, help="words in a prose answer")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-statuses", default="429,500,503")
+    parser.add_argument("--abort-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--responses", help="JSON file: {system-prompt substring: reply}")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses = json.load(f)
+    server = StubServer(args.host, args.port, args.profile, args.ttft_ms, args.itl_ms, args.tokens,
+                        args.error_rate, [int(s) for s in args.error_statuses.split(",")], args.abort_rate,
+                        args.hang_rate, responses, args.seed)
+
+    async def run():
+        await server._open()
+        print(f"LLM stub on {server.base_url}: TTFT {server.ttft}, ITL {server.itl}, "
+              f"errors {args.error_rate:.0%}, aborts {args.abort_rate:.0%}, hangs {args.hang_rate:.0%}")
+        print(f"Point the app at it: NVIDIA_API_BASE={server.base_url} NVIDIA_API_KEY=stub")
+        try:
+            await server._server.serve_forever()
+        finally:
+            await server._close()
+            print(f"Served: {server.stats}")
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.answer_cache import SemanticAnswerCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def unit(*values):
+    v = np.array(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SemanticAnswerCache(max_entries=3, ttl_s=60, min_similarity=0.9, clock=self.clock)
+        self.cache.store("what is the registration fee", unit(1, 0, 0), ["g_fee", "g_reg"], "Rs. 500", "v1")
+
+    def test_paraphrase_with_same_chunks_hits(self):
+        self.assertEqual(self.cache.lookup(unit(1, 0.2, 0), ["g_reg", "g_fee"], "v1"), "Rs. 500")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_dissimilar_question_misses(self):
+        self.assertIsNone(self.cache.lookup(unit(1, 1, 0), ["g_fee", "g_reg"], "v1"))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_different_chunks_miss(self):
+        self.assertIsNone(self.cache.lookup(unit(1, 0, 0), ["g_fee"], "v1"))
+        self.assertIsNone(self.cache.lookup(unit(1, 0, 0), ["g_fee", "g_sc"], "v1"))
+
+    def test_ttl_expiry(self):
+        self.clock.now = 61
+        self.assertIsNone(self.cache.lookup(unit(1, 0, 0), ["g_fee", "g_reg"], "v1"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_corpus_change_invalidates(self):
+        self.assertIsNone(self.cache.lookup(unit(1, 0, 0), ["g_fee", "g_reg"], "v2"))
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_lru_bound(self):
+        for i in range(3):
+            self.cache.store(f"q{i}", unit(0, 1, i), [f"g_{i}"], f"a{i}", "v1")
+        self.assertEqual(self.cache.stats()["entries"], 3)
+        self.assertIsNone(self.cache.lookup(unit(1, 0, 0), ["g_fee", "g_reg"], "v1"))
+        self.assertEqual(self.cache.lookup(unit(0, 1, 0), ["g_0"], "v1"), "a0")
+
+    def test_disabled(self):
+        cache = SemanticAnswerCache(max_entries=0, ttl_s=60, min_similarity=0.9)
+        cache.store("q", unit(1, 0, 0), ["g"], "a", "v1")
+        self.assertIsNone(cache.lookup(unit(1, 0, 0), ["g"], "v1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
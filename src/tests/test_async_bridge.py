@@ -0,0 +1,94 @@
+
+import unittest
+import asyncio
+import sys
+import os
+import threading
+import time
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llm_gateway import LLMGateway
+from utils.async_bridge import AsyncBridge
+
+
+async def running_loop():
+    return asyncio.get_running_loop()
+
+
+async def words(n, gap_s=0.0, log=None):
+    try:
+        for i in range(n):
+            await asyncio.sleep(gap_s)
+            yield f"w{i}"
+    finally:
+        if log is not None:
+            log.append("closed")
+
+
+class TestAsyncBridge(unittest.TestCase):
+    def setUp(self):
+        self.bridge = AsyncBridge()
+
+    def test_one_loop_for_every_caller(self):
+        self.assertIs(AsyncBridge(), self.bridge)
+        loops = []
+        threads = [threading.Thread(target=lambda: loops.append(self.bridge.run(running_loop()))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(set(map(id, loops))), 1)
+        self.assertTrue(loops[0].is_running())
+
+    def test_http_pool_survives_across_calls(self):
+        async def client():
+            return LLMGateway().async_client("http://localhost:9/v1", "test")
+        self.assertIs(self.bridge.run(client()), self.bridge.run(client()))
+
+    def test_stream_items_and_end(self):
+        self.assertEqual(list(self.bridge.stream(words(5))), ["w0", "w1", "w2", "w3", "w4"])
+
+    def test_heartbeats_while_producer_is_silent(self):
+        items = list(self.bridge.stream(words(2, gap_s=0.15), heartbeat_s=0.05))
+        self.assertIn(None, items)
+        self.assertEqual([i for i in items if i is not None], ["w0", "w1"])
+
+    def test_close_stops_producer(self):
+        log = []
+        stream = self.bridge.stream(words(1000, gap_s=0.01, log=log))
+        self.assertEqual(next(stream), "w0")
+        start = time.perf_counter()
+        self.assertTrue(stream.close())
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(log, ["closed"])
+        self.assertEqual(list(stream), [])
+
+    def test_errors_reach_the_consumer(self):
+        async def failing():
+            yield "partial"
+            raise ValueError("boom")
+
+        stream = self.bridge.stream(failing())
+        self.assertEqual(next(stream), "partial")
+        with self.assertRaises(ValueError):
+            next(stream)
+
+    def test_run_timeout_cancels_the_coroutine(self):
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(Exception):
+            self.bridge.run(slow(), timeout=0.05)
+        self.assertTrue(cancelled.wait(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+
+import unittest
+import asyncio
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.intent_router import IntentRouter
+from agent.counsellor_agent import CounsellorAgent
+from web.career_mapping import CareerMapper
+from web.skill_search import SkillSearch
+from llm_gateway import ERROR_PREFIX
+from llm_profiles import PROFILES
+
+
+class FakeLLM:
+    """Records calls; the async path yields to the loop like a real network call."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.async_calls = []
+        self.sync_calls = []
+
+    async def generate_response(self, prompt, system_prompt=None, context=None, stream=False, max_tokens=None,
+                                profile=None, **kwargs):
+        await asyncio.sleep(0)
+        self.async_calls.append((prompt, profile))
+        return self.reply, []
+
+    def generate_response_sync(self, prompt, system_prompt=None, context=None, max_tokens=None, profile=None, **kwargs):
+        self.sync_calls.append((prompt, profile))
+        return self.reply, []
+
+
+def with_llm(cls, reply):
+    obj = cls.__new__(cls)
+    obj.llm = FakeLLM(reply)
+    return obj
+
+
+class TestAsyncLLMPaths(unittest.TestCase):
+    def test_router_awaits_llm(self):
+        router = with_llm(IntentRouter, '```json\n{"intent": "PROCESS_GUIDANCE", "entities": {"branch": null}}\n```')
+        intent, entities = asyncio.run(router.route_query_async("and then?"))
+        self.assertEqual((intent, entities), ("GUIDANCE", {}))
+        self.assertEqual(len(router.llm.async_calls), 1)
+        self.assertEqual(router.llm.sync_calls, [])
+
+    def test_router_sync_facade(self):
+        router = with_llm(IntentRouter, '{"is_off_topic": true}')
+        self.assertEqual(router.route_query("and then?"), ("OFF_TOPIC", {}))
+        self.assertEqual(len(router.llm.sync_calls), 1)
+
+    def test_router_local_path_skips_llm(self):
+        router = with_llm(IntentRouter, "{}")
+        intent, entities = asyncio.run(router.route_query_async("185"))
+        self.assertEqual((intent, entities), ("PREDICT_PERCENTILE", {"mark": 185.0}))
+        self.assertEqual(router.llm.async_calls, [])
+
+    def test_career_and_skills(self):
+        mapper = with_llm(CareerMapper, "careers")
+        skills = with_llm(SkillSearch, "skills")
+        self.assertEqual(asyncio.run(mapper.map_career_async("ECE")), "careers")
+        self.assertEqual(asyncio.run(skills.search_skills_async("ECE")), "skills")
+        self.assertEqual(mapper.map_career("ECE"), "careers")
+        self.assertEqual(skills.search_skills("ECE"), "skills")
+
+    def test_resolver_llm_fallback(self):
+        class NoMatch:
+            def resolve(self, name):
+                return None
+
+        agent = with_llm(CounsellorAgent, "Some Engineering College, Town.")
+        agent.college_resolver = NoMatch()
+        self.assertEqual(asyncio.run(agent._resolve_college_name("xyz")), "Some Engineering College, Town")
+        self.assertEqual(agent.llm.async_calls[0][1], "resolver")
+        self.assertEqual(PROFILES["resolver"].max_tokens, 50)
+
+        # Error text from a failed call is not a college name
+        agent.llm = FakeLLM(f"{ERROR_PREFIX}: timeout")
+        self.assertEqual(asyncio.run(agent._resolve_college_name("xyz")), "xyz")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+
+import unittest
+import sys
+import os
+import tempfile
+import zlib
+from unittest import mock
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.branch_index import BranchSearch, IVFIndex, build_branch_documents, branch_search_texts
+from ai.embedding_cache import EmbeddingDiskCache, query_embedding_cache
+from config import config
+
+COLLEGES = [
+    {"code": 1, "name": "University Departments of Anna University, Chennai - CEG Campus, Guindy", "district": "CHENNAI",
+     "hostel_boys": "Permanent", "hostel_girls": "Permanent", "autonomous": "Autonomous", "placement": "62%"},
+    {"code": 2006, "name": "PSG College of Technology (Autonomous), Peelamedu", "district": "COIMBATORE",
+     "hostel_boys": "Permanent", "hostel_girls": "Permanent", "autonomous": "Autonomous", "placement": "90%"},
+    {"code": 2100, "name": "Example Institute of Engineering, Town", "district": "COIMBATORE",
+     "hostel_boys": "No-Hostel", "hostel_girls": "No-Hostel", "autonomous": "Non-Autonomous", "placement": "No_Data"},
+]
+
+PREDICTIONS = [
+    {"college_code": 1, "branch_code": "CS", "branch_name": "COMPUTER SCIENCE AND ENGINEERING", "community": "OC", "predicted_percentile": 99.98},
+    {"college_code": 1, "branch_code": "CS", "branch_name": "COMPUTER SCIENCE AND ENGINEERING", "community": "BC", "predicted_percentile": 99.9},
+    {"college_code": 2006, "branch_code": "CS", "branch_name": "COMPUTER SCIENCE AND ENGINEERING", "community": "OC", "predicted_percentile": 99.7},
+    {"college_code": 2006, "branch_code": "ME", "branch_name": "MECHANICAL  ENGINEERING", "community": "OC", "predicted_percentile": 97.1},
+    {"college_code": 2100, "branch_code": "CS", "branch_name": "COMPUTER SCIENCE AND ENGINEERING", "community": "OC", "predicted_percentile": 70.2},
+    {"college_code": 9999, "branch_code": "CS", "branch_name": "UNKNOWN COLLEGE", "community": "OC", "predicted_percentile": 50.0},
+]
+
+
+def bag_of_words(texts, dim=64):
+    """Deterministic stand-in for the sentence encoder: hashed, normalized word counts."""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().replace(",", " ").replace(".", " ").split():
+            out[row, zlib.crc32(word.encode()) % dim] += 1.0
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+class FakeProvider:
+    available = True
+    cache_namespace = "fake-bow"
+
+    def encode(self, texts):
+        return bag_of_words(list(texts))
+
+
+class TestBuildBranchDocuments(unittest.TestCase):
+    def test_one_document_per_college_branch(self):
+        docs = build_branch_documents(COLLEGES, PREDICTIONS)
+        self.assertEqual([(d["college_code"], d["branch_code"]) for d in docs],
+                         [("1", "CS"), ("2006", "CS"), ("2006", "ME"), ("2100", "CS")])
+        self.assertEqual(docs[0]["percentiles"], {"OC": 99.98, "BC": 99.9})
+        self.assertEqual(docs[2]["branch_name"], "MECHANICAL ENGINEERING")
+        self.assertFalse(docs[3]["hostel"])
+
+    def test_cutoffs_attached(self):
+        cutoffs = {("2006", "CS"): {"year": 2024, "branch_name": "COMPUTER SCIENCE AND ENGINEERING", "cutoffs": {"OC": 199.5, "ST": None}}}
+        docs = build_branch_documents(COLLEGES, PREDICTIONS, cutoffs)
+        self.assertEqual(docs[1]["cutoffs"], {"OC": 199.5})
+        self.assertEqual(docs[1]["year"], 2024)
+
+    def test_text_keeps_campus(self):
+        text = branch_search_texts(build_branch_documents(COLLEGES, PREDICTIONS))[0]
+        self.assertIn("CEG Campus", text)
+        self.assertIn("Hostel", text)
+
+
+class TestIVFIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((20, 32)).astype(np.float32)
+        self.vectors = centers[rng.integers(0, 20, 1000)] + 0.3 * rng.standard_normal((1000, 32)).astype(np.float32)
+        self.vectors /= np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.queries = self.vectors[:25]
+        self.index = IVFIndex(n_lists=16, nprobe=4)
+        self.index.build(self.vectors)
+
+    def test_lists_partition_all_vectors(self):
+        self.assertEqual(len(self.index), 1000)
+        self.assertEqual(sorted(self.index.ids.tolist()), list(range(1000)))
+        self.assertEqual(self.index.offsets[-1], 1000)
+
+    def test_full_probe_equals_exact(self):
+        approx = self.index.search(self.queries, 10, nprobe=16)
+        exact = self.index.search_exact(self.queries, 10)
+        for (a_ids, a_scores), (e_ids, e_scores) in zip(approx, exact):
+            np.testing.assert_allclose(a_scores, e_scores, rtol=1e-5)
+
+    def test_partial_probe_finds_self(self):
+        for row, (ids, scores) in enumerate(self.index.search(self.queries, 1)):
+            self.assertEqual(ids[0], row)
+
+    def test_mask_respected(self):
+        mask = np.zeros(1000, dtype=bool)
+        mask[500:] = True
+        for ids, _ in self.index.search(self.queries, 10, nprobe=16, mask=mask):
+            self.assertTrue((ids >= 500).all())
+
+
+class TestBranchSearch(unittest.TestCase):
+    def setUp(self):
+        BranchSearch._instance = None
+        query_embedding_cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.search = BranchSearch()
+        self.search.provider = FakeProvider()
+        self.search.disk_cache = EmbeddingDiskCache("fake-bow", cache_dir=self.tmp.name)
+        self.search.set_source(lambda: build_branch_documents(COLLEGES, PREDICTIONS))
+
+    def tearDown(self):
+        BranchSearch._instance = None
+        query_embedding_cache.clear()
+        self.tmp.cleanup()
+
+    def test_lazy_build_and_ranking(self):
+        self.assertFalse(self.search.ready)
+        results = self.search.search("computer science coimbatore district hostel", top_k=2)
+        self.assertTrue(self.search.ready)
+        self.assertEqual((results[0][0]["college_code"], results[0][0]["branch_code"]), ("2006", "CS"))
+
+    def test_attribute_filters(self):
+        results = self.search.search("computer science", top_k=5, district="Coimbatore", hostel=False)
+        self.assertEqual([d["college_code"] for d, _ in results], ["2100"])
+        results = self.search.search("computer science", top_k=5, community="OC", max_percentile=99.8)
+        self.assertEqual({d["college_code"] for d, _ in results}, {"2006", "2100"})
+        self.assertEqual(self.search.search("computer science", district="MADURAI"), [])
+
+    def test_small_corpus_is_searched_exactly(self):
+        self.search.search("computer science", top_k=1)
+        self.assertEqual(self.search.index.n_lists, 1)  # no clustering below the threshold
+        self.search.index.search = None  # the IVF probe must not be used
+        self.assertTrue(self.search.search("mechanical engineering", top_k=3, nprobe=4))
+        self.assertTrue(self.search.search("mechanical engineering", top_k=3))
+
+    def test_large_corpus_is_clustered_and_probed(self):
+        with mock.patch.object(config, "BRANCH_INDEX_EXACT_BELOW", 1):
+            results = self.search.search("computer science coimbatore district hostel", top_k=1, nprobe=64)
+        self.assertGreater(self.search.index.n_lists, 1)
+        self.assertEqual((results[0][0]["college_code"], results[0][0]["branch_code"]), ("2006", "CS"))
+
+    def test_failed_build_is_retried_and_search_degrades(self):
+        loader = self.search._pending
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError("predictions.json unreadable")
+            return loader()
+
+        self.search.set_source(flaky)
+        self.assertEqual(self.search.search("computer science"), [])
+        self.assertFalse(self.search.ready)
+        self.search._retry_at = 0.0
+        self.assertTrue(self.search.search("computer science", top_k=1))
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,262 @@
+
+import unittest
+import asyncio
+import sys
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+from agent.counsellor_agent import CANCELLED_NOTE, CounsellorAgent, DISCLAIMER
+from ai.reasoning_engine import ReasoningEngine
+from ai.template_responder import TemplateResponder
+from config import config
+from llm_gateway import LLMGateway
+from llm_limits import PriorityLimiter
+from utils.cancellation import CancellationToken, OperationCancelled
+from utils.metrics import metrics
+from llm_fakes import IsolatedGateway, offline_client
+
+
+class SlowResponse:
+    """A streamed response sending one word every `gap_s` after `first_delay_s`; records close()."""
+
+    def __init__(self, words, first_delay_s, gap_s):
+        self.words = words
+        self.first_delay_s = first_delay_s
+        self.gap_s = gap_s
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.first_delay_s)
+        for i, word in enumerate(self.words):
+            if i:
+                await asyncio.sleep(self.gap_s)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+
+
+class SlowCompletions:
+    def __init__(self, first_delay_s=0.0, gap_s=0.0, words=100):
+        self.first_delay_s = first_delay_s
+        self.gap_s = gap_s
+        self.words = [f"w{i}" for i in range(words)]
+        self.responses = []
+
+    async def create(self, model, messages, stream=False, **params):
+        response = SlowResponse(self.words, self.first_delay_s, self.gap_s)
+        self.responses.append(response)
+        return response
+
+
+def cancel_later(token, delay_s):
+    threading.Timer(delay_s, token.cancel).start()
+
+
+class TestCancellationToken(unittest.TestCase):
+    def test_cancel_from_another_thread_interrupts_run(self):
+        token = CancellationToken()
+        cancel_later(token, 0.05)
+
+        async def main():
+            start = time.perf_counter()
+            with self.assertRaises(OperationCancelled):
+                await token.run(asyncio.sleep(5))
+            return time.perf_counter() - start
+
+        self.assertLess(asyncio.run(main()), 1)
+        self.assertFalse(token.cancel())  # already cancelled
+
+    def test_run_returns_result(self):
+        token = CancellationToken()
+
+        async def answer():
+            return 42
+        self.assertEqual(asyncio.run(token.run(answer())), 42)
+
+    def test_cancelled_token_refuses_new_work(self):
+        token = CancellationToken()
+        token.cancel("new message")
+        with self.assertRaises(OperationCancelled):
+            token.raise_if_cancelled()
+
+
+class TestCancelledStreams(IsolatedGateway, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = offline_client(coalesce=True)
+
+    def use(self, completions):
+        self.client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return completions
+
+    def collect(self, token):
+        async def main():
+            stream = await self.client.generate_response("hi", stream=True, max_tokens=500, cancel=token)
+            return [chunk async for chunk, _ in stream]
+        start = time.perf_counter()
+        chunks = asyncio.run(main())
+        return chunks, time.perf_counter() - start
+
+    def test_cancel_before_first_token_closes_at_once(self):
+        api = self.use(SlowCompletions(first_delay_s=5))
+        saved = metrics.counter("llm.cancel.tokens_saved")
+        token = CancellationToken()
+        cancel_later(token, 0.05)
+        chunks, elapsed = self.collect(token)
+        self.assertEqual(chunks, [])
+        self.assertLess(elapsed, 1)
+        self.assertTrue(api.responses[0].closed)
+        self.assertEqual(LLMGateway().limiter.stats()["active"], 0)
+        self.assertEqual(metrics.counter("llm.cancel.tokens_saved"), saved + 500)
+
+    def test_cancel_mid_stream(self):
+        api = self.use(SlowCompletions(gap_s=0.02))
+        before = metrics.counter("llm.cancelled.mid_stream")
+        token = CancellationToken()
+        cancel_later(token, 0.1)
+        chunks, elapsed = self.collect(token)
+        self.assertTrue(0 < len(chunks) < 100)
+        self.assertLess(elapsed, 1)
+        self.assertTrue(api.responses[0].closed)
+        self.assertEqual(metrics.counter("llm.cancelled.mid_stream"), before + 1)
+
+    def test_cancel_while_stream_stalls_after_first_chunk(self):
+        api = self.use(SlowCompletions(gap_s=5))
+        token = CancellationToken()
+        cancel_later(token, 0.1)
+        chunks, elapsed = self.collect(token)
+        self.assertEqual(chunks, ["w0 "])
+        self.assertLess(elapsed, 1)
+        self.assertTrue(api.responses[0].closed)
+        self.assertEqual(LLMGateway().limiter.stats()["active"], 0)
+
+    def test_cancel_while_queued_frees_the_queue(self):
+        LLMGateway().limiter = PriorityLimiter(max_concurrency=1)
+        api = self.use(SlowCompletions())
+
+        async def main():
+            await LLMGateway().limiter.acquire()  # another session holds the only slot
+            token = CancellationToken()
+            stream = await self.client.generate_response("hi", stream=True, cancel=token)
+            asyncio.get_running_loop().call_later(0.05, token.cancel)
+            chunks = [chunk async for chunk, _ in stream]
+            queued = LLMGateway().limiter.stats()["queued"]
+            LLMGateway().limiter.release()
+            return chunks, queued
+
+        chunks, queued = asyncio.run(main())
+        self.assertEqual((chunks, queued), ([], 0))
+        self.assertEqual(api.responses, [])
+
+    def test_uncancelled_stream_is_complete(self):
+        self.use(SlowCompletions(words=5))
+        chunks, _ = self.collect(CancellationToken())
+        self.assertEqual("".join(chunks).split(), ["w0", "w1", "w2", "w3", "w4"])
+
+
+class FakeRouter:
+    def __init__(self, intent, entities):
+        self.result = (intent, entities)
+
+    async def route_query_async(self, user_query, history=None, user_profile=None):
+        return self.result
+
+
+class FakeMemory:
+    def __init__(self):
+        self.history = []
+        self.user_profile = {"mark": None, "percentile": None, "rank": None}
+
+    def add_message(self, role, content):
+        self.history.append({"role": role, "content": content})
+
+    def update_profile(self, key, value):
+        self.user_profile[key] = value
+
+
+class WordLLM:
+    """Streams ten words, `gap_s` apart, unless the call's token is cancelled."""
+
+    def __init__(self, gap_s=0.02):
+        self.gap_s = gap_s
+
+    async def generate_response(self, prompt, system_prompt=None, stream=False, profile=None, cancel=None, **kwargs):
+        async def tokens():
+            for i in range(10):
+                await asyncio.sleep(self.gap_s)
+                if cancel is not None and cancel.cancelled:
+                    return
+                yield f"word{i} ", []
+        return tokens()
+
+
+def make_agent(intent, entities):
+    agent = CounsellorAgent.__new__(CounsellorAgent)
+    agent.intent_router = FakeRouter(intent, entities)
+    agent.reasoning = ReasoningEngine()
+    agent.templates = TemplateResponder()
+    agent.memory = FakeMemory()
+    agent.llm = WordLLM()
+    return agent
+
+
+class TestCancelledTurns(unittest.TestCase):
+    def setUp(self):
+        self._templated, config.TEMPLATE_INTENTS = config.TEMPLATE_INTENTS, []
+
+    def tearDown(self):
+        config.TEMPLATE_INTENTS = self._templated
+
+    def test_cancelled_turn_records_what_was_shown(self):
+        agent = make_agent("GREETING", {})
+        token = CancellationToken()
+
+        async def main():
+            shown = []
+            async for chunk in agent.process_query_stream("hello", cancel=token):
+                shown.append(chunk)
+                if len(shown) == 3:
+                    token.cancel()
+            return shown
+
+        shown = asyncio.run(main())
+        self.assertNotIn(DISCLAIMER, shown)
+        self.assertEqual([m["role"] for m in agent.memory.history], ["user", "assistant"])
+        content = agent.memory.history[-1]["content"]
+        self.assertTrue(content.startswith("word0 word1 word2"))
+        self.assertTrue(content.endswith(CANCELLED_NOTE))
+
+    def test_closed_generator_counts_as_cancelled(self):
+        agent = make_agent("GREETING", {})
+
+        async def main():
+            stream = agent.process_query_stream("hello")
+            await stream.__anext__()
+            await stream.aclose()
+
+        asyncio.run(main())
+        self.assertEqual(agent.memory.history[-1]["content"], f"word0\n\n{CANCELLED_NOTE}")
+
+    def test_completed_turns_are_not_marked(self):
+        agent = make_agent("OFF_TOPIC", {})
+        asyncio.run(self._drain(agent, "weather?"))
+        self.assertEqual([m["role"] for m in agent.memory.history], ["user"])
+
+        agent = make_agent("GREETING", {})
+        asyncio.run(self._drain(agent, "hello"))
+        self.assertNotIn(CANCELLED_NOTE, agent.memory.history[-1]["content"])
+
+    @staticmethod
+    async def _drain(agent, query):
+        return [chunk async for chunk in agent.process_query_stream(query)]
+
+
+if __name__ == '__main__':
+    unittest.main()
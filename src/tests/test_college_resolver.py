@@ -0,0 +1,124 @@
+
+import unittest
+import sys
+import os
+import json
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.college_resolver import CollegeResolver, normalize_key
+from utils.metrics import metrics
+
+COLLEGES = [
+    {"code": 1, "name": "University Departments of Anna University, Chennai - CEG Campus, Sardar Patel Road, Guindy, Chennai 600025"},
+    {"code": 4, "name": "University Departments of Anna University, Chennai - MIT Campus, Chromepet, Chennai 600044"},
+    {"code": 1113, "name": "R M K Engineering College (Autonomous), Kavaraipettai, Gummidipoondi Taluk"},
+    {"code": 1315, "name": "Sri Sivasubramaniya Nadar College of Engineering (Autonomous), Kalavakkam 603110"},
+    {"code": 2007, "name": "Coimbatore Institute of Technology (Autonomous), Civil Aerodrome Post, Coimbatore 641014"},
+    {"code": 2712, "name": "Kumaraguru College of Technology (Autonomous), Chinnavedampatti Post, Coimbatore 641049"},
+    {"code": 3011, "name": "Government College of Engineering, Salem 636011"},
+    {"code": 3012, "name": "Government College of Engineering, Bargur 635104"},
+]
+
+ALIASES = {
+    "CEG": "COLLEGE OF ENGINEERING GUINDY",
+    "GUINDY": "COLLEGE OF ENGINEERING GUINDY",
+    "MIT": "MADRAS INSTITUTE OF TECHNOLOGY",
+    "SSN": "SSN COLLEGE OF ENGINEERING",
+    "RMK": "R.M.K. ENGINEERING COLLEGE",
+    "KUMARAGURU": "KUMARAGURU COLLEGE OF TECHNOLOGY",
+    "GCE": "GOVERNMENT COLLEGE OF ENGINEERING",
+}
+
+
+class FakeEmbeddingSearch:
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def search(self, query, top_k=5, threshold=0.3):
+        self.calls.append(query)
+        return self.results.get(query, [])
+
+
+class TestCollegeResolver(unittest.TestCase):
+    def setUp(self):
+        CollegeResolver._instance = None
+        metrics.reset()
+        self.resolver = CollegeResolver()
+        self.resolver.index_colleges(COLLEGES, ALIASES)
+
+    def code_of(self, query):
+        result = self.resolver.resolve(query)
+        return result["college"]["code"] if result and result["college"] else None
+
+    def test_normalize_key_joins_initials(self):
+        self.assertEqual(normalize_key("R.M.K. Engineering College"), "RMK ENGINEERING COLLEGE")
+        self.assertEqual(normalize_key("r m k  engineering-college"), "RMK ENGINEERING COLLEGE")
+
+    def test_aliases_pinned_to_catalogue(self):
+        self.assertEqual(self.code_of("ceg"), 1)
+        self.assertEqual(self.code_of("Guindy"), 1)  # shares CEG's full name
+        self.assertEqual(self.code_of("MIT"), 4)     # standalone word of one name
+        self.assertEqual(self.code_of("SSN"), 1315)  # unique auto-acronym
+        self.assertEqual(self.code_of("RMK"), 1113)
+        self.assertEqual(self.resolver.resolved_aliases()["KUMARAGURU"], COLLEGES[5]["name"])
+
+    def test_ambiguous_alias_keeps_full_name(self):
+        result = self.resolver.resolve("GCE")
+        self.assertIsNone(result["college"])
+        self.assertEqual(result["name"], "GOVERNMENT COLLEGE OF ENGINEERING")
+        self.assertNotIn("GCE", self.resolver.resolved_aliases())
+
+    def test_exact_name_and_code(self):
+        self.assertEqual(self.resolver.resolve("R.M.K. Engineering College")["source"], "exact")
+        self.assertEqual(self.code_of("2007"), 2007)
+
+    def test_typos_resolve_lexically_without_model(self):
+        self.assertEqual(self.code_of("Coimbatore Institue of Techology"), 2007)
+        self.assertEqual(self.code_of("kumaraguru college of tech"), 2712)
+
+    def test_unknown_returns_none(self):
+        self.assertIsNone(self.resolver.resolve("xyz random college"))
+        self.assertEqual(metrics.counter("resolver.unresolved"), 1)
+
+    def test_semantic_only_consulted_when_lexical_unsure(self):
+        fake = FakeEmbeddingSearch({"the chromepet campus": [(COLLEGES[1], 0.72)]})
+        self.resolver.embedding_search = fake
+        self.assertEqual(self.code_of("kumaraguru college of technology"), 2712)
+        self.assertEqual(fake.calls, [])
+        result = self.resolver.resolve("the chromepet campus")
+        self.assertEqual((result["college"]["code"], result["source"]), (4, "semantic"))
+
+    def test_stats_counts_stages(self):
+        self.resolver.resolve("CEG")
+        self.resolver.resolve("xyz random college")
+        metrics.incr("resolver.llm_fallback")
+        stats = self.resolver.stats()
+        self.assertEqual((stats["alias"], stats["unresolved"], stats["llm_fallback"]), (1, 1, 1))
+        self.assertAlmostEqual(stats["llm_fallback_rate"], 0.5)
+
+
+class TestCatalogueAliases(unittest.TestCase):
+    """The agent's alias table against the shipped catalogue."""
+
+    def test_strategic_aliases_resolve(self):
+        path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'json', 'colleges.json')
+        if not os.path.exists(path):
+            self.skipTest("colleges.json not available")
+        with open(path) as f:
+            colleges = json.load(f)
+        from agent.counsellor_agent import CounsellorAgent
+
+        CollegeResolver._instance = None
+        resolver = CollegeResolver()
+        resolver.index_colleges(colleges, CounsellorAgent.STRATEGIC_ALIASES)
+        expected = {"CEG": 1, "ANNA UNIV MAIN": 1, "MIT": 4, "SSN": 1315, "KCT": 2712, "PSG ITECH": 2377, "RMD": 1112}
+        for alias, code in expected.items():
+            result = resolver.resolve(alias)
+            self.assertEqual(result["college"]["code"], code, alias)
+
+
+if __name__ == '__main__':
+    unittest.main()
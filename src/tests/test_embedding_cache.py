@@ -0,0 +1,93 @@
+
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.embedding_cache import EmbeddingDiskCache
+
+
+class FakeEncoder:
+    """Deterministic stand-in for the sentence-transformer that counts encoded texts."""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.encoded = []
+
+    def __call__(self, texts):
+        self.encoded.extend(texts)
+        rows = []
+        for t in texts:
+            rng = np.random.default_rng(abs(hash(t)) % (2 ** 32))
+            v = rng.standard_normal(self.dim).astype(np.float32)
+            rows.append(v / np.linalg.norm(v))
+        return np.stack(rows)
+
+
+class TestEmbeddingDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.texts = ["College of Engineering Guindy CHENNAI 1 CEG", "PSG College of Technology COIMBATORE 2006 PSG"]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unchanged_catalogue_is_not_re_encoded(self):
+        encoder = FakeEncoder()
+        first = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name).get_or_encode(self.texts, encoder)
+        self.assertEqual(len(encoder.encoded), 2)
+
+        # A fresh instance (new Streamlit session) reads everything from disk
+        second = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name).get_or_encode(self.texts, encoder)
+        self.assertEqual(len(encoder.encoded), 2)
+        np.testing.assert_allclose(first, second)
+        self.assertEqual(second.dtype, np.float32)
+
+    def test_only_changed_texts_are_encoded(self):
+        encoder = FakeEncoder()
+        cache = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name)
+        cache.get_or_encode(self.texts, encoder)
+
+        changed = [self.texts[0], "SSN College of Engineering CHENGALPATTU 1315 SSN"]
+        result = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name).get_or_encode(changed, encoder)
+        self.assertEqual(encoder.encoded[2:], [changed[1]])
+        self.assertEqual(result.shape, (2, encoder.dim))
+
+    def test_model_name_is_part_of_key(self):
+        encoder = FakeEncoder()
+        EmbeddingDiskCache("model-a", cache_dir=self.tmp.name).get_or_encode(self.texts, encoder)
+        EmbeddingDiskCache("model-b", cache_dir=self.tmp.name).get_or_encode(self.texts, encoder)
+        self.assertEqual(len(encoder.encoded), 4)
+
+    def test_workers_appending_in_turn_keep_each_others_rows(self):
+        encoder = FakeEncoder()
+        # Both workers open the (empty) cache before either writes
+        worker_a = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name)
+        worker_b = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name)
+        a = worker_a.get_or_encode([self.texts[0]], encoder)
+        b = worker_b.get_or_encode([self.texts[1]], encoder)
+
+        fresh = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name)
+        both = fresh.get_or_encode(self.texts, encoder)
+        self.assertEqual(len(encoder.encoded), 2)
+        np.testing.assert_allclose(both, np.concatenate([a, b]))
+        self.assertEqual([p for p in os.listdir(fresh.cache_dir) if p.endswith(".tmp")], [])
+
+    def test_float16_storage(self):
+        encoder = FakeEncoder()
+        cache = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name, dtype="float16")
+        first = cache.get_or_encode(self.texts, encoder)
+        reloaded = EmbeddingDiskCache("test-model", cache_dir=self.tmp.name, dtype="float16")
+        second = reloaded.get_or_encode(self.texts, encoder)
+        self.assertEqual(len(encoder.encoded), 2)
+        self.assertEqual(second.dtype, np.float32)
+        np.testing.assert_allclose(first, second, atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,11 @@ import logging
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from ai.embedding_search import CollegeEmbeddingSearch
+import numpy as np
+
+from config import config
+from ai.embedding_search import CollegeEmbeddingSearch, top_k_scores, college_search_texts
+from ai.embedding_backends import TorchEmbeddingBackend, OnnxEmbeddingBackend
 
 # Mock data
 SAMPLE_COLLEGES = [
@@ -60,5 +64,59 @@ class TestEmbeddingSearch(unittest.TestCase):
          self.assertTrue(len(results) > 0)
          self.assertEqual(results[0][0]['code'], 2006)
 
+# Alias / fuzzy queries exercised above, used for backend parity
+ALIAS_QUERIES = [
+    ("College of Engineering Guindy", 1),
+    ("CEG Chennai", 1),
+    ("MIT Chromepet", 4),
+    ("Coimbatore Institue of Techology", 2007),
+    ("PSG Coimbatore", 2006),
+]
+
+
+class TestOnnxBackendParity(unittest.TestCase):
+    """The int8 ONNX backend must rank colleges like the torch reference."""
+
+    @classmethod
+    def setUpClass(cls):
+        if not (TorchEmbeddingBackend.is_installed() and OnnxEmbeddingBackend.is_installed()):
+            raise unittest.SkipTest("Both torch and onnx embedding backends must be installed")
+        try:
+            cls.torch_backend = TorchEmbeddingBackend(config.EMBEDDING_MODEL_NAME)
+            cls.onnx_backend = OnnxEmbeddingBackend(config.EMBEDDING_MODEL_NAME)
+        except Exception as e:
+            raise unittest.SkipTest(f"Model files unavailable: {e}")
+        cls.index_texts = college_search_texts(SAMPLE_COLLEGES, TestEmbeddingSearch.TEST_ALIASES)
+        cls.queries = [q for q, _ in ALIAS_QUERIES]
+
+    def test_query_vectors_close(self):
+        ref = self.torch_backend.encode(self.queries)
+        out = self.onnx_backend.encode(self.queries)
+        cosines = (ref * out).sum(axis=1)
+        self.assertTrue((cosines > 0.98).all(), f"cosine parity too low: {cosines}")
+
+    def test_same_top1_on_alias_queries(self):
+        for backend in (self.torch_backend, self.onnx_backend):
+            index = backend.encode(self.index_texts)
+            top1 = (backend.encode(self.queries) @ index.T).argmax(axis=1)
+            codes = [SAMPLE_COLLEGES[i]['code'] for i in top1]
+            self.assertEqual(codes, [c for _, c in ALIAS_QUERIES], f"{backend.name} backend")
+
+
+class TestTopKScores(unittest.TestCase):
+    def test_matches_full_sort(self):
+        rng = np.random.default_rng(0)
+        scores = rng.standard_normal((4, 50)).astype(np.float32)
+        idx, vals = top_k_scores(scores, 5)
+        expected = np.argsort(-scores, axis=1)[:, :5]
+        np.testing.assert_array_equal(idx, expected)
+        np.testing.assert_allclose(vals, np.take_along_axis(scores, expected, axis=1))
+
+    def test_k_larger_than_index(self):
+        scores = np.array([[0.1, 0.9, 0.5]], dtype=np.float32)
+        idx, vals = top_k_scores(scores, 10)
+        self.assertEqual(idx.tolist(), [[1, 2, 0]])
+        self.assertEqual(vals.shape, (1, 3))
+
 if __name__ == '__main__':
     unittest.main()
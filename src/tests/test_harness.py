@@ -10,6 +10,10 @@ from ai.reasoning_engine import ReasoningEngine
 from ai.prompts import MASTER_SYSTEM_PROMPT
 
 from llm_gateway import LLMClient
+from llm_cassette import record_hint, replay_without_key
+
+# Replayed when no API key is set (record with LLM_CASSETTE_MODE=record, see README)
+CASSETTE_PATH = os.path.join(os.path.dirname(__file__), 'cassettes', 'harness.jsonl')
 
 def run_tests():
     print("Loading Test Cases...")
@@ -76,7 +80,7 @@ def run_tests():
                     continue
                 
                 # EXECUTE LLM
-                response, _ = llm.generate_response(case['input'], system_prompt=prompt, stream=False)
+                response, _ = llm.generate_response_sync(case["input"], system_prompt=prompt)
                 
                 # Check constraints on RESPONSE
                 errors = []
@@ -120,5 +124,8 @@ def run_tests():
     return True
 
 if __name__ == "__main__":
+    if not replay_without_key(CASSETTE_PATH):
+        print(f"FAIL: {record_hint('tests/test_harness.py')}")
+        sys.exit(1)
     success = run_tests()
     sys.exit(0 if success else 1)
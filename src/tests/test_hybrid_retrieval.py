@@ -0,0 +1,119 @@
+
+import unittest
+import sys
+import os
+import tempfile
+import zlib
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ai.model_provider as model_provider
+from ai.hybrid_retrieval import BM25Index, fuse_scores, tokenize
+from ai.model_provider import EmbeddingModelProvider
+from ai.rag_engine import GuidelineRAG
+from config import config
+
+GUIDELINES = """# Registration Fee
+The registration fee is Rs. 500 for general candidates and Rs. 250 for SC, SCA and ST candidates of Tamil Nadu.
+
+# Community Certificates
+Candidates claiming BC, BCM or MBC reservation must upload a community certificate issued by the Tahsildar.
+
+# Counselling Rounds
+Counselling is conducted online in multiple rounds. Candidates fill choices in order of preference and confirm allotments.
+
+# Hostel Facilities
+Most colleges offer separate hostels for boys and girls. Hostel fees are paid directly to the college after allotment.
+"""
+
+
+class TestBM25(unittest.TestCase):
+    def setUp(self):
+        self.docs = [
+            "Registration fee is Rs. 500 for general candidates.",
+            "BCM candidates must upload a community certificate.",
+            "Counselling is conducted online in multiple rounds.",
+        ]
+        self.index = BM25Index(["a", "b", "c"], self.docs)
+
+    def test_tokenize_keeps_codes_and_amounts(self):
+        self.assertEqual(tokenize("What is the fee for SCA? Rs. 500"), ["fee", "sca", "rs", "500"])
+
+    def test_exact_term_ranks_first(self):
+        self.assertEqual(self.index.search("BCM certificate")[0][0], "b")
+        self.assertEqual(self.index.search("fee 500")[0][0], "a")
+        self.assertEqual(self.index.search("unrelated words"), [])
+
+    def test_fuse_scores(self):
+        fused = fuse_scores([("a", 0.8), ("b", 0.4)], [("b", 4.0), ("c", 2.0)], bm25_weight=0.5)
+        self.assertEqual([cid for cid, _ in fused], ["b", "a", "c"])
+        self.assertAlmostEqual(dict(fused)["b"], 0.75)
+        self.assertAlmostEqual(dict(fused)["a"], 0.5)
+        self.assertAlmostEqual(dict(fused)["c"], 0.25)
+
+
+class BagOfWordsBackend:
+    """Hashed word counts: a crude but deterministic stand-in for the sentence encoder."""
+    fail = False
+
+    @staticmethod
+    def is_installed():
+        return True
+
+    @staticmethod
+    def cache_namespace_for(model_name):
+        return f"{model_name}+bow"
+
+    def __init__(self, model_name):
+        pass
+
+    def encode(self, texts):
+        if BagOfWordsBackend.fail:
+            raise RuntimeError("model unavailable")
+        vectors = np.zeros((len(texts), 32), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % 32] += 1.0
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class TestHybridRetrieve(unittest.TestCase):
+    def setUp(self):
+        self._orig = (model_provider.get_backend_class, model_provider.create_backend, config.RAG_BACKEND)
+        model_provider.get_backend_class = lambda name=None: BagOfWordsBackend
+        model_provider.create_backend = lambda model_name, name=None: BagOfWordsBackend(model_name)
+        config.RAG_BACKEND = "numpy"
+        EmbeddingModelProvider._instance = None
+        BagOfWordsBackend.fail = False
+
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, "docs"))
+        with open(os.path.join(self.tmp.name, "docs", "tnea_guidelines.txt"), "w", encoding="utf-8") as f:
+            f.write(GUIDELINES)
+        self.rag = GuidelineRAG(data_dir=self.tmp.name)
+
+    def tearDown(self):
+        model_provider.get_backend_class, model_provider.create_backend, config.RAG_BACKEND = self._orig
+        EmbeddingModelProvider._instance = None
+        self.tmp.cleanup()
+
+    def test_exact_terms_rank_first(self):
+        results = self.rag.retrieve("Which certificate do BCM candidates need?", n_results=3)
+        self.assertIn("BCM", results[0]["document"])
+
+    def test_weak_chunks_are_dropped(self):
+        results = self.rag.retrieve("SCA registration fee Rs. 250", n_results=3)
+        self.assertIn("Registration Fee", results[0]["document"])
+        self.assertLess(len(results), 3)
+
+    def test_bm25_only_when_model_fails(self):
+        BagOfWordsBackend.fail = True
+        results = self.rag.retrieve("hostel fees for girls", n_results=2)
+        self.assertIn("Hostel", results[0]["document"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+
+import unittest
+import asyncio
+import sys
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+from llm_cache import CompletionCache, completion_key
+from llm_fakes import IsolatedGateway, offline_client
+
+
+class FakeCompletions:
+    """Stands in for AsyncOpenAI().chat.completions; counts API calls."""
+
+    def __init__(self, reply="Hello student", fail=False):
+        self.reply = reply
+        self.fail = fail
+        self.calls = 0
+
+    async def create(self, model, messages, stream=False, **params):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("timeout")
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+        async def chunks():
+            for word in self.reply.split(" "):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+        return chunks()
+
+
+async def collect(stream):
+    return "".join([token async for token, _ in stream])
+
+
+class TestCompletionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = CompletionCache(os.path.join(self.tmp.name, "llm.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_key_covers_model_messages_and_params(self):
+        messages = [{"role": "user", "content": "hi"}]
+        base = completion_key("m", messages, temperature=0.6)
+        self.assertEqual(base, completion_key("m", [{"content": "hi", "role": "user"}], temperature=0.6))
+        self.assertNotEqual(base, completion_key("m2", messages, temperature=0.6))
+        self.assertNotEqual(base, completion_key("m", messages, temperature=0.2))
+        self.assertNotEqual(base, completion_key("m", [{"role": "system", "content": "x"}] + messages, temperature=0.6))
+
+    def test_ttl(self):
+        self.cache.put("k", "m", "answer", ttl_s=60)
+        self.cache.put("short", "m", "answer", ttl_s=0.01)
+        self.cache.put("never", "m", "answer", ttl_s=0)
+        time.sleep(0.02)
+        self.assertEqual(self.cache.get("k"), "answer")
+        self.assertIsNone(self.cache.get("short"))
+        self.assertIsNone(self.cache.get("never"))
+        self.assertEqual(self.cache.purge_expired(), 1)
+        self.assertEqual(self.cache.stats()["entries"], 1)
+
+    def test_expired_rows_are_purged_on_open_and_periodically(self):
+        self.cache.put("short", "m", "answer", ttl_s=0.01)
+        time.sleep(0.02)
+        reopened = CompletionCache(self.cache.path)
+        self.assertEqual(reopened.stats()["entries"], 0)
+
+        reopened.put("short", "m", "answer", ttl_s=0.01)
+        time.sleep(0.02)
+        reopened._purged_at -= CompletionCache.PURGE_INTERVAL_S
+        reopened.put("k", "m", "answer", ttl_s=60)
+        self.assertEqual(reopened.stats()["entries"], 1)
+        reopened.close()
+
+    def test_async_get_and_put(self):
+        async def roundtrip():
+            await self.cache.aput("k", "m", "answer", 60)
+            return await self.cache.aget("k")
+        self.assertEqual(asyncio.run(roundtrip()), "answer")
+
+    def test_persists_across_instances(self):
+        self.cache.put("k", "m", "answer", ttl_s=60)
+        other = CompletionCache(self.cache.path)
+        self.assertEqual(other.get("k"), "answer")
+        other.close()
+
+
+class TestLLMClientCaching(IsolatedGateway, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = CompletionCache(os.path.join(self.tmp.name, "llm.sqlite3"))
+        self.completions = FakeCompletions()
+        self.client = offline_client(completions=self.completions, coalesce=True, cache=self.cache)
+
+    def tearDown(self):
+        super().tearDown()
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_non_stream_hit(self):
+        first, _ = asyncio.run(self.client.generate_response("hi", system_prompt="sys"))
+        second, _ = asyncio.run(self.client.generate_response("hi", system_prompt="sys"))
+        self.assertEqual(first, second)
+        self.assertEqual(self.completions.calls, 1)
+        asyncio.run(self.client.generate_response("hi", system_prompt="other"))
+        self.assertEqual(self.completions.calls, 2)
+
+    def test_stream_replay(self):
+        live = asyncio.run(collect(asyncio.run(self.client.generate_response("hi", stream=True))))
+        replayed = asyncio.run(collect(asyncio.run(self.client.generate_response("hi", stream=True))))
+        self.assertEqual(live, replayed)
+        self.assertEqual(self.completions.calls, 1)
+        # The streamed answer also serves the non-streaming form of the same request
+        self.assertEqual(asyncio.run(self.client.generate_response("hi"))[0], live)
+
+    def test_bypass(self):
+        asyncio.run(self.client.generate_response("hi"))
+        asyncio.run(self.client.generate_response("hi", use_cache=False))
+        asyncio.run(self.client.generate_response("hi", cache_ttl=0))
+        self.assertEqual(self.completions.calls, 3)
+
+    def test_errors_not_cached(self):
+        self.completions.fail = True
+        asyncio.run(self.client.generate_response("hi"))
+        asyncio.run(collect(asyncio.run(self.client.generate_response("hi", stream=True))))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+
+import unittest
+import asyncio
+import sys
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+from config import config
+from llm_cassette import Cassette, replay_without_key
+from llm_gateway import is_error_response
+from utils.metrics import metrics
+from llm_fakes import IsolatedGateway, offline_client
+
+
+class Upstream:
+    """A live API stand-in: streams `reply` word by word, `gap_s` apart after `first_delay_s`."""
+
+    def __init__(self, reply="Counselling has three rounds", first_delay_s=0.0, gap_s=0.0):
+        self.reply = reply
+        self.first_delay_s = first_delay_s
+        self.gap_s = gap_s
+        self.calls = 0
+
+    async def create(self, model, messages, stream=False, **params):
+        self.calls += 1
+        if not stream:
+            await asyncio.sleep(self.first_delay_s)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))],
+                                   usage=SimpleNamespace(prompt_tokens=12, completion_tokens=5))
+        words = self.reply.split(" ")
+
+        async def chunks():
+            await asyncio.sleep(self.first_delay_s)
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(self.gap_s)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word if i == 0 else " " + word))])
+        return chunks()
+
+
+async def collect(stream):
+    return "".join([token async for token, _ in stream])
+
+
+class TestCassette(IsolatedGateway, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self._key, config.NVIDIA_API_KEY = config.NVIDIA_API_KEY, None
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cassettes", "test.jsonl")
+
+    def tearDown(self):
+        config.NVIDIA_API_KEY = self._key
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def recorder(self, upstream):
+        return offline_client(completions=upstream, cassette=Cassette(self.path, "record"))
+
+    def player(self, latency_scale=0.0):
+        return offline_client(api_key=None, cassette=Cassette(self.path, "replay", latency_scale))
+
+    def test_replays_what_was_recorded_without_network_or_key(self):
+        upstream = Upstream()
+        recorder = self.recorder(upstream)
+        content, _ = asyncio.run(recorder.generate_response("rounds?"))
+        streamed = asyncio.run(collect(asyncio.run(recorder.generate_response("rounds?", stream=True))))
+        self.assertEqual(upstream.calls, 2)
+        self.assertIsNone(recorder.cache)
+
+        player = self.player()
+        self.assertEqual(asyncio.run(player.generate_response("rounds?"))[0], content)
+        self.assertEqual(asyncio.run(collect(asyncio.run(player.generate_response("rounds?", stream=True)))), streamed)
+        self.assertEqual(player.generate_response_sync("rounds?")[0], content)
+
+    def test_replay_keeps_recorded_timing_when_asked(self):
+        self.recorder_stream(Upstream(first_delay_s=0.15, gap_s=0.02))
+
+        async def first_token_s(client):
+            start = time.perf_counter()
+            stream = await client.generate_response("rounds?", stream=True)
+            await stream.__anext__()
+            ttft = time.perf_counter() - start
+            await stream.aclose()
+            return ttft
+
+        self.assertLess(asyncio.run(first_token_s(self.player(latency_scale=0.0))), 0.05)
+        self.assertGreater(asyncio.run(first_token_s(self.player(latency_scale=1.0))), 0.12)
+
+    def recorder_stream(self, upstream):
+        asyncio.run(collect(asyncio.run(self.recorder(upstream).generate_response("rounds?", stream=True))))
+
+    def test_repeated_requests_replay_in_order(self):
+        self.recorder_stream(Upstream(reply="first answer"))
+        self.recorder_stream(Upstream(reply="second answer"))
+        player = self.player()
+        replies = [asyncio.run(collect(asyncio.run(player.generate_response("rounds?", stream=True))))
+                   for _ in range(3)]
+        self.assertEqual(replies, ["first answer", "second answer", "second answer"])
+
+    def test_unrecorded_request_is_a_failed_call(self):
+        self.recorder_stream(Upstream())
+        misses = metrics.counter("llm.cassette.misses")
+        content, _ = asyncio.run(self.player().generate_response("a question never recorded"))
+        self.assertTrue(is_error_response(content))
+        self.assertEqual(metrics.counter("llm.cassette.misses"), misses + 1)
+
+    def test_streams_closed_early_are_not_recorded(self):
+        recorder = self.recorder(Upstream(gap_s=0.01))
+
+        async def first_token_only():
+            stream = await recorder.generate_response("rounds?", stream=True)
+            await stream.__anext__()
+            await stream.aclose()
+
+        asyncio.run(first_token_only())
+        self.assertEqual(len(Cassette(self.path, "replay")), 0)
+
+    def test_scripts_replay_when_no_key_is_set(self):
+        saved = config.LLM_CASSETTE_MODE, config.LLM_CASSETTE_PATH
+        try:
+            config.LLM_CASSETTE_MODE = ""
+            self.assertFalse(replay_without_key(self.path))  # nothing recorded yet: caller fails
+            self.assertEqual((config.LLM_CASSETTE_MODE, config.LLM_CASSETTE_PATH), ("replay", self.path))
+
+            self.recorder_stream(Upstream())
+            self.assertTrue(replay_without_key(self.path))
+            config.LLM_CASSETTE_MODE, config.NVIDIA_API_KEY = "", "live-key"
+            self.assertTrue(replay_without_key(self.path))
+            self.assertEqual(config.LLM_CASSETTE_MODE, "")
+        finally:
+            config.LLM_CASSETTE_MODE, config.LLM_CASSETTE_PATH = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+
+import unittest
+import asyncio
+import sys
+import os
+import threading
+import time
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llm_gateway import LLMClient
+from llm_limits import PriorityLimiter
+
+
+class TestPriorityLimiter(unittest.TestCase):
+    def test_concurrency_cap(self):
+        limiter = PriorityLimiter(max_concurrency=2)
+        active, peak = [0], [0]
+
+        async def job():
+            await limiter.acquire()
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            limiter.release()
+
+        async def run():
+            await asyncio.gather(*[job() for _ in range(8)])
+
+        asyncio.run(run())
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(limiter.stats()["active"], 0)
+
+    def test_interactive_lane_first(self):
+        limiter = PriorityLimiter(max_concurrency=1)
+        order = []
+
+        async def job(name, lane):
+            await limiter.acquire(lane)
+            order.append(name)
+            limiter.release()
+
+        async def run():
+            await limiter.acquire()
+            waiting = [asyncio.ensure_future(job("batch-1", "batch")),
+                       asyncio.ensure_future(job("batch-2", "batch")),
+                       asyncio.ensure_future(job("chat", "interactive"))]
+            await asyncio.sleep(0.01)
+            limiter.release()
+            await asyncio.gather(*waiting)
+
+        asyncio.run(run())
+        self.assertEqual(order, ["chat", "batch-1", "batch-2"])
+
+    def test_token_bucket_paces_requests(self):
+        limiter = PriorityLimiter(max_concurrency=10, rate_per_min=1200, burst=1)  # 20/s
+
+        async def run():
+            start = time.perf_counter()
+            for _ in range(4):
+                await limiter.acquire()
+                limiter.release()
+            return time.perf_counter() - start
+
+        # First from the burst, then one every 50 ms
+        self.assertGreaterEqual(asyncio.run(run()), 0.14)
+
+    def test_cancelled_waiter_releases_nothing_it_did_not_get(self):
+        limiter = PriorityLimiter(max_concurrency=1)
+
+        async def run():
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            limiter.release()
+            await asyncio.wait_for(limiter.acquire(), timeout=1)
+            limiter.release()
+
+        asyncio.run(run())
+        self.assertEqual(limiter.stats(), {"active": 0, "queued": 0, "max_concurrency": 1, "tokens": None})
+
+    def test_blocking_callers_share_the_limit(self):
+        limiter = PriorityLimiter(max_concurrency=1)
+        acquired = threading.Event()
+
+        async def hold():
+            await limiter.acquire()
+            worker = threading.Thread(target=lambda: (limiter.acquire_blocking(), acquired.set()))
+            worker.start()
+            await asyncio.sleep(0.05)
+            self.assertFalse(acquired.is_set())
+            limiter.release()
+            await asyncio.to_thread(worker.join, 1)
+
+        asyncio.run(hold())
+        self.assertTrue(acquired.is_set())
+        limiter.release()
+
+
+class TestLLMGateway(unittest.TestCase):
+    def test_clients_share_one_pool_per_loop(self):
+        first = LLMClient(model_name="a", api_key="test", base_url="http://127.0.0.1:9/v1")
+        second = LLMClient(model_name="b", api_key="test", base_url="http://127.0.0.1:9/v1")
+        self.assertIs(first.gateway, second.gateway)
+
+        async def clients():
+            return first.client, second.client
+
+        a, b = asyncio.run(clients())
+        self.assertIs(a, b)
+        c, _ = asyncio.run(clients())
+        self.assertIsNot(a, c)  # a new loop gets its own pool
+        self.assertIs(first.sync_client, second.sync_client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+
+import unittest
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+from agent.intent_router import ROUTED_INTENTS
+from config import config
+from llm_profiles import (INTENT_PROFILES, PROFILES, GenerationProfile, get_profile, profile_for_intent,
+                          profile_report)
+from utils.metrics import metrics
+from llm_fakes import IsolatedGateway, offline_client
+
+
+class RecordingCompletions:
+    """Stands in for AsyncOpenAI().chat.completions; records model and parameters per call."""
+
+    def __init__(self, fail_models=()):
+        self.fail_models = set(fail_models)
+        self.calls = []
+
+    async def create(self, model, messages, stream=False, **params):
+        self.calls.append((model, params))
+        if model in self.fail_models:
+            raise ConnectionError("model overloaded")
+        usage = SimpleNamespace(prompt_tokens=40, completion_tokens=10)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"reply from {model}"))],
+                               usage=usage)
+
+
+class TestProfiles(unittest.TestCase):
+    def test_every_intent_has_a_profile(self):
+        for intent, name in INTENT_PROFILES.items():
+            self.assertIn(name, PROFILES, intent)
+        self.assertEqual(profile_for_intent("UNKNOWN").name, "default")
+
+    def test_every_routed_intent_has_its_own_profile(self):
+        for intent in ROUTED_INTENTS:
+            self.assertNotEqual(profile_for_intent(intent).name, "default", intent)
+
+    def test_params(self):
+        profile = GenerationProfile("x", max_tokens=64, temperature=0.0, top_p=1.0, stop=["\n"])
+        self.assertEqual(profile.params(), {"temperature": 0.0, "top_p": 1.0, "max_tokens": 64, "stop": ["\n"]})
+        self.assertEqual(profile.params(max_tokens=8)["max_tokens"], 8)
+        self.assertNotIn("stop", PROFILES["default"].params())
+
+    def test_unknown_name_falls_back_to_default(self):
+        self.assertIs(get_profile("nope"), PROFILES["default"])
+        self.assertIs(get_profile(None), PROFILES["default"])
+
+
+class TestProfiledClient(IsolatedGateway, unittest.TestCase):
+    breaker_failures = 1
+
+    def setUp(self):
+        super().setUp()
+        self._prices, config.LLM_PRICE_PER_1K_TOKENS = config.LLM_PRICE_PER_1K_TOKENS, "small=0.5"
+        self.completions = RecordingCompletions()
+        self.client = offline_client("large", completions=self.completions)
+        metrics.reset()
+
+    def tearDown(self):
+        config.LLM_PRICE_PER_1K_TOKENS = self._prices
+        metrics.reset()
+        super().tearDown()
+
+    def test_profile_sets_model_and_sampling(self):
+        fast = GenerationProfile("routing", model="small", max_tokens=256, temperature=0.0, top_p=1.0)
+        content, _ = asyncio.run(self.client.generate_response("classify", profile=fast))
+        self.assertEqual(content, "reply from small")
+        self.assertEqual(self.completions.calls[0], ("small", {"temperature": 0.0, "top_p": 1.0, "max_tokens": 256}))
+
+        asyncio.run(self.client.generate_response("explain"))
+        self.assertEqual(self.completions.calls[1][0], "large")
+
+    def test_small_model_failure_falls_back_to_client_model(self):
+        self.completions.fail_models = {"small"}
+        fast = GenerationProfile("greeting", model="small", max_tokens=100)
+        content, _ = asyncio.run(self.client.generate_response("hello", profile=fast))
+        self.assertEqual(content, "reply from large")
+
+    def test_report_per_profile(self):
+        fast = GenerationProfile("routing", model="small", max_tokens=256)
+        for _ in range(2):
+            asyncio.run(self.client.generate_response("classify", profile=fast))
+        asyncio.run(self.client.generate_response("explain", profile="guidance"))
+
+        report = profile_report()
+        self.assertEqual(report["routing"]["calls"], 2)
+        self.assertEqual(report["routing"]["prompt_tokens"], 80)
+        self.assertAlmostEqual(report["routing"]["cost"], 0.05)
+        self.assertIsNotNone(report["routing"]["latency_p50_s"])
+        self.assertEqual(report["guidance"]["cost"], 0)  # unpriced model
+        self.assertNotIn("colleges", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
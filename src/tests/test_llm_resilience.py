@@ -0,0 +1,262 @@
+
+import unittest
+import asyncio
+import sys
+import os
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+import openai
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+import llm_gateway
+from config import config
+from llm_gateway import LLMGateway, INTERRUPTED_NOTICE, is_error_response
+from llm_limits import PriorityLimiter
+from llm_resilience import CallPolicy, CircuitBreaker, ModelBreakers, backoff_delay, is_retryable
+from utils.metrics import metrics
+from llm_fakes import IsolatedGateway, offline_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedCompletions:
+    """
+    Stands in for AsyncOpenAI().chat.completions. Each call takes the next step of the script
+    (the last one repeats): an exception to raise, or (first_token_delay_s, token_gap_s).
+    """
+
+    def __init__(self, *script, reply="Seats are filled by rank"):
+        self.script = list(script) or [(0, 0)]
+        self.reply = reply
+        self.models = []
+
+    async def create(self, model, messages, stream=False, **params):
+        step = self.script[min(len(self.models), len(self.script) - 1)]
+        self.models.append(model)
+        if isinstance(step, Exception):
+            raise step
+        first_delay, gap = step
+        if not stream:
+            await asyncio.sleep(first_delay)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+        words = self.reply.split(" ")
+
+        async def chunks():
+            await asyncio.sleep(first_delay)
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(gap)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word if i == 0 else " " + word))])
+        return chunks()
+
+
+class ScriptedSyncClient:
+    """Stands in for OpenAI(): the same script as ScriptedCompletions, answered synchronously."""
+
+    def __init__(self, *script, reply="Seats are filled by rank"):
+        self.script = list(script) or [(0, 0)]
+        self.reply = reply
+        self.models = []
+        self.options = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def with_options(self, **options):
+        self.options.append(options)
+        return self
+
+    def create(self, model, messages, stream=False, **params):
+        step = self.script[min(len(self.models), len(self.script) - 1)]
+        self.models.append(model)
+        if isinstance(step, Exception):
+            raise step
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+
+async def collect(stream):
+    return "".join([token async for token, _ in stream])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_then_half_opens_for_one_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_after_s=30, clock=clock)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.record_failure())
+        self.assertFalse(breaker.allow())
+
+        clock.now = 31
+        self.assertTrue(breaker.allow())   # the trial
+        self.assertFalse(breaker.allow())  # everyone else waits for it
+        self.assertTrue(breaker.record_failure())
+        self.assertEqual(breaker.state, "open")
+
+        clock.now = 62
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_lost_trial_is_replaced(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_after_s=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        clock.now = 20  # trial caller never reported back
+        self.assertTrue(breaker.allow())
+
+    def test_pick_prefers_primary_until_its_circuit_opens(self):
+        breakers = ModelBreakers(failure_threshold=1, reset_after_s=60)
+        self.assertEqual(breakers.pick(["a", "b"]), "a")
+        breakers.record_failure("a")
+        self.assertEqual(breakers.pick(["a", "b"]), "b")
+        breakers.record_failure("b")
+        self.assertIsNone(breakers.pick(["a", "b"]))
+
+
+class TestRetryHelpers(unittest.TestCase):
+    def test_backoff_is_full_jitter_and_capped(self):
+        delays = [backoff_delay(5, base_s=0.5, cap_s=2) for _ in range(200)]
+        self.assertTrue(all(0 <= d <= 2 for d in delays))
+        self.assertGreater(max(delays) - min(delays), 0.5)
+
+    def test_retryable_errors(self):
+        self.assertTrue(is_retryable(ConnectionError("reset")))
+        self.assertTrue(is_retryable(asyncio.TimeoutError()))
+        self.assertFalse(is_retryable(ValueError("bad request")))
+
+
+class TestResilientClient(IsolatedGateway, unittest.TestCase):
+    breaker_failures = 2
+
+    def setUp(self):
+        super().setUp()
+        self._retry_base, config.LLM_RETRY_BASE_S = config.LLM_RETRY_BASE_S, 0.01
+        self.client = offline_client("primary")
+        self.client.models = ["primary", "backup"]
+
+    def tearDown(self):
+        config.LLM_RETRY_BASE_S = self._retry_base
+        super().tearDown()
+
+    def use(self, completions):
+        self.client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return completions
+
+    def test_retries_transient_errors(self):
+        api = self.use(ScriptedCompletions(ConnectionError("reset"), (0, 0)))
+        content, _ = asyncio.run(self.client.generate_response("hi", policy=CallPolicy(max_retries=2)))
+        self.assertEqual(content, api.reply)
+        self.assertEqual(api.models, ["primary", "primary"])
+
+    def test_request_errors_are_not_retried(self):
+        api = self.use(ScriptedCompletions(ValueError("bad request")))
+        content, _ = asyncio.run(self.client.generate_response("hi", policy=CallPolicy(max_retries=2)))
+        self.assertTrue(is_error_response(content))
+        self.assertEqual(len(api.models), 1)
+
+    def test_falls_back_when_primary_circuit_opens(self):
+        api = self.use(ScriptedCompletions(ConnectionError("down"), ConnectionError("down"), (0, 0)))
+        content, _ = asyncio.run(self.client.generate_response("hi", policy=CallPolicy(max_retries=2)))
+        self.assertEqual(content, api.reply)
+        self.assertEqual(api.models, ["primary", "primary", "backup"])
+
+    def test_slow_first_token_is_retried(self):
+        api = self.use(ScriptedCompletions((1.0, 0), (0, 0)))
+        policy = CallPolicy(ttft_timeout_s=0.1, timeout_s=5, max_retries=1, hedge_after_s=0)
+        start = time.perf_counter()
+        text = asyncio.run(collect(asyncio.run(self.client.generate_response("hi", stream=True, policy=policy))))
+        self.assertEqual(text, api.reply)
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual(len(api.models), 2)
+
+    def test_hedge_wins_over_slow_stream(self):
+        api = self.use(ScriptedCompletions((1.0, 0), (0, 0)))
+        policy = CallPolicy(ttft_timeout_s=5, timeout_s=5, max_retries=0, hedge_after_s=0.05)
+        won = metrics.counter("llm.hedge.won")
+
+        async def run():
+            stream = await self.client.generate_response("hi", stream=True, policy=policy)
+            return await collect(stream)
+
+        start = time.perf_counter()
+        self.assertEqual(asyncio.run(run()), api.reply)
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual(len(api.models), 2)
+        self.assertEqual(metrics.counter("llm.hedge.won"), won + 1)
+        self.assertEqual(LLMGateway().limiter.stats()["active"], 0)
+
+    def test_no_hedge_without_a_free_slot(self):
+        LLMGateway().limiter = PriorityLimiter(max_concurrency=1)
+        api = self.use(ScriptedCompletions((0.2, 0)))
+        policy = CallPolicy(ttft_timeout_s=5, timeout_s=5, max_retries=0, hedge_after_s=0.05)
+        asyncio.run(collect(asyncio.run(self.client.generate_response("hi", stream=True, policy=policy))))
+        self.assertEqual(len(api.models), 1)
+
+    def test_total_deadline_interrupts_stream(self):
+        self.use(ScriptedCompletions((0, 0.1)))
+        policy = CallPolicy(ttft_timeout_s=1, timeout_s=0.25, max_retries=0, hedge_after_s=0)
+        text = asyncio.run(collect(asyncio.run(self.client.generate_response("hi", stream=True, policy=policy))))
+        self.assertTrue(text.startswith("Seats"))
+        self.assertIn(INTERRUPTED_NOTICE, text)
+        self.assertTrue(is_error_response(text))
+
+    def test_open_circuits_fail_fast(self):
+        api = self.use(ScriptedCompletions(ConnectionError("down")))
+        for _ in range(2):
+            asyncio.run(self.client.generate_response("hi", policy=CallPolicy(max_retries=1)))
+        calls = len(api.models)
+        content, _ = asyncio.run(self.client.generate_response("hi"))
+        self.assertTrue(is_error_response(content))
+        self.assertEqual(len(api.models), calls)
+
+    def test_missing_model_falls_back_without_using_a_retry(self):
+        missing = openai.NotFoundError("model not found", body=None,
+                                       response=httpx.Response(404, request=httpx.Request("POST", "http://llm/v1")))
+        api = self.use(ScriptedCompletions(missing, (0, 0)))
+        content, _ = asyncio.run(self.client.generate_response("hi", policy=CallPolicy(max_retries=0)))
+        self.assertEqual(content, api.reply)
+        self.assertEqual(api.models, ["primary", "backup"])
+        self.assertEqual(LLMGateway().breakers.states()["primary"], "open")
+
+    def test_backoff_gives_the_slot_back(self):
+        LLMGateway().limiter = PriorityLimiter(max_concurrency=1)
+        self.use(ScriptedCompletions(ConnectionError("reset"), (0, 0)))
+
+        async def run():
+            call = asyncio.ensure_future(self.client.generate_response("hi", policy=CallPolicy(max_retries=1)))
+            await asyncio.sleep(0.05)  # the first attempt has failed and is backing off
+            await asyncio.wait_for(LLMGateway().limiter.acquire(), 0.1)
+            LLMGateway().limiter.release()
+            return await call
+
+        with mock.patch.object(llm_gateway, "backoff_delay", lambda attempt_no: 0.3):
+            content, _ = asyncio.run(run())
+        self.assertFalse(is_error_response(content))
+        self.assertEqual(LLMGateway().limiter.stats()["active"], 0)
+
+    def test_sync_path_retries_and_falls_back(self):
+        api = ScriptedSyncClient(ConnectionError("down"), ConnectionError("down"), (0, 0))
+        with mock.patch.object(LLMGateway(), "sync_client", lambda base_url, api_key: api):
+            content, _ = self.client.generate_response_sync("hi", policy=CallPolicy(timeout_s=5, max_retries=2))
+        self.assertEqual(content, api.reply)
+        self.assertEqual(api.models, ["primary", "primary", "backup"])
+        self.assertTrue(all(o["max_retries"] == 0 and o["timeout"] <= 5 for o in api.options))
+        self.assertEqual(LLMGateway().limiter.stats()["active"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
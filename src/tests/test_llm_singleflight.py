@@ -0,0 +1,208 @@
+
+import unittest
+import asyncio
+import json
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+from llm_gateway import ERROR_PREFIX
+from llm_singleflight import SingleFlight, singleflight
+from llm_fakes import IsolatedGateway, offline_client
+
+
+class FakeChatHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /v1/chat/completions: JSON or SSE, after a fixed delay."""
+    server_version = "FakeOpenAI/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        with self.server.lock:
+            self.server.requests.append(prompt)
+        time.sleep(self.server.delay_s)
+
+        if prompt.startswith("bad"):
+            self._send_json(400, {"error": {"message": "bad request", "type": "invalid_request_error"}})
+            return
+
+        words = f"Answer to {prompt}".split(" ")
+        if not body.get("stream"):
+            self._send_json(200, {
+                "id": "c1", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": " ".join(words)}}],
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        try:
+            for i, word in enumerate(words):
+                chunk = {"id": "c1", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                      "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(self.server.delay_s / 4)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client closed the stream early
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestSingleFlightAgainstServer(IsolatedGateway, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeChatHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.server.delay_s = 0.2
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    async def wait_for_request(self):
+        while not self.server.requests:
+            await asyncio.sleep(0.01)
+
+    def setUp(self):
+        super().setUp()
+        self.server.requests = []
+        self.client = offline_client("fake", coalesce=True,
+                                     base_url=f"http://127.0.0.1:{self.server.server_address[1]}/v1")
+
+    def test_identical_calls_share_one_request(self):
+        async def run():
+            return await asyncio.gather(*[self.client.generate_response("fees?") for _ in range(10)])
+
+        results = asyncio.run(run())
+        self.assertEqual({content for content, _ in results}, {"Answer to fees?"})
+        self.assertEqual(self.server.requests, ["fees?"])
+        self.assertEqual(singleflight.in_flight(), 0)
+
+    def test_different_prompts_are_not_coalesced(self):
+        async def run():
+            return await asyncio.gather(self.client.generate_response("a"), self.client.generate_response("b"))
+
+        asyncio.run(run())
+        self.assertEqual(sorted(self.server.requests), ["a", "b"])
+
+    def test_streams_fan_out_including_late_joiner(self):
+        async def consume(delay):
+            await asyncio.sleep(delay)
+            stream = await self.client.generate_response("rounds?", stream=True)
+            return "".join([token async for token, _ in stream])
+
+        async def run():
+            return await asyncio.gather(*[consume(0) for _ in range(5)], consume(0.3))
+
+        results = asyncio.run(run())
+        self.assertEqual(set(results), {"Answer to rounds?"})
+        self.assertEqual(self.server.requests, ["rounds?"])
+
+    def test_errors_fan_out(self):
+        async def run():
+            return await asyncio.gather(*[self.client.generate_response("bad prompt") for _ in range(3)])
+
+        results = asyncio.run(run())
+        self.assertTrue(all(content.startswith(ERROR_PREFIX) for content, _ in results))
+        self.assertEqual(self.server.requests, ["bad prompt"])
+
+    def test_cancelled_waiter_does_not_cancel_others(self):
+        async def run():
+            first = asyncio.ensure_future(self.client.generate_response("cutoff?"))
+            second = asyncio.ensure_future(self.client.generate_response("cutoff?"))
+            await self.wait_for_request()
+            first.cancel()
+            return await second
+
+        content, _ = asyncio.run(run())
+        self.assertEqual(content, "Answer to cutoff?")
+        self.assertEqual(self.server.requests, ["cutoff?"])
+
+    def test_abandoned_flight_is_cancelled_and_restarted(self):
+        async def run():
+            only = asyncio.ensure_future(self.client.generate_response("hostel?"))
+            await self.wait_for_request()
+            only.cancel()
+            await asyncio.sleep(0)
+            self.assertEqual(singleflight.in_flight(), 0)
+            return await self.client.generate_response("hostel?")
+
+        content, _ = asyncio.run(run())
+        self.assertEqual(content, "Answer to hostel?")
+        self.assertEqual(self.server.requests, ["hostel?", "hostel?"])
+
+
+class TestSingleFlightStreams(unittest.TestCase):
+    def test_mid_stream_error_reaches_every_subscriber(self):
+        flights = SingleFlight()
+
+        async def failing():
+            yield "partial"
+            await asyncio.sleep(0.01)
+            raise ConnectionResetError("upstream closed")
+
+        async def consume():
+            seen = []
+            try:
+                async for item in flights.stream("k", failing):
+                    seen.append(item)
+            except ConnectionResetError:
+                seen.append("error")
+            return seen
+
+        async def run():
+            return await asyncio.gather(consume(), consume())
+
+        self.assertEqual(asyncio.run(run()), [["partial", "error"], ["partial", "error"]])
+        self.assertEqual(flights.in_flight(), 0)
+
+    def test_last_subscriber_leaving_cancels_producer(self):
+        flights = SingleFlight()
+        closed = []
+
+        async def endless():
+            try:
+                while True:
+                    yield "token"
+                    await asyncio.sleep(0.001)
+            finally:
+                closed.append(True)
+
+        async def run():
+            stream = flights.stream("k", endless)
+            async for _ in stream:
+                break
+            await stream.aclose()
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+        self.assertEqual(closed, [True])
+        self.assertEqual(flights.in_flight(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
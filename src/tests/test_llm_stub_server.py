@@ -0,0 +1,85 @@
+
+import unittest
+import asyncio
+import json
+import random
+import sys
+import os
+import time
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.dirname(__file__))
+
+from ai.prompts import INTENT_ROUTER_PROMPT
+from llm_gateway import INTERRUPTED_NOTICE, is_error_response
+from llm_fakes import IsolatedGateway, offline_client
+from llm_stub_server import Latency, StubServer
+
+
+async def collect(stream):
+    return "".join([token async for token, _ in stream])
+
+
+class TestLatency(unittest.TestCase):
+    def test_samples_match_median_and_p95(self):
+        rng = random.Random(7)
+        samples = sorted(Latency(0.8, 2.0).sample(rng) for _ in range(4000))
+        self.assertAlmostEqual(samples[2000], 0.8, delta=0.08)
+        self.assertAlmostEqual(samples[3800], 2.0, delta=0.25)
+        self.assertAlmostEqual(Latency.parse_ms("30").sample(rng), 0.03)
+
+
+class TestStubServer(IsolatedGateway, unittest.TestCase):
+    def client(self, server):
+        return offline_client("stub-model", base_url=server.base_url, api_key="stub")
+
+    def test_streamed_and_whole_answers(self):
+        with StubServer(profile="instant", tokens=40, seed=1) as server:
+            client = self.client(server)
+            whole, _ = asyncio.run(client.generate_response("Which rounds are there?"))
+            streamed = asyncio.run(collect(asyncio.run(client.generate_response("Which rounds?", stream=True))))
+        self.assertEqual(len(whole.split()), 40)
+        self.assertEqual(len(streamed.split()), 40)
+        self.assertEqual(server.stats["streamed"], 1)
+        self.assertEqual(server.stats["tokens"], 80)
+
+    def test_router_gets_json_and_rules_override_prose(self):
+        rules = {"Map an engineering branch": "Core paths: design, testing."}
+        with StubServer(profile="instant", responses=rules) as server:
+            client = self.client(server)
+            routed, _ = asyncio.run(client.generate_response("### User Query:\nwhat about 185.5\n\nAnalyze the query",
+                                                             system_prompt=INTENT_ROUTER_PROMPT))
+            career, _ = asyncio.run(client.generate_response("CSE", system_prompt="Map an engineering branch to:"))
+        self.assertEqual(json.loads(routed), {"intent": "RANK_PREDICTION", "entities": {"mark": 185.5},
+                                              "is_off_topic": False})
+        self.assertEqual(career, "Core paths: design, testing.")
+
+    def test_time_to_first_token(self):
+        with StubServer(ttft=Latency(0.2), itl=Latency(0), tokens=5) as server:
+            client = self.client(server)
+
+            async def ttft():
+                start = time.perf_counter()
+                stream = await client.generate_response("hi", stream=True)
+                await stream.__anext__()
+                elapsed = time.perf_counter() - start
+                await stream.aclose()
+                return elapsed
+
+            self.assertGreater(asyncio.run(ttft()), 0.18)
+
+    def test_injected_errors_and_aborts(self):
+        with StubServer(profile="instant", error_rate=1.0, error_statuses=(400,)) as server:
+            content, _ = asyncio.run(self.client(server).generate_response("hi"))
+        self.assertTrue(is_error_response(content))
+        self.assertEqual(server.stats["errors"], 1)
+
+        with StubServer(profile="instant", abort_rate=1.0, tokens=50, seed=3) as server:
+            streamed = asyncio.run(collect(asyncio.run(self.client(server).generate_response("hi", stream=True))))
+        self.assertIn(INTERRUPTED_NOTICE, streamed)
+        self.assertEqual(server.stats["aborted"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
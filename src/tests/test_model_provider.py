@@ -0,0 +1,94 @@
+
+import unittest
+import sys
+import os
+import threading
+import time
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ai.model_provider as model_provider
+from ai.model_provider import EmbeddingModelProvider
+
+
+class FakeBackend:
+    instances = 0
+
+    @staticmethod
+    def is_installed():
+        return True
+
+    @staticmethod
+    def cache_namespace_for(model_name):
+        return f"{model_name}+fake"
+
+    def __init__(self, model_name):
+        FakeBackend.instances += 1
+        time.sleep(0.05)  # widen the race window
+
+    def encode(self, texts):
+        return np.ones((len(texts), 4), dtype=np.float32) / 2.0
+
+
+class TestEmbeddingModelProvider(unittest.TestCase):
+    def setUp(self):
+        self._orig = (model_provider.get_backend_class, model_provider.create_backend)
+        model_provider.get_backend_class = lambda name=None: FakeBackend
+        model_provider.create_backend = lambda model_name, name=None: FakeBackend(model_name)
+        FakeBackend.instances = 0
+        EmbeddingModelProvider._instance = None
+
+    def tearDown(self):
+        model_provider.get_backend_class, model_provider.create_backend = self._orig
+        EmbeddingModelProvider._instance = None
+
+    def test_lazy_singleton(self):
+        provider = EmbeddingModelProvider()
+        self.assertIs(provider, EmbeddingModelProvider())
+        self.assertFalse(provider.loaded)
+        self.assertTrue(provider.cache_namespace.endswith("+fake"))
+        self.assertEqual(FakeBackend.instances, 0)
+
+        vectors = provider.encode(["CEG"])
+        self.assertEqual(vectors.shape, (1, 4))
+        self.assertTrue(provider.loaded)
+        self.assertIsNotNone(provider.stats()["load_time_s"])
+
+    def test_concurrent_first_use_loads_once(self):
+        provider = EmbeddingModelProvider()
+        threads = [threading.Thread(target=provider.encode, args=(["PSG"],)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(FakeBackend.instances, 1)
+
+    def test_failed_load_is_retried_after_a_while(self):
+        attempts = []
+
+        def flaky(model_name, name=None):
+            attempts.append(model_name)
+            if len(attempts) == 1:
+                raise OSError("download interrupted")
+            return FakeBackend(model_name)
+
+        model_provider.create_backend = flaky
+        provider = EmbeddingModelProvider()
+        with self.assertRaises(OSError):
+            provider.encode(["CEG"])
+        self.assertFalse(provider.available)
+        with self.assertRaises(RuntimeError):  # within RETRY_AFTER_S: no second attempt
+            provider.encode(["CEG"])
+        self.assertEqual(len(attempts), 1)
+
+        provider._retry_at = time.monotonic()
+        self.assertTrue(provider.available)
+        self.assertEqual(provider.encode(["CEG"]).shape, (1, 4))
+        self.assertEqual(len(attempts), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
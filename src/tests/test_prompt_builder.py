@@ -0,0 +1,91 @@
+
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.prompt_builder import PromptBuilder, compact_row, group_by_college, verbose_rows
+from utils.tokens import estimate_tokens
+
+
+def entry(code, name, branch, cutoff, district="CHENNAI", placement="90%", seats=60):
+    return {'code': code, 'name': name, 'district': district, 'branch_name': branch, 'cutoff_mark': cutoff,
+            'placement': placement, 'total_seats': seats}
+
+
+def colleges(prefix, n, cutoff=180.0):
+    return group_by_college([
+        entry(f"{prefix}{i}", f"{prefix} College {i}, Some Road, Madurai 625 001", branch, cutoff - i, district="MADURAI")
+        for i in range(n) for branch in ("COMPUTER SCIENCE AND ENGINEERING", "MECHANICAL ENGINEERING")
+    ])
+
+
+class TestTokenEstimate(unittest.TestCase):
+    def test_counts_words_numbers_and_symbols(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("Cutoff: 198.5"), 5)  # word, ':', '198', '.', '5'
+        self.assertGreater(estimate_tokens("ELECTRONICS AND COMMUNICATION"), 3)
+
+
+class TestCompactRows(unittest.TestCase):
+    def test_one_line_per_college(self):
+        group = [entry(1, "PSG College of Technology, Coimbatore 641 004", "CSE", 198.5, district="COIMBATORE"),
+                 entry(1, "PSG College of Technology, Coimbatore 641 004", "ECE", 197.0, district="COIMBATORE")]
+        row = compact_row(group)
+        # PIN code dropped, district already in the name, placement kept
+        self.assertEqual(row, "- PSG College of Technology, Coimbatore [90%]: CSE 198.5 (60), ECE 197 (60)")
+        self.assertLess(estimate_tokens(row), estimate_tokens(verbose_rows(group)))
+
+    def test_repeat_mentions_are_bare(self):
+        seen = set()
+        group = [entry(7, "Alpha Institute", "IT", 181.0, placement="No_Data", seats=None)]
+        self.assertEqual(compact_row(group, seen), "- Alpha Institute [CHENNAI]: IT 181")
+        self.assertEqual(compact_row(group, seen), "- Alpha Institute: IT 181")
+
+
+class TestPromptBuilder(unittest.TestCase):
+    def build(self, budget):
+        builder = PromptBuilder(budget, name="test")
+        builder.add_text("HEADER")
+        builder.add_colleges(colleges("Safe", 10), priority=2)
+        builder.add_colleges(colleges("Moderate", 10), priority=1)
+        builder.add_colleges(colleges("Ambitious", 10), priority=3)
+        builder.add_text("OPTIONAL TIPS " * 20, priority=4)
+        builder.add_text("FOOTER")
+        return builder, builder.build()
+
+    def test_no_budget_keeps_everything(self):
+        builder, prompt = self.build(None)
+        self.assertIn("Ambitious College 9", prompt)
+        self.assertIn("OPTIONAL TIPS", prompt)
+        self.assertEqual(builder.stats["colleges_trimmed"], 0)
+        self.assertGreater(builder.stats["saved_ratio"], 0.3)
+
+    def test_trims_in_priority_order(self):
+        full, prompt = self.build(None)
+        builder, prompt = self.build(full.stats["tokens"] // 2)
+        self.assertLessEqual(builder.stats["tokens"], full.stats["tokens"] // 2)
+        self.assertNotIn("OPTIONAL TIPS", prompt)
+        self.assertNotIn("Ambitious College 9", prompt)
+        # Most relevant rows of the most important section survive, and so does required text
+        self.assertIn("Moderate College 0", prompt)
+        self.assertIn("HEADER", prompt)
+        self.assertIn("FOOTER", prompt)
+
+    def test_required_text_is_never_dropped(self):
+        builder, prompt = self.build(10)
+        self.assertEqual(prompt.count("None found."), 3)
+        self.assertTrue(prompt.startswith("HEADER") and prompt.endswith("FOOTER"))
+        self.assertEqual(builder.stats["colleges_trimmed"], 30)
+
+    def test_baseline_data(self):
+        builder = PromptBuilder(name="test", baseline_data="| # | College | Branch |\n" * 50)
+        builder.add_colleges(colleges("Safe", 2))
+        builder.build()
+        self.assertEqual(builder.stats["baseline_tokens"], estimate_tokens("| # | College | Branch |\n" * 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.embedding_cache import QueryEmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def test_normalized_text_hits(self):
+        cache = QueryEmbeddingCache(max_entries=10)
+        encoder = CountingEncoder()
+        cache.get_or_encode(["CEG"], encoder, namespace="m")
+        cache.get_or_encode(["  ceg "], encoder, namespace="m")
+        self.assertEqual(len(encoder.calls), 1)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+    def test_batch_encodes_only_misses_once(self):
+        cache = QueryEmbeddingCache(max_entries=10)
+        encoder = CountingEncoder()
+        cache.get_or_encode(["PSG"], encoder, namespace="m")
+        result = cache.get_or_encode(["PSG", "SSN", "ssn"], encoder, namespace="m")
+        self.assertEqual(encoder.calls[-1], ["ssn"])
+        self.assertEqual(result.shape, (3, 2))
+        np.testing.assert_array_equal(result[1], result[2])
+
+    def test_namespace_separates_models(self):
+        cache = QueryEmbeddingCache(max_entries=10)
+        encoder = CountingEncoder()
+        cache.get_or_encode(["CEG"], encoder, namespace="a")
+        cache.get_or_encode(["CEG"], encoder, namespace="b")
+        self.assertEqual(len(encoder.calls), 2)
+
+    def test_lru_eviction(self):
+        cache = QueryEmbeddingCache(max_entries=2)
+        encoder = CountingEncoder()
+        cache.get_or_encode(["a"], encoder, namespace="m")
+        cache.get_or_encode(["b"], encoder, namespace="m")
+        cache.get_or_encode(["a"], encoder, namespace="m")  # refresh "a"
+        cache.get_or_encode(["c"], encoder, namespace="m")  # evicts "b"
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.get_or_encode(["a"], encoder, namespace="m")
+        self.assertEqual(len(encoder.calls), 3)
+        cache.get_or_encode(["b"], encoder, namespace="m")
+        self.assertEqual(len(encoder.calls), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
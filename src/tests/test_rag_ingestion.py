@@ -0,0 +1,125 @@
+
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ai.model_provider as model_provider
+from ai.model_provider import EmbeddingModelProvider
+from ai.rag_engine import GuidelineRAG, chunk_guidelines, chunk_id
+from config import config
+
+GUIDELINES = """# Registration
+Candidates must register online at the TNEA portal. The registration fee is Rs. 500 for general candidates.
+SC, SCA and ST candidates from Tamil Nadu pay Rs. 250.
+
+**Documents Required:**
+- Class 10 and 12 mark sheets.
+- Community certificate issued by the competent authority.
+- Nativity certificate where applicable, and the first graduate declaration if claimed.
+
+### Counselling Rounds
+Counselling is conducted online in multiple rounds. Candidates choose colleges and branches in order of preference.
+Seats not confirmed within the deadline are released to the next round. Tentative allotments must be confirmed.
+"""
+
+
+class CountingBackend:
+    texts = []
+
+    @staticmethod
+    def is_installed():
+        return True
+
+    @staticmethod
+    def cache_namespace_for(model_name):
+        return f"{model_name}+counting"
+
+    def __init__(self, model_name):
+        pass
+
+    def encode(self, texts):
+        CountingBackend.texts.extend(texts)
+        rng = np.random.default_rng(len(CountingBackend.texts))
+        vectors = rng.standard_normal((len(texts), 8)).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestChunking(unittest.TestCase):
+    def test_sections_and_ids(self):
+        chunks = chunk_guidelines(GUIDELINES, max_chars=400, min_chars=20)
+        self.assertEqual([c["heading"] for c in chunks], ["Registration", "Documents Required", "Counselling Rounds"])
+        self.assertTrue(chunks[1]["text"].startswith("Documents Required\n"))
+        self.assertEqual(chunks[0]["id"], chunk_id(chunks[0]["text"]))
+
+    def test_long_sections_split_on_sentences(self):
+        text = "# Rules\n" + " ".join(f"Rule number {i} applies to every candidate." for i in range(40))
+        chunks = chunk_guidelines(text, max_chars=300, min_chars=20)
+        self.assertGreater(len(chunks), 1)
+        for c in chunks:
+            self.assertLessEqual(len(c["text"]), 300)
+            self.assertTrue(c["text"].rstrip().endswith("."))
+
+
+class TestIncrementalIngestion(unittest.TestCase):
+    backend = "numpy"
+
+    def setUp(self):
+        self._orig_backend = config.RAG_BACKEND
+        config.RAG_BACKEND = self.backend
+        self._orig = (model_provider.get_backend_class, model_provider.create_backend)
+        model_provider.get_backend_class = lambda name=None: CountingBackend
+        model_provider.create_backend = lambda model_name, name=None: CountingBackend(model_name)
+        EmbeddingModelProvider._instance = None
+        CountingBackend.texts = []
+
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, "docs"))
+        self.write(GUIDELINES)
+
+    def tearDown(self):
+        config.RAG_BACKEND = self._orig_backend
+        model_provider.get_backend_class, model_provider.create_backend = self._orig
+        EmbeddingModelProvider._instance = None
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(os.path.join(self.tmp.name, "docs", "tnea_guidelines.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_noop_then_incremental(self):
+        rag = GuidelineRAG(data_dir=self.tmp.name)
+        initial = rag.collection.count()
+        self.assertGreater(initial, 0)
+        self.assertEqual(len(CountingBackend.texts), initial)
+
+        # Unchanged file: nothing is chunked, embedded or written
+        CountingBackend.texts = []
+        self.assertEqual(rag.sync_guidelines(), {"added": 0, "removed": 0, "unchanged": initial})
+        self.assertEqual(CountingBackend.texts, [])
+
+        # One section edited: only that chunk is replaced
+        self.write(GUIDELINES.replace("Rs. 500", "Rs. 600"))
+        result = rag.sync_guidelines()
+        self.assertEqual((result["added"], result["removed"]), (1, 1))
+        self.assertEqual(len(CountingBackend.texts), 1)
+        self.assertIn("Rs. 600", CountingBackend.texts[0])
+        self.assertEqual(rag.collection.count(), initial)
+
+        # A fresh instance (new process) sees the same state and does nothing
+        CountingBackend.texts = []
+        self.assertEqual(GuidelineRAG(data_dir=self.tmp.name).collection.count(), initial)
+        self.assertEqual(CountingBackend.texts, [])
+
+
+class TestIncrementalIngestionChroma(TestIncrementalIngestion):
+    backend = "chroma"
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+
+import unittest
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from web.render_buffer import CURSOR, RenderBuffer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Placeholder:
+    def __init__(self, created):
+        self.calls = []
+        created.append(self)
+
+    def markdown(self, text):
+        self.calls.append(text)
+
+
+class TestRenderBuffer(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.placeholders = []
+        self.buffer = RenderBuffer(lambda: Placeholder(self.placeholders), interval_s=0.05, max_chars=100,
+                                   clock=self.clock)
+
+    def feed(self, chunks, step_s=0.01):
+        for chunk in chunks:
+            self.clock.now += step_s
+            self.buffer.append(chunk)
+
+    def test_coalesces_within_the_frame_budget(self):
+        self.feed(["a"] * 50, step_s=0.01)  # 0.5 s of tokens
+        renders = self.buffer.renders
+        self.assertLessEqual(renders, 11)
+        self.assertEqual(self.buffer.finish(), "a" * 50)
+        self.assertEqual(self.placeholders[-1].calls[-1], "a" * 50)
+
+    def test_large_pending_text_renders_early(self):
+        self.buffer.append("x")
+        self.assertFalse(self.buffer.append("y" * 50))
+        self.assertTrue(self.buffer.append("z" * 60))
+
+    def test_finished_paragraphs_are_sealed(self):
+        self.feed(["First paragraph.", "\n\n", "Second", " one"], step_s=0.1)
+        self.buffer.finish()
+        self.assertEqual(len(self.placeholders), 2)
+        self.assertEqual(self.placeholders[0].calls[-1], "First paragraph.\n\n")
+        self.assertEqual(self.placeholders[1].calls[-1], "Second one")
+        self.assertTrue(all(CURSOR not in p.calls[-1] for p in self.placeholders))
+        self.assertEqual(self.buffer.text, "First paragraph.\n\nSecond one")
+
+    def test_code_fences_are_not_split(self):
+        self.feed(["```\ncode\n\nmore code", "\n```\n\nafter"], step_s=0.1)
+        self.buffer.finish()
+        self.assertEqual(self.placeholders[0].calls[-1], "```\ncode\n\nmore code\n```\n\n")
+
+    def test_heartbeat_touches_the_page_before_any_text(self):
+        self.buffer.heartbeat()
+        self.assertEqual(self.placeholders[0].calls, [CURSOR])
+        self.buffer.finish()
+        self.assertEqual(self.placeholders[0].calls[-1], "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+
+import unittest
+import asyncio
+import sys
+import os
+import time
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.counsellor_agent import CounsellorAgent, DISCLAIMER
+from ai.reasoning_engine import ReasoningEngine
+from ai.template_responder import TemplateResponder
+from config import config
+from llm_gateway import ERROR_PREFIX
+from utils.metrics import metrics
+
+# Wording tests/test_cases.json rules out for prediction answers
+FORBIDDEN = ["guaranteed", "surely", "definitely", "will get"]
+
+
+class FakeRouter:
+    def __init__(self, intent, entities):
+        self.result = (intent, entities)
+
+    async def route_query_async(self, user_query, history=None, user_profile=None):
+        return self.result
+
+
+class FakePredictor:
+    def predict_percentile(self, mark):
+        return {"prediction": 96.4, "lower": 95.1, "upper": 97.3}
+
+    def predict_rank(self, percentile):
+        return 6120
+
+    def predict_total_students(self):
+        return 170000
+
+
+class FakeTrends:
+    def analyze_branch_trend(self, branch):
+        return f"📊 **Trend Analysis: {branch}** (2022-2024)\n| Year | Avg Cutoff (OC) |"
+
+    def get_rising_branches(self):
+        return "Trend data unavailable."
+
+
+class FakeMemory:
+    def __init__(self):
+        self.history = []
+        self.user_profile = {"mark": None, "percentile": None, "rank": None}
+
+    def add_message(self, role, content):
+        self.history.append({"role": role, "content": content})
+
+    def update_profile(self, key, value):
+        self.user_profile[key] = value
+
+
+class StreamingLLM:
+    """
+    Streams `reply` word by word (or as the given list of chunks) after `first_delay_s`;
+    records when each request went out.
+    """
+
+    def __init__(self, reply="Elaborated advice.", first_delay_s=0.0):
+        self.reply = reply
+        self.first_delay_s = first_delay_s
+        self.started = []
+
+    async def generate_response(self, prompt, system_prompt=None, stream=False, profile=None, **kwargs):
+        async def tokens():
+            self.started.append(time.perf_counter())
+            await asyncio.sleep(self.first_delay_s)
+            for chunk in self.reply if isinstance(self.reply, list) else [w + " " for w in self.reply.split(" ")]:
+                yield chunk, []
+        return tokens()
+
+
+def make_agent(intent, entities, llm=None):
+    agent = CounsellorAgent.__new__(CounsellorAgent)
+    agent.intent_router = FakeRouter(intent, entities)
+    agent.predictor = FakePredictor()
+    agent.trend_analysis = FakeTrends()
+    agent.reasoning = ReasoningEngine()
+    agent.templates = TemplateResponder()
+    agent.memory = FakeMemory()
+    agent.llm = llm or StreamingLLM()
+    return agent
+
+
+def run(agent, query):
+    async def consume():
+        return [chunk async for chunk in agent.process_query_stream(query)]
+    return asyncio.run(consume())
+
+
+class TestTemplates(unittest.TestCase):
+    def setUp(self):
+        self.templates = TemplateResponder()
+
+    def test_prediction_is_probabilistic(self):
+        text = self.templates.prediction(195.0, 96.4, 6120, 170000, 95.1, 97.3)
+        for expected in ("195", "96.4", "95.1", "97.3", "6120", "170000"):
+            self.assertIn(expected, text)
+        self.assertFalse([w for w in FORBIDDEN if w in text.lower()])
+        self.assertIn("likely", text.lower())
+
+    def test_low_percentile_is_honest(self):
+        text = self.templates.prediction(90.0, 22.0, 130000, 170000)
+        self.assertIn("management quota", text)
+        self.assertNotIn("Tier 1", text)
+
+    def test_greeting_echoes_salutation_and_remembered_mark(self):
+        self.assertTrue(self.templates.greeting("vanakkam").startswith("Vanakkam!"))
+        text = self.templates.greeting("hi", {"mark": 187.5, "rank": 21000})
+        self.assertIn("187.5", text)
+        self.assertIn("21000", text)
+
+    def test_repeated_greetings_vary(self):
+        first = self.templates.greeting("hello", history=[{"role": "user", "content": "hello"}])
+        second = self.templates.greeting("hello", history=[{}, {}, {"role": "user", "content": "hello"}])
+        self.assertNotEqual(first, second)
+
+    def test_trend_data_detection(self):
+        self.assertTrue(self.templates.has_trend_data("📊 **Trend Analysis: CSE**"))
+        self.assertFalse(self.templates.has_trend_data("No historical cutoff data available for branch 'XYZ'."))
+        self.assertFalse(self.templates.has_trend_data("Trend data unavailable."))
+
+
+class TestAgentFastPath(unittest.TestCase):
+    def setUp(self):
+        self._elaborate = config.TEMPLATE_ELABORATE_INTENTS
+        self._templated = config.TEMPLATE_INTENTS
+
+    def tearDown(self):
+        config.TEMPLATE_ELABORATE_INTENTS = self._elaborate
+        config.TEMPLATE_INTENTS = self._templated
+
+    def test_pure_number_needs_no_llm(self):
+        config.TEMPLATE_ELABORATE_INTENTS = []
+        hits = metrics.counter("template.hits.PREDICT_PERCENTILE")
+        agent = make_agent("PREDICT_PERCENTILE", {"mark": 195.0})
+        chunks = run(agent, "195")
+        self.assertEqual(agent.llm.started, [])
+        self.assertIn("6120", chunks[0])
+        self.assertEqual(chunks[-1], DISCLAIMER)
+        self.assertEqual(agent.memory.history[-1], {"role": "assistant", "content": chunks[0]})
+        self.assertEqual(agent.memory.user_profile["rank"], 6120)
+        self.assertEqual(metrics.counter("template.hits.PREDICT_PERCENTILE"), hits + 1)
+
+    def test_prediction_with_a_branch_goes_to_the_llm(self):
+        agent = make_agent("PREDICT_PERCENTILE", {"mark": 195.0, "branch": "CSE"})
+        chunks = run(agent, "195 for CSE, what are my chances?")
+        self.assertEqual(len(agent.llm.started), 1)
+        self.assertIn("Elaborated", "".join(chunks))
+
+    def test_disabled_intent_uses_llm(self):
+        config.TEMPLATE_INTENTS = []
+        agent = make_agent("GREETING", {})
+        run(agent, "hello")
+        self.assertEqual(len(agent.llm.started), 1)
+
+    def test_missing_trend_data_goes_to_the_llm(self):
+        agent = make_agent("TREND_ANALYSIS", {})
+        run(agent, "which branches are trending?")
+        self.assertEqual(len(agent.llm.started), 1)
+
+    def test_elaboration_starts_before_template_is_consumed(self):
+        config.TEMPLATE_ELABORATE_INTENTS = ["TREND_ANALYSIS"]
+        agent = make_agent("TREND_ANALYSIS", {"branch": "CSE"}, llm=StreamingLLM(first_delay_s=0.2))
+
+        async def consume():
+            chunks = []
+            stream = agent.process_query_stream("CSE trend")
+            async for chunk in stream:
+                chunks.append(chunk)
+                if len(chunks) == 2:  # the template: give the UI time to render it
+                    shown_at = time.perf_counter()
+                    await asyncio.sleep(0.2)
+            return chunks, shown_at
+
+        start = time.perf_counter()
+        chunks, shown_at = asyncio.run(consume())
+        self.assertLess(agent.llm.started[0], shown_at)
+        self.assertLess(time.perf_counter() - start, 0.35)  # model latency hidden behind the render
+        text = "".join(chunks)
+        self.assertLess(text.index("demand for CSE"), text.index("Elaborated"))
+        self.assertIn("Elaborated", agent.memory.history[-1]["content"])
+
+    def test_failed_elaboration_keeps_template_only(self):
+        config.TEMPLATE_ELABORATE_INTENTS = ["GREETING"]
+        agent = make_agent("GREETING", {}, llm=StreamingLLM(reply=[f"{ERROR_PREFIX}: upstream down"]))
+        chunks = run(agent, "hi")
+        self.assertEqual(len(chunks), 2)
+        self.assertNotIn(ERROR_PREFIX, agent.memory.history[-1]["content"])
+
+    def test_abandoned_stream_closes_elaboration(self):
+        config.TEMPLATE_ELABORATE_INTENTS = ["GREETING"]
+        agent = make_agent("GREETING", {}, llm=StreamingLLM(first_delay_s=5))
+
+        async def first_chunk_only():
+            stream = agent.process_query_stream("hello")
+            chunk = await stream.__anext__()
+            start = time.perf_counter()
+            await stream.aclose()
+            return chunk, time.perf_counter() - start
+
+        chunk, close_s = asyncio.run(first_chunk_only())
+        self.assertTrue(chunk.startswith("Hello!"))
+        self.assertLess(close_s, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+
+import unittest
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ai.vector_stores import NumpyVectorStore, create_vector_store
+
+
+def unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestNumpyVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.vectors = unit_vectors(20)
+        self.ids = [f"c{i}" for i in range(20)]
+        self.docs = [f"document {i}" for i in range(20)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def populate(self, store):
+        store.add(self.ids, self.docs, [{"n": i} for i in range(20)], self.vectors)
+
+    def test_query_exact_top_k(self):
+        store = NumpyVectorStore(self.tmp.name, "guides")
+        self.populate(store)
+        results = store.query(self.vectors[7], n_results=3)
+        self.assertEqual(results[0]["id"], "c7")
+        self.assertAlmostEqual(results[0]["score"], 1.0, places=5)
+        expected = np.argsort(-(self.vectors @ self.vectors[7]))[:3]
+        self.assertEqual([r["id"] for r in results], [f"c{i}" for i in expected])
+        self.assertEqual(results[0]["metadata"], {"n": 7})
+
+    def test_persist_and_delete(self):
+        store = NumpyVectorStore(self.tmp.name, "guides")
+        self.populate(store)
+        store.delete(["c7", "missing"])
+
+        reopened = NumpyVectorStore(self.tmp.name, "guides")
+        self.assertEqual(reopened.count(), 19)
+        self.assertNotIn("c7", reopened.ids())
+        self.assertNotEqual(reopened.query(self.vectors[7], n_results=1)[0]["id"], "c7")
+
+    def test_empty_store(self):
+        self.assertEqual(NumpyVectorStore(self.tmp.name, "guides").query(self.vectors[0], 3), [])
+
+    def test_matches_chroma_ranking(self):
+        numpy_store = create_vector_store(self.tmp.name, "guides", "numpy")
+        chroma_store = create_vector_store(self.tmp.name, "guides", "chroma")
+        self.populate(numpy_store)
+        self.populate(chroma_store)
+        for q in unit_vectors(5, seed=1):
+            a = numpy_store.query(q, 5)
+            b = chroma_store.query(q, 5)
+            self.assertEqual([r["id"] for r in a], [r["id"] for r in b])
+            np.testing.assert_allclose([r["score"] for r in a], [r["score"] for r in b], atol=1e-4)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_vector_store(self.tmp.name, "guides", "faiss")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import concurrent.futures
+import logging
+import queue
+import threading
+from typing import AsyncIterable, Awaitable, Optional, TypeVar
+
+from utils.metrics import metrics
+
+logger = logging.getLogger("tnea_ai.async_bridge")
+
+T = TypeVar("T")
+
+_ITEM, _END, _ERROR = range(3)
+
+
+class BridgedStream:
+    """
+    Blocking view of an async iterable that runs on the bridge loop. Iterating yields its
+    items; with `heartbeat_s`, also yields None whenever nothing arrived for that long, so
+    the Streamlit script thread can touch the page (which is where it notices reruns).
+    close() cancels the producer and waits for its cleanup (stream closes, memory writes).
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, aiterable: AsyncIterable, heartbeat_s: float = None):
+        self._loop = loop
+        self._heartbeat_s = heartbeat_s
+        self._queue: "queue.Queue" = queue.Queue()
+        self._finished = threading.Event()
+        self._done = False
+        self._task: Optional[asyncio.Task] = None
+
+        def start():
+            self._task = loop.create_task(self._pump(aiterable))
+            self._task.add_done_callback(lambda _: self._finished.set())
+
+        loop.call_soon_threadsafe(start)
+
+    async def _pump(self, aiterable: AsyncIterable):
+        try:
+            try:
+                async for item in aiterable:
+                    self._queue.put((_ITEM, item))
+            finally:
+                aclose = getattr(aiterable, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        except Exception as e:
+            self._queue.put((_ERROR, e))
+        else:
+            self._queue.put((_END, None))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        try:
+            kind, value = self._queue.get(timeout=self._heartbeat_s)
+        except queue.Empty:
+            return None
+        if kind == _ITEM:
+            return value
+        self._done = True
+        if kind == _ERROR:
+            raise value
+        raise StopIteration
+
+    def close(self, timeout: float = 5.0) -> bool:
+        """Stops the producer; False if its cleanup did not finish within `timeout`."""
+        self._done = True
+        if not self._finished.is_set():
+            # Runs after start() (call_soon_threadsafe is FIFO), so the task exists
+            self._loop.call_soon_threadsafe(lambda: self._task.cancel())
+        return self._finished.wait(timeout)
+
+
+class AsyncBridge:
+    """
+    Process-wide event loop on a daemon thread, for synchronous front ends (Streamlit runs
+    each script in its own thread, and asyncio.run per message would create and tear down a
+    loop every time, stranding the per-loop LLM HTTP pools in LLMGateway).
+
+    Every agent coroutine and stream runs on this one loop, so the gateway keeps one
+    keep-alive pool per endpoint across turns and sessions, and identical requests from
+    different sessions coalesce. Work submitted here must not block the loop; agents push
+    database and embedding work to threads (asyncio.to_thread).
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncBridge, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(started,), name="tnea-async-loop", daemon=True)
+        self._thread.start()
+        started.wait()
+        logger.info("Background event loop started")
+        self._initialized = True
+
+    def _run(self, started: threading.Event):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(started.set)
+        self.loop.run_forever()
+
+    def _check_caller(self):
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("AsyncBridge called from its own loop; await the coroutine instead")
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """Schedules `coro` on the bridge loop from any thread."""
+        metrics.incr("async_bridge.submitted")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: float = None) -> T:
+        """Runs `coro` on the bridge loop and blocks the calling thread for its result."""
+        self._check_caller()
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stream(self, aiterable: AsyncIterable, heartbeat_s: float = None) -> BridgedStream:
+        """Consumes `aiterable` on the bridge loop; iterate the result from any thread."""
+        self._check_caller()
+        metrics.incr("async_bridge.streams")
+        return BridgedStream(self.loop, aiterable, heartbeat_s)
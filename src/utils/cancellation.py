@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from typing import Awaitable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class OperationCancelled(Exception):
+    """Raised by work whose CancellationToken was cancelled."""
+
+
+class CancellationToken:
+    """
+    One turn's cancel flag, passed from the UI through the agent into LLMClient.
+
+    cancel() may be called from any thread (the Streamlit script thread while the agent runs
+    on an event loop); coroutines awaiting wait() or run() on any loop are woken through
+    call_soon_threadsafe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self.reason = None
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Returns False if the token was already cancelled."""
+        with self._lock:
+            if self._cancelled:
+                return False
+            self._cancelled = True
+            self.reason = reason
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+            except RuntimeError:  # that loop is already closed
+                pass
+        return True
+
+    def raise_if_cancelled(self):
+        if self._cancelled:
+            raise OperationCancelled(self.reason)
+
+    async def wait(self):
+        """Returns once the token is cancelled."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._cancelled:
+                return
+            self._waiters.append((loop, future))
+        try:
+            await future
+        finally:
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """
+        Awaits `awaitable` unless the token fires first, in which case it is cancelled (and
+        its cancellation awaited) and OperationCancelled is raised.
+        """
+        self.raise_if_cancelled()
+        task = asyncio.ensure_future(awaitable)
+        waiter = asyncio.ensure_future(self.wait())
+        try:
+            await asyncio.wait((task, waiter), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if task.cancelled() and self._cancelled:
+            raise OperationCancelled(self.reason)
+        return task.result()
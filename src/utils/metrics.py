@@ -0,0 +1,67 @@
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Iterable
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and timing samples for performance reporting.
+    Samples are kept in bounded windows so long-running workers stay flat in memory.
+    """
+
+    def __init__(self, max_samples: int = 2000):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._samples: Dict[str, deque] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, value: float):
+        """Records one sample (e.g. a latency in seconds)."""
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self._max_samples)
+            self._samples[name].append(value)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def ratio(self, numerator: str, denominator_parts: Iterable[str]) -> float:
+        """e.g. ratio("cache.hits", ["cache.hits", "cache.misses"]) -> hit rate."""
+        with self._lock:
+            total = sum(self._counters.get(n, 0) for n in denominator_parts)
+            return self._counters.get(numerator, 0) / total if total else 0.0
+
+    def summary(self, name: str, percentiles=(50, 90, 95, 99)) -> Dict[str, float]:
+        """Count, mean and percentiles for a sample series."""
+        with self._lock:
+            values = sorted(self._samples.get(name, ()))
+        if not values:
+            return {"count": 0}
+        result = {"count": len(values), "mean": sum(values) / len(values), "max": values[-1]}
+        for p in percentiles:
+            idx = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+            result[f"p{p}"] = values[idx]
+        return result
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """All counters and sample summaries, for logging or a debug view."""
+        with self._lock:
+            counters = dict(self._counters)
+            names = list(self._samples.keys())
+        return {
+            "counters": counters,
+            "timings": {n: self.summary(n) for n in names},
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._samples.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,15 @@
+import re
+
+# Word pieces, digit groups and single symbols, roughly how BPE vocabularies split text
+_PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|\S")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count approximation without a model tokenizer: one token per short word, per
+    group of up to three digits and per symbol; long words count one token per ~6 letters.
+    Meant for budgeting and size reporting, not exact accounting.
+    """
+    if not text:
+        return 0
+    return sum((len(p) + 5) // 6 if p[0].isascii() and p[0].isalpha() else 1 for p in _PIECE.findall(text))
@@ -1,3 +1,4 @@
+from config import config
 from llm_gateway import LLMClient
 from ai.prompts import CAREER_MAPPING_PROMPT
 
@@ -5,10 +6,22 @@ class CareerMapper:
     def __init__(self):
         self.llm = LLMClient()
 
-    def map_career(self, branch: str) -> str:
+    @staticmethod
+    def _prompt(branch: str) -> str:
+        return f"Engineering Branch: {branch}\n\nMap this branch to potential career paths and higher studies."
+
+    async def map_career_async(self, branch: str) -> str:
         """
         Maps engineering branch to career paths using LLM.
         """
-        prompt = f"Engineering Branch: {branch}\n\nMap this branch to potential career paths and higher studies."
-        response, _ = self.llm.generate_response(prompt, system_prompt=CAREER_MAPPING_PROMPT)
+        prompt = self._prompt(branch)
+        response, _ = await self.llm.generate_response(prompt, system_prompt=CAREER_MAPPING_PROMPT, cache_ttl=config.LLM_CACHE_BRANCH_TTL_S,
+                                                       profile="branch_info")
+        return response
+
+    def map_career(self, branch: str) -> str:
+        """Blocking facade of map_career_async for scripts."""
+        prompt = self._prompt(branch)
+        response, _ = self.llm.generate_response_sync(prompt, system_prompt=CAREER_MAPPING_PROMPT, cache_ttl=config.LLM_CACHE_BRANCH_TTL_S,
+                                                      profile="branch_info")
         return response
@@ -0,0 +1,100 @@
+import time
+from typing import Callable, List
+
+CURSOR = "▌"
+
+
+class RenderBuffer:
+    """
+    Throttled, incremental rendering of a streamed chat answer.
+
+    Chunks are appended to a list (no string rebuilding per token). The visible text is
+    re-rendered at most once per `interval_s`, or sooner once `max_chars` new characters
+    are pending, so a 2,000-token answer costs tens of renders instead of thousands.
+
+    Each render would still resend the whole answer, so finished paragraphs are sealed:
+    at a blank line (outside a code fence) the text so far is rendered one last time into
+    the current placeholder and later text goes into a new one from `new_placeholder()`.
+    Only the paragraph being written is re-sent, which keeps the bytes sent linear in the
+    answer length. Placeholders need a markdown(text) method (st.empty() in Streamlit).
+    """
+
+    def __init__(self, new_placeholder: Callable[[], object], interval_s: float = 0.05, max_chars: int = 400,
+                 cursor: str = CURSOR, clock: Callable[[], float] = time.monotonic):
+        self._new_placeholder = new_placeholder
+        self.interval_s = interval_s
+        self.max_chars = max_chars
+        self.cursor = cursor
+        self._clock = clock
+        self._parts: List[str] = []
+        self._length = 0
+        self._block: List[str] = []  # chunks of the paragraph not yet sealed
+        self._placeholder = None
+        self._rendered_at = None
+        self._pending = 0
+        self.renders = 0
+        self.chars_rendered = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, chunk: str) -> bool:
+        """Adds a chunk; returns True if it was rendered now."""
+        if not chunk:
+            return False
+        self._parts.append(chunk)
+        self._block.append(chunk)
+        self._length += len(chunk)
+        self._pending += len(chunk)
+        now = self._clock()
+        if (self._rendered_at is None or now - self._rendered_at >= self.interval_s
+                or self._pending >= self.max_chars):
+            self._render(now)
+            return True
+        return False
+
+    def heartbeat(self):
+        """Re-renders the current paragraph (an st call, where Streamlit notices reruns)."""
+        if self._placeholder is None:
+            self._placeholder = self._new_placeholder()
+        self._render(self._clock())
+
+    def finish(self) -> str:
+        """Final render without the cursor; returns the whole text."""
+        self._show("".join(self._block))
+        return self.text
+
+    def _render(self, now: float):
+        self._rendered_at = now
+        self._pending = 0
+        block = "".join(self._block)
+        cut = self._seal_point(block)
+        if cut:
+            self._show(block[:cut])
+            self._placeholder = None
+            block = block[cut:]
+            self._block = [block] if block else []
+        self._show(block + self.cursor)
+
+    @staticmethod
+    def _seal_point(block: str) -> int:
+        """End of the last complete paragraph in `block` that is not inside a code fence; 0 if none."""
+        cut = block.rfind("\n\n")
+        while cut > 0:
+            if block.count("```", 0, cut) % 2 == 0:
+                return cut + 2
+            cut = block.rfind("\n\n", 0, cut)
+        return 0
+
+    def _show(self, text: str):
+        if self._placeholder is None:
+            if not text.strip(self.cursor + " \n"):
+                return  # nothing visible yet: don't open an empty element
+            self._placeholder = self._new_placeholder()
+        self._placeholder.markdown(text)
+        self.renders += 1
+        self.chars_rendered += len(text)
@@ -1,3 +1,4 @@
+from config import config
 from llm_gateway import LLMClient
 from ai.prompts import SKILL_SEARCH_PROMPT
 
@@ -5,10 +6,22 @@ class SkillSearch:
     def __init__(self):
         self.llm = LLMClient()
 
-    def search_skills(self, branch: str) -> str:
+    @staticmethod
+    def _prompt(branch: str) -> str:
+        return f"Branch: {branch}\n\nSearch for relevant skills and industry trends."
+
+    async def search_skills_async(self, branch: str) -> str:
         """
         Simulates a web search for skills using the LLM's knowledge tailored by the prompt.
         """
-        prompt = f"Branch: {branch}\n\nSearch for relevant skills and industry trends."
-        response, _ = self.llm.generate_response(prompt, system_prompt=SKILL_SEARCH_PROMPT)
+        prompt = self._prompt(branch)
+        response, _ = await self.llm.generate_response(prompt, system_prompt=SKILL_SEARCH_PROMPT, cache_ttl=config.LLM_CACHE_BRANCH_TTL_S,
+                                                       profile="branch_info")
+        return response
+
+    def search_skills(self, branch: str) -> str:
+        """Blocking facade of search_skills_async for scripts."""
+        prompt = self._prompt(branch)
+        response, _ = self.llm.generate_response_sync(prompt, system_prompt=SKILL_SEARCH_PROMPT, cache_ttl=config.LLM_CACHE_BRANCH_TTL_S,
+                                                      profile="branch_info")
         return response
@@ -7,6 +7,10 @@ sys.path.append(os.path.join(os.getcwd(), "src"))
 
 from agent.counsellor_agent import CounsellorAgent
 from agent.session_memory import SessionMemory
+from llm_cassette import record_hint, replay_without_key
+
+# Replayed when no API key is set (record with LLM_CASSETTE_MODE=record, see README)
+CASSETTE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "tests", "cassettes", "async_agent.jsonl")
 
 async def test_agent():
     print("Initializing Agent...")
@@ -23,6 +27,9 @@ async def test_agent():
     print("\n--- Stream End ---")
 
 if __name__ == "__main__":
+    if not replay_without_key(CASSETTE_PATH):
+        print(f"FAIL: {record_hint('test_async_agent.py')}")
+        sys.exit(1)
     try:
         asyncio.run(test_agent())
     except Exception as e: